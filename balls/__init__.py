@@ -2,27 +2,43 @@ import time
 from abc import ABC, abstractmethod
 from datetime import datetime
 from sys import exit
-from typing import Tuple, List, Callable, Any
+from typing import Tuple, List, Callable, Any, Optional, Dict
 
+import numpy
 import pygame
 from pygame import locals
 
+from balls.atlas import TextureAtlas, BlitBatch, AtlasRegion
+from balls.blend import blend_table
+from balls.clock import Clock, WallClock
+from balls.display import Display
 from balls.game import Game, Ball, Player, GameState, AiPlayer, create_game, PlayerArguments, GameArguments
+from balls.heatmap import Heatmap, get_heatmap, LEFT, RIGHT
+from balls.highscore import HighscorePages, get_store, record_when_finished
+from balls.input import InputSystem
+from balls.log import get_logger
+from balls.particles import ParticleSystem, CollisionSparks
+from balls.scene import Node, Label, DirtyAttribute
 from balls.text import TextInput
+from balls.trail import Trail
 
 pygame.init()
 
-clock = pygame.time.Clock()
+log = get_logger("balls.renderer")
 
 bar_dimension = (10, 100)
+# rounds a player needs to win the created and the background matches
+ROUNDS_TO_WIN = 3
 Color = Tuple[int, int, int]
 WHITE: Color = (255, 255, 255)
 BLACK: Color = (0, 0, 0)
 NEARLY_BLACK: Color = (1, 1, 1)
+IDLE_TIMEOUT_MS = 1000
+# family and size of the info bar font, also its key in the texture atlas
+INFO_FONT = ("arial", 16)
 
 
-def diff_time(end, start):
-    diff = (end - start).total_seconds()
+def diff_time(diff: float):
     d = int(diff / 86400)
     h = int((diff - (d * 86400)) / 3600)
     m = int((diff - (d * 86400 + h * 3600)) / 60)
@@ -38,37 +54,127 @@ def diff_time(end, start):
     return result
 
 
+fonts: Dict[Tuple[str, int], pygame.font.Font] = {}
+
+
+def get_font(family: str, size: int) -> pygame.font.Font:
+    """Returns the system font of the family and size, loading it on first use."""
+    key = (family, size)
+    font = fonts.get(key)
+
+    if font is None:
+        font = pygame.font.SysFont(family, size)
+        fonts[key] = font
+    return font
+
+
+def scale_rect(rect: locals.Rect, scale: float) -> locals.Rect:
+    """Scales position and size of the rect, keeping it at least one pixel big."""
+    return locals.Rect(int(rect.x * scale), int(rect.y * scale), max(1, int(rect.width * scale)),
+                       max(1, int(rect.height * scale)))
+
+
 class Texture(ABC):
 
     @abstractmethod
     def render(self, surface: pygame.Surface):
         pass
 
+    def queue(self, batch: BlitBatch):
+        batch.render(self)
+
 
 class PlayerTexture(Texture):
     player: Player
     color: Color
+    region: Optional[AtlasRegion]
+    scale: float
 
-    def __init__(self, player: Player, color: Color) -> None:
+    def __init__(self, player: Player, color: Color, atlas: Optional[TextureAtlas] = None,
+                 scale: float = 1.0) -> None:
         self.color = color
         self.player = player
+        self.region = None
+        self.scale = scale
+
+        if atlas is not None:
+            size = self.player.rect.size
+            key = ("player", size)
+
+            if key not in atlas:
+                shape = pygame.Surface(size)
+                shape.fill((200, 200, 200))
+                atlas.add(key, shape)
+            self.region = atlas.get(key)
 
     def render(self, surface: pygame.Surface):
-        pygame.draw.rect(surface, (200, 200, 200), self.player.rect)
+        rect = self.player.rect
+
+        if self.scale != 1.0:
+            rect = scale_rect(rect, self.scale)
+        pygame.draw.rect(surface, (200, 200, 200), rect)
+
+    def queue(self, batch: BlitBatch):
+        if self.region is None:
+            batch.render(self)
+        else:
+            batch.sequence.append((self.region[0], self.player.rect.topleft, self.region[1]))
 
 
 class BallTexture(Texture):
     ball: Ball
     color: Color
+    region: Optional[AtlasRegion]
+    trail: Optional[Trail]
+    scale: float
 
-    def __init__(self, ball: Ball, color: Color) -> None:
+    def __init__(self, ball: Ball, color: Color, atlas: Optional[TextureAtlas] = None, trail_length: int = 0,
+                 scale: float = 1.0) -> None:
         self.color = color
         self.ball = ball
+        self.region = None
+        self.trail = None
+        self.scale = scale
+
+        if trail_length > 0:
+            # the trail surface covers everything up to the bottom right of the board, so it can use board positions
+            self.trail = Trail(ball.boundary.bottomright, trail_length, (120, 120, 120))
+
+        if atlas is not None:
+            key = ("ball", 5)
+
+            if key not in atlas:
+                shape = pygame.Surface((11, 11), pygame.SRCALPHA)
+                shape.fill((0, 0, 0, 0))
+                pygame.draw.circle(shape, WHITE, (5, 5), 5)
+                atlas.add(key, shape)
+            self.region = atlas.get(key)
+
+    def update_trail(self):
+        position = self.ball.rect.topleft
+
+        if not len(self.trail) or self.trail.buffer.last() != position:
+            self.trail.append(*position)
 
     def render(self, surface: pygame.Surface):
-        x = int(self.ball.rect.x)
-        y = int(self.ball.rect.y)
-        pygame.draw.circle(surface, WHITE, (x, y), 5)
+        x = int(self.ball.rect.x * self.scale)
+        y = int(self.ball.rect.y * self.scale)
+
+        if self.trail is not None:
+            self.update_trail()
+            self.trail.render(surface)
+        pygame.draw.circle(surface, WHITE, (x, y), max(1, int(5 * self.scale)))
+
+    def queue(self, batch: BlitBatch):
+        if self.region is None:
+            batch.render(self)
+        else:
+            if self.trail is not None:
+                self.update_trail()
+                batch.blit(self.trail.surface, (0, 0))
+
+            rect = self.ball.rect
+            batch.sequence.append((self.region[0], (rect.x - 5, rect.y - 5), self.region[1]))
 
 
 class GameInfoTexture(Texture):
@@ -76,15 +182,58 @@ class GameInfoTexture(Texture):
     game: Game
     left_player_name: pygame.Surface
     right_player_name: pygame.Surface
+    atlas: Optional[TextureAtlas]
+    # None for names the atlas has no room for
+    left_player_region: Optional[AtlasRegion]
+    right_player_region: Optional[AtlasRegion]
 
-    def __init__(self, rect: locals.Rect, current_game: Game) -> None:
+    def __init__(self, rect: locals.Rect, current_game: Game, atlas: Optional[TextureAtlas] = None) -> None:
         super().__init__()
         self.rect = rect
         self.game = current_game
-        self.font = pygame.font.SysFont("arial", 16)
+        self.atlas = atlas
+        self.font = pygame.font.SysFont(*INFO_FONT)
         self.left_player_name = self.font.render(current_game.left_player.name, True, WHITE)
         self.right_player_name = self.font.render(current_game.right_player.name, True, WHITE)
         self.time_surface = self.font.render("0s", True, WHITE)
+        self.time_text = "0s"
+        self.score_surface = self.font.render("0 : 0", True, WHITE)
+        self.score = (0, 0)
+
+        if atlas is not None:
+            self.left_player_region = atlas.text(self.font, INFO_FONT, current_game.left_player.name, WHITE)
+            self.right_player_region = atlas.text(self.font, INFO_FONT, current_game.right_player.name, WHITE)
+            line_key = ("line", rect.width + 1)
+
+            if line_key not in atlas:
+                line = pygame.Surface((rect.width + 1, 1))
+                line.fill(WHITE)
+                atlas.add(line_key, line)
+            self.line_region = atlas.get(line_key)
+
+    def update_time(self):
+        if self.game.game_state == GameState.RUNNING:
+            time_running = diff_time(self.game.elapsed())
+
+            # the text only changes once per second, so most frames can reuse the surface
+            if time_running != self.time_text:
+                self.time_text = time_running
+                self.time_surface = self.font.render(time_running, True, WHITE)
+
+    def update_score(self) -> bool:
+        """Renders the score again if it changed, returns if a score is shown at all."""
+        if self.game.rounds_to_win == 1:
+            return False
+
+        score = (self.game.left_score, self.game.right_score)
+
+        if score != self.score:
+            self.score = score
+            self.score_surface = self.font.render("{} : {}".format(*score), True, WHITE)
+        return True
+
+    def score_position(self) -> Tuple[int, int]:
+        return self.rect.centerx - self.score_surface.get_width() // 2, self.rect.top + 5
 
     def render(self, surface: pygame.Surface):
         left_player_rect = surface.blit(self.left_player_name, (self.rect.left + 5, self.rect.top + 5))
@@ -92,15 +241,96 @@ class GameInfoTexture(Texture):
         right_player_beginning = self.rect.right - self.right_player_name.get_width() - 5
         surface.blit(self.right_player_name, (right_player_beginning, self.rect.top + 5))
 
-        if self.game.game_state == GameState.RUNNING:
-            time_running = diff_time(datetime.now(), self.game.started_at)
-            self.time_surface = self.font.render(time_running, True, WHITE)
+        self.update_time()
         surface.blit(self.time_surface, (self.rect.left + 5, left_player_rect.bottom + 5))
 
+        if self.update_score():
+            surface.blit(self.score_surface, self.score_position())
+
         startpos = (self.rect.left, self.rect.bottom)
         endpos = (self.rect.right, self.rect.bottom)
         pygame.draw.aaline(surface, WHITE, startpos, endpos)
 
+    def queue(self, batch: BlitBatch):
+        if self.atlas is None:
+            batch.render(self)
+            return
+
+        top = self.rect.top + 5
+        self.queue_name(batch, self.left_player_region, self.left_player_name, (self.rect.left + 5, top))
+
+        right_player_beginning = self.rect.right - self.right_player_name.get_width() - 5
+        self.queue_name(batch, self.right_player_region, self.right_player_name, (right_player_beginning, top))
+
+        self.update_time()
+        batch.blit(self.time_surface, (self.rect.left + 5, top + self.left_player_name.get_height() + 5))
+
+        if self.update_score():
+            batch.blit(self.score_surface, self.score_position())
+        batch.region(self.line_region, (self.rect.left, self.rect.bottom))
+
+    @staticmethod
+    def queue_name(batch: BlitBatch, region: Optional[AtlasRegion], name: pygame.Surface, position: Tuple[int, int]):
+        if region is None:
+            batch.blit(name, position)
+        else:
+            batch.region(region, position)
+
+
+class HeatmapTexture(Texture):
+    """
+    Overlay of where the ball spent its time on the board, with red strips at the sides for the rows the
+    bars missed the ball in. The histogram is rendered one pixel per cell and scaled up, and only again
+    after refresh_ticks more ticks went into the heatmap.
+    """
+    heatmap: Heatmap
+    rect: locals.Rect
+    refresh_ticks: int
+    alpha: int
+    visible: bool
+    surface: Optional[pygame.Surface]
+
+    def __init__(self, heatmap: Heatmap, refresh_ticks: int = 60, alpha: int = 150) -> None:
+        self.heatmap = heatmap
+        self.rect = locals.Rect(heatmap.board.topleft, (heatmap.columns * heatmap.cell, heatmap.rows * heatmap.cell))
+        self.refresh_ticks = refresh_ticks
+        self.alpha = alpha
+        self.visible = False
+        self.surface = None
+        self.rendered_ticks = 0
+        self.table = blend_table([(0, 0, 80), (0, 160, 255), (255, 255, 0), (255, 255, 255)], 256)
+
+    def update(self):
+        heatmap = self.heatmap
+
+        if self.surface is not None and heatmap.ticks - self.rendered_ticks < self.refresh_ticks:
+            return
+
+        self.rendered_ticks = heatmap.ticks
+        heatmap.flush()
+        # logarithmic, else the cells the ball passes on every serve outshine everything else
+        counts = numpy.log1p(heatmap.ball)
+        peak = counts.max()
+        levels = (counts * (255 / peak)).astype(numpy.intp) if peak else numpy.zeros(counts.shape, numpy.intp)
+        cells = pygame.surfarray.make_surface(self.table[levels].transpose(1, 0, 2))
+        surface = pygame.transform.scale(cells, self.rect.size)
+
+        misses = heatmap.misses
+        most_missed = misses.max()
+        cell = heatmap.cell
+
+        for side, x in ((LEFT, 0), (RIGHT, self.rect.width - cell // 2)):
+            for row in numpy.flatnonzero(misses[side]):
+                red = 80 + int(175 * misses[side, row] / most_missed)
+                surface.fill((red, 0, 0), (x, row * cell, cell // 2, cell))
+
+        surface.set_alpha(self.alpha)
+        self.surface = surface
+
+    def render(self, surface: pygame.Surface):
+        self.update()
+        surface.blit(self.surface, self.rect)
+
 
 class Renderer(ABC):
     master: "PingPongRenderer"
@@ -115,6 +345,13 @@ class Renderer(ABC):
     def tick(self) -> "Renderer":
         return self
 
+    def idle_timeout(self) -> Optional[int]:
+        """
+        Returns how long in ms the loop may wait for events before the next frame,
+        None if the renderer is animating and needs every frame.
+        """
+        return None
+
     def handle_event(self, event: pygame.event.EventType):
         pass
 
@@ -125,20 +362,18 @@ class Renderer(ABC):
 ClickHandler = Callable[[], None]
 
 
-class MenuItem(Texture):
-    rect: locals.Rect
+class MenuItem(Node, Texture):
     index: int
     text_rect: locals.Rect
     text_surface: pygame.Surface
-    hovering: bool
+    hovering = DirtyAttribute()
     click_handler: ClickHandler
 
     def __init__(self, index: int, parent_rect: locals.Rect, text: str, handler: ClickHandler) -> None:
-        super().__init__()
         left, width = parent_rect.left, parent_rect.width
         height = 50
         top = parent_rect.top + (index * height)
-        self.rect = locals.Rect(left, top, width, height)
+        super().__init__(locals.Rect(left, top, width, height), BLACK)
         padding = 5
         font = pygame.font.SysFont("arial", height - (padding * 2))
         self.text_surface = font.render(text, True, WHITE, BLACK)
@@ -147,47 +382,44 @@ class MenuItem(Texture):
 
         padding_x = int((width - text_rect.width) / 2)
         padding_y = int((height - text_rect.height) / 2)
-        self.text_rect = locals.Rect(left + padding_x, top + padding_y, width - (padding_x * 2),
-                                     height - (padding_y * 2))
+        self.text_rect = locals.Rect(padding_x, padding_y, width - (padding_x * 2), height - (padding_y * 2))
         self.index = index
         self.click_handler = handler
+        self.hovering = False
 
     def on_click(self):
         if self.click_handler:
             self.click_handler()
 
-    def render(self, surface: pygame.Surface):
+    def paint(self, surface: pygame.Surface):
         if self.hovering:
-            pygame.draw.rect(surface, WHITE, self.rect)
+            surface.fill(WHITE)
             surface.blit(self.text_surface_hovered, self.text_rect)
         else:
-            pygame.draw.rect(surface, WHITE, self.rect, 2)
+            pygame.draw.rect(surface, WHITE, surface.get_rect(), 2)
             surface.blit(self.text_surface, self.text_rect)
 
 
-class CheckBox(Texture):
+class CheckBox(Node, Texture):
     text: str
-    checked: bool
-    focused: bool
+    checked = DirtyAttribute()
+    focused = DirtyAttribute()
     font: pygame.font.Font
-    rect: locals.Rect
     text_surface: pygame.Surface
     box_rect: locals.Rect
     last_checked_change_time: float
 
     def __init__(self, text: str, font: pygame.font.Font, rect: locals.Rect) -> None:
-        super().__init__()
+        super().__init__(rect, WHITE)
         self.text = text
         self.font = font
         self.text_surface = self.font.render(text, True, BLACK)
-        self.rect = rect
         self.focused = False
         self.checked = False
-        self.box_rect = self.rect.copy()
-        self.box_rect.width = rect.height - 10
-        self.box_rect.height = self.box_rect.width
-        self.box_rect.left = self.rect.left + self.text_surface.get_width() + 5
-        self.box_rect.centery = self.rect.centery
+        # the box is painted relative to the checkbox itself
+        self.box_rect = locals.Rect(0, 0, rect.height - 10, rect.height - 10)
+        self.box_rect.left = self.text_surface.get_width() + 5
+        self.box_rect.centery = rect.height // 2
         self.last_checked_change_time = 0
 
     def on_click(self):
@@ -200,8 +432,8 @@ class CheckBox(Texture):
             self.checked = not self.checked
             self.last_checked_change_time = current_time
 
-    def render(self, surface: pygame.Surface):
-        surface.blit(self.text_surface, self.rect)
+    def paint(self, surface: pygame.Surface):
+        surface.blit(self.text_surface, (0, 0))
         pygame.draw.rect(surface, BLACK, self.box_rect, 1)
 
         if self.checked:
@@ -213,36 +445,36 @@ class CheckBox(Texture):
             pygame.draw.line(surface, BLACK, (right, bottom), (left, top), 3)
 
 
-class Button(Texture):
+class Button(Node, Texture):
     text: str
     text_surface: pygame.Surface
     text_surface_active: pygame.Surface
-    rect: locals.Rect
     text_rect: locals.Rect
-    hovering: bool
-    focused: bool
+    hovering = DirtyAttribute()
+    focused = DirtyAttribute()
     action_handler: ClickHandler
 
     def __init__(self, text: str, font: pygame.font.Font, action_handler: ClickHandler) -> None:
-        super().__init__()
-        self.text = text
         self.text_surface = font.render(text, True, BLACK)
+        rect = self.text_surface.get_rect()
+        rect.width += 10
+        rect.height += 10
+        super().__init__(rect, WHITE)
+        self.text = text
         self.text_surface_active = font.render(text, True, WHITE)
         self.text_rect = self.text_surface.get_rect()
-        self.rect = self.text_surface.get_rect().copy()
-        self.rect.width += 10
-        self.rect.height += 10
+        self.text_rect.bottomright = (rect.width - 5, rect.height - 5)
         self.action_handler = action_handler
         self.focused = False
         self.hovering = False
 
     def set_right(self, right: int):
         self.rect.right = right
-        self.text_rect.right = right - 5
+        self.mark_dirty()
 
     def set_bottom(self, bottom: int):
         self.rect.bottom = bottom
-        self.text_rect.bottom = bottom - 5
+        self.mark_dirty()
 
     def on_action(self):
         if self.action_handler:
@@ -251,31 +483,72 @@ class Button(Texture):
     def on_click(self):
         self.on_action()
 
-    def render(self, surface: pygame.Surface):
+    def paint(self, surface: pygame.Surface):
         if self.focused or self.hovering:
-            pygame.draw.rect(surface, BLACK, self.rect)
+            surface.fill(BLACK)
             surface.blit(self.text_surface_active, self.text_rect)
         else:
-            pygame.draw.rect(surface, BLACK, self.rect, 1)
+            pygame.draw.rect(surface, BLACK, surface.get_rect(), 1)
             surface.blit(self.text_surface, self.text_rect)
 
 
-def create_game_renderer(master: "PingPongRenderer", get_game_arguments: Callable[[], GameArguments]):
+class TextField(Node, Texture):
+    text_input: TextInput
+
+    def __init__(self, text_input: TextInput, rect: locals.Rect) -> None:
+        # one additional row for the underline
+        super().__init__(locals.Rect(rect.left, rect.top, rect.width, rect.height + 1), WHITE)
+        self.text_input = text_input
+
+    @property
+    def focused(self) -> bool:
+        return self.text_input.focused
+
+    @focused.setter
+    def focused(self, focused: bool):
+        self.text_input.focused = focused
+
+    def update(self, events: List[pygame.event.EventType]):
+        self.text_input.update(events)
+
+        if self.text_input.changed:
+            self.mark_dirty()
+
+    def paint(self, surface: pygame.Surface):
+        surface.blit(self.text_input.get_surface(), (0, 0))
+        bottom = self.rect.height - 1
+        pygame.draw.line(surface, BLACK, (0, bottom), (self.rect.width - 1, bottom), 1)
+
+
+def create_game_renderer(master: "PingPongRenderer", get_game_arguments: Callable[[], GameArguments],
+                         heatmap: bool = False):
+    """Builds the game and its renderer, heatmap adds the game to the heatmap of its board and shows it on H."""
     screen_rect = master.screen.get_clip()
     info_area = locals.Rect(screen_rect.left, screen_rect.top, screen_rect.width, 50)
     game_area = locals.Rect(screen_rect.left, screen_rect.top + 50, screen_rect.width, screen_rect.height - 50)
 
     game_arguments = get_game_arguments()
-    current_game = create_game(game_area, game_arguments)
+    current_game = create_game(game_area, game_arguments, master.clock)
 
-    left_player_texture = PlayerTexture(current_game.left_player, WHITE)
-    right_player_texture = PlayerTexture(current_game.right_player, WHITE)
+    left_player_texture = PlayerTexture(current_game.left_player, WHITE, master.atlas)
+    right_player_texture = PlayerTexture(current_game.right_player, WHITE, master.atlas)
 
-    ball_texture = BallTexture(current_game.ball, WHITE)
+    ball_texture = BallTexture(current_game.ball, WHITE, master.atlas)
 
-    info_texture = GameInfoTexture(info_area, current_game)
+    info_texture = GameInfoTexture(info_area, current_game, master.atlas)
+
+    particles = ParticleSystem()
+    current_game.collision_listeners.append(CollisionSparks(particles))
+
+    heatmap_texture = None
+
+    if heatmap:
+        # every played game on the board adds to the same heatmap, the demo matches of the menu do not
+        board_heatmap = get_heatmap(game_area)
+        board_heatmap.attach(current_game)
+        heatmap_texture = HeatmapTexture(board_heatmap)
     return RunningGameRenderer(master, current_game, ball_texture, left_player_texture,
-                               right_player_texture, info_texture)
+                               right_player_texture, info_texture, particles, heatmap_texture)
 
 
 class CreateGameRenderer(Renderer):
@@ -289,6 +562,9 @@ class CreateGameRenderer(Renderer):
     right_player_input_rect: locals.Rect
     right_player_ai_checkbox: CheckBox
     left_player_ai_checkbox: CheckBox
+    left_player_field: TextField
+    right_player_field: TextField
+    panel: Node
     focus_chain: List[Any]
     focused: int
     last_focus_change: float
@@ -301,6 +577,8 @@ class CreateGameRenderer(Renderer):
         top = int(rect.centery - (height / 2))
         left = int(rect.centerx - (width / 2))
         self.rect = locals.Rect((left, top), (width, height))
+        # the widgets are laid out relative to the panel
+        left, top = 0, 0
 
         font_family = "arial"
         font_size = 30
@@ -319,8 +597,8 @@ class CreateGameRenderer(Renderer):
 
         self.left_player_input = TextInput(text_color=BLACK, font_family=font_family, font_size=font_size)
         self.right_player_input = TextInput(text_color=BLACK, font_family=font_family, font_size=font_size)
-        self.left_player_input.width = self.rect.right - self.left_player_text_rect.right - 10
-        self.right_player_input.width = self.rect.right - self.right_player_text_rect.right - 10
+        self.left_player_input.width = self.rect.width - self.left_player_text_rect.right - 10
+        self.right_player_input.width = self.rect.width - self.right_player_text_rect.right - 10
 
         self.left_player_input_rect = self.left_player_text_rect.copy()
         self.left_player_input_rect.left = self.left_player_text_rect.right + 5
@@ -339,56 +617,55 @@ class CreateGameRenderer(Renderer):
         self.right_player_ai_checkbox = CheckBox("Right Player AI:", font, right_player_ai_check_rect)
 
         self.start_button = Button("Start", font, self.create_game)
-        self.start_button.set_right(self.rect.right - 5)
-        self.start_button.set_bottom(self.rect.bottom - 5)
+        self.start_button.set_right(self.rect.width - 5)
+        self.start_button.set_bottom(self.rect.height - 5)
 
         self.cancel_button = Button("Cancel", font, self.return_to_start)
         self.cancel_button.set_right(self.start_button.rect.left - 5)
-        self.cancel_button.set_bottom(self.rect.bottom - 5)
+        self.cancel_button.set_bottom(self.rect.height - 5)
+
+        self.left_player_field = TextField(self.left_player_input, self.left_player_input_rect)
+        self.right_player_field = TextField(self.right_player_input, self.right_player_input_rect)
 
-        self.focus_chain = [self.left_player_input, self.right_player_input, self.left_player_ai_checkbox,
+        self.panel = Node(self.rect, WHITE)
+        self.panel.add(Label(self.left_player_text, self.left_player_text_rect.topleft))
+        self.panel.add(Label(self.right_player_text, self.right_player_text_rect.topleft))
+        self.focus_chain = [self.left_player_field, self.right_player_field, self.left_player_ai_checkbox,
                             self.right_player_ai_checkbox, self.cancel_button, self.start_button]
+
+        for item in self.focus_chain:
+            self.panel.add(item)
+
+        self.panel.update_hover(*master.input.mouse_pos)
         self.focused = -1
         self.last_focus_change = 0
 
+    def set_focus(self, index: int):
+        for item in self.focus_chain:
+            item.focused = False
+
+        self.focused = index
+        self.focus_chain[index].focused = True
+
     def handle_event(self, event: pygame.event.EventType):
-        if event.type == locals.MOUSEBUTTONDOWN:
-            x, y = event.pos
-            if self.right_player_input_rect.collidepoint(x, y):
-                self.right_player_input.focused = True
-                self.focused = self.focus_chain.index(self.right_player_input)
-            elif self.left_player_input_rect.collidepoint(x, y):
-                self.left_player_input.focused = True
-                self.focused = self.focus_chain.index(self.left_player_input)
-            elif self.left_player_ai_checkbox.rect.collidepoint(x, y):
-                self.left_player_ai_checkbox.focused = True
-                self.left_player_ai_checkbox.toggle_checked()
-                self.focused = self.focus_chain.index(self.left_player_ai_checkbox)
-            elif self.right_player_ai_checkbox.rect.collidepoint(x, y):
-                self.right_player_ai_checkbox.focused = True
-                self.right_player_ai_checkbox.toggle_checked()
-                self.focused = self.focus_chain.index(self.right_player_ai_checkbox)
-            elif self.cancel_button.rect.collidepoint(x, y):
-                self.cancel_button.focused = True
-                self.focused = self.focus_chain.index(self.cancel_button)
-                self.cancel_button.on_click()
-            elif self.start_button.rect.collidepoint(x, y):
-                self.start_button.focused = True
-                self.focused = self.focus_chain.index(self.start_button)
-                self.start_button.on_click()
+        if event.type == locals.MOUSEMOTION:
+            self.panel.update_hover(*event.pos)
+
+        elif event.type == locals.MOUSEBUTTONDOWN:
+            node = self.panel.hit(*event.pos)
+
+            if node in self.focus_chain:
+                self.set_focus(self.focus_chain.index(node))
+
+                if hasattr(node, "on_click"):
+                    node.on_click()
 
         elif event.type == locals.KEYDOWN:
             if event.key == locals.K_TAB:
                 current_time = time.monotonic() * 1000
 
                 if current_time - self.last_focus_change > 500:
-                    self.focused += 1
-                    self.focused = self.focused % len(self.focus_chain)
-
-                    for item in self.focus_chain:
-                        item.focused = False
-
-                    self.focus_chain[self.focused].focused = True
+                    self.set_focus((self.focused + 1) % len(self.focus_chain))
                     self.last_focus_change = current_time
             elif event.key == locals.K_SPACE:
                 if self.focused >= 0 and isinstance(self.focus_chain[self.focused], CheckBox):
@@ -398,65 +675,130 @@ class CreateGameRenderer(Renderer):
     def create_game(self):
         renderer = self.create_game_renderer()
         self.master.renderer = renderer
+        renderer.game.tick_listeners.append(record_when_finished(get_store()))
         renderer.game.start()
-        clock.tick()
+        self.master.clock.tick()
         pygame.mouse.set_visible(False)
 
     @staticmethod
     def get_player_arguments(text_input: TextInput, ai_checkbox: CheckBox) -> PlayerArguments:
-        return {"name": text_input.get_text(), "ai": ai_checkbox.checked}
+        return {"name": text_input.get_text(), "ai": ai_checkbox.checked, "lookahead": ai_checkbox.checked}
 
     def get_game_arguments(self) -> GameArguments:
         return {
             "left_player": self.get_player_arguments(self.left_player_input, self.left_player_ai_checkbox),
             "right_player": self.get_player_arguments(self.right_player_input, self.right_player_ai_checkbox),
+            "rounds": ROUNDS_TO_WIN,
         }
 
     def create_game_renderer(self) -> "RunningGameRenderer":
-        return create_game_renderer(self.master, self.get_game_arguments)
+        return create_game_renderer(self.master, self.get_game_arguments, heatmap=True)
 
     def return_to_start(self):
         self.master.renderer = StartupGameRenderer(self.master)
 
     def handle_events(self, events: List[pygame.event.EventType]):
-        self.left_player_input.update(events)
-        self.right_player_input.update(events)
+        self.left_player_field.update(events)
+        self.right_player_field.update(events)
 
-    def draw(self, surface: pygame.Surface):
-        surface.fill(WHITE, self.rect)
-        surface.blit(self.left_player_text, self.left_player_text_rect)
-        surface.blit(self.left_player_input.get_surface(), self.left_player_input_rect)
-        surface.blit(self.right_player_text, self.right_player_text_rect)
-        surface.blit(self.right_player_input.get_surface(), self.right_player_input_rect)
+    def idle_timeout(self) -> Optional[int]:
+        timeout = IDLE_TIMEOUT_MS
 
-        pygame.draw.line(surface, BLACK, self.left_player_input_rect.bottomleft,
-                         self.left_player_input_rect.bottomright, 1)
-        pygame.draw.line(surface, BLACK, self.right_player_input_rect.bottomleft,
-                         self.right_player_input_rect.bottomright, 1)
+        for text_input in (self.left_player_input, self.right_player_input):
+            next_update = text_input.next_update_ms()
 
-        self.right_player_ai_checkbox.render(surface)
-        self.left_player_ai_checkbox.render(surface)
-        mouse_x, mouse_y = pygame.mouse.get_pos()
+            if next_update is not None:
+                timeout = min(timeout, next_update)
+        return timeout
 
-        self.cancel_button.hovering = self.cancel_button.rect.collidepoint(mouse_x, mouse_y)
-        self.cancel_button.render(surface)
-        self.start_button.hovering = self.start_button.rect.collidepoint(mouse_x, mouse_y)
-        self.start_button.render(surface)
+    def draw(self, surface: pygame.Surface):
+        self.panel.render(surface)
 
 
 # noinspection SpellCheckingInspection
 class HighscoreRenderer(Renderer):
+    """
+    The fastest wins, a page at a time. The drawn page is kept in a surface and only drawn
+    again when another page is shown or the store wrote new matches.
+    """
+    pages: HighscorePages
+    page: int
+    page_surface: Optional[pygame.Surface]
+    drawn_version: int
+
+    def __init__(self, master: "PingPongRenderer", page_size: int = 10) -> None:
+        super().__init__(master)
+        self.pages = HighscorePages(get_store(), page_size)
+        self.page = 0
+        self.page_surface = None
+        self.drawn_version = -1
+        self.title_font = pygame.font.SysFont("arial", 30)
+        self.font = pygame.font.SysFont("arial", 18)
+
+    def paint_page(self, size: Tuple[int, int]) -> pygame.Surface:
+        surface = pygame.Surface(size)
+        surface.fill(BLACK)
+        surface.blit(self.title_font.render("Fastest Wins", True, WHITE), (20, 10))
+        columns = (20, 70, 300, 400, 480)
+        top = 60
+
+        for left, text in zip(columns, ("#", "Winner", "Time", "Speed", "Date")):
+            surface.blit(self.font.render(text, True, WHITE), (left, top))
+
+        rows = self.pages.get(self.page)
+        first_rank = self.page * self.pages.page_size + 1
+        for rank, (_, winner, duration, ball_speed, finished_at) in enumerate(rows, first_rank):
+            top += 30
+            texts = (str(rank), winner, "{:.1f}s".format(duration), "{:.0f}".format(ball_speed),
+                     datetime.fromtimestamp(finished_at).strftime("%Y-%m-%d"))
+            for left, text in zip(columns, texts):
+                surface.blit(self.font.render(text, True, WHITE), (left, top))
+
+        if not rows:
+            surface.blit(self.font.render("No matches played yet", True, WHITE), (columns[1], top + 30))
+
+        footer = "Page {}   PageUp/PageDown: browse   Esc: back".format(self.page + 1)
+        surface.blit(self.font.render(footer, True, WHITE), (20, size[1] - 30))
+        return surface
+
     def draw(self, surface: pygame.Surface):
-        pass
+        size = surface.get_size()
+
+        if (self.page_surface is None or self.page_surface.get_size() != size
+                or self.drawn_version != self.pages.store.written):
+            self.drawn_version = self.pages.store.written
+            self.page_surface = self.paint_page(size)
+        surface.blit(self.page_surface, (0, 0))
+
+    def show_page(self, page: int):
+        if page >= 0 and page != self.page and self.pages.has_page(page):
+            self.page = page
+            self.page_surface = None
+
+    def handle_event(self, event: pygame.event.EventType):
+        if event.type == locals.KEYDOWN:
+            if event.key == locals.K_PAGEDOWN:
+                self.show_page(self.page + 1)
+            elif event.key == locals.K_PAGEUP:
+                self.show_page(self.page - 1)
+            elif event.key == locals.K_ESCAPE:
+                self.master.renderer = StartupGameRenderer(self.master)
+
+    def idle_timeout(self) -> Optional[int]:
+        return IDLE_TIMEOUT_MS
 
 
 class AboutRenderer(Renderer):
     def draw(self, surface: pygame.Surface):
         pass
 
+    def idle_timeout(self) -> Optional[int]:
+        return IDLE_TIMEOUT_MS
+
 
 class StartupGameRenderer(Renderer):
     menu_items: List[MenuItem]
+    menu: Node
     background_game: "RunningGameRenderer"
 
     def __init__(self, master: "PingPongRenderer") -> None:
@@ -471,72 +813,72 @@ class StartupGameRenderer(Renderer):
         self.menu_items = [
             MenuItem(0, sub_rect, "Create Game", self.create_game),
             MenuItem(1, sub_rect, "Highscore", self.display_highscore),
-            MenuItem(2, sub_rect, "About", self.display_about)
+            MenuItem(2, sub_rect, "Spectate", self.display_spectator),
+            MenuItem(3, sub_rect, "About", self.display_about)
         ]
+        self.menu = Node(self.rect, BLACK)
+
+        for item in self.menu_items:
+            self.menu.add(item)
+
+        self.menu.update_hover(*master.input.mouse_pos)
         self.background_surface = pygame.Surface((rect.width, rect.height))
         self.background_surface.set_alpha(100)
-        self.foreground_surface = pygame.Surface((width, height))
-        self.foreground_surface.set_alpha(255)
         self.background_game = self.run_background_game()
 
     def run_background_game(self) -> "RunningGameRenderer":
         renderer = self.start_game()
         renderer.game.start()
-        clock.tick()
+        self.master.clock.tick()
         return renderer
 
     def tick(self) -> "Renderer":
-        renderer = self.background_game.tick()
+        self.background_game.advance()
 
-        # when previous game finished, create a new game
-        if renderer != self.background_game:
-            self.background_game = self.run_background_game()
+        # when the previous match finished, the same game and textures play the next one
+        if self.background_game.game.is_finished():
+            self.background_game.restart()
         return super().tick()
 
     def draw(self, surface: pygame.Surface):
         surface.fill(WHITE)
         super(StartupGameRenderer, self).draw(self.background_surface)
-        super(StartupGameRenderer, self).draw(self.foreground_surface)
 
         self.background_game.draw(self.background_surface)
 
-        mouse_x, mouse_y = pygame.mouse.get_pos()
-        mouse_x, mouse_y = self.translate_event_position(mouse_x, mouse_y)
-
-        for item in self.menu_items:
-            item.hovering = item.rect.collidepoint(mouse_x, mouse_y)
-            item.render(self.foreground_surface)
-
         surface.blit(self.background_surface, self.background_surface.get_clip())
-        surface.blit(self.foreground_surface, self.rect)
-
-    def translate_event_position(self, mouse_x, mouse_y):
-        # translate mouse position from screen to subsurface
-        mouse_x -= self.rect.left
-        mouse_y -= self.rect.top
-        return mouse_x, mouse_y
+        self.menu.render(surface)
 
     def handle_event(self, event: pygame.event.EventType):
-        if event.type == locals.MOUSEBUTTONDOWN:
-            mouse_x, mouse_y = self.translate_event_position(*event.pos)
-            for item in self.menu_items:
-                if item.rect.collidepoint(mouse_x, mouse_y):
-                    item.on_click()
+        if event.type == locals.MOUSEMOTION:
+            self.menu.update_hover(*event.pos)
+
+        elif event.type == locals.MOUSEBUTTONDOWN:
+            node = self.menu.hit(*event.pos)
+
+            if node in self.menu_items:
+                node.on_click()
 
     def create_game(self):
         self.master.renderer = CreateGameRenderer(self.master)
 
     def display_highscore(self):
-        print(self)
+        self.master.renderer = HighscoreRenderer(self.master)
+
+    def display_spectator(self):
+        # the spectator module builds on this one
+        from balls.spectator import SpectatorRenderer
+        self.master.renderer = SpectatorRenderer(self.master)
 
     def display_about(self):
-        print(self)
+        log.info("menu item not implemented", item="About")
 
     @staticmethod
     def get_game_arguments():
         return {
             "left_player": {"name": "Player1", "ai": True},
             "right_player": {"name": "Player2", "ai": True},
+            "rounds": ROUNDS_TO_WIN,
         }
 
     def start_game(self) -> "RunningGameRenderer":
@@ -544,11 +886,16 @@ class StartupGameRenderer(Renderer):
 
 
 class FinishedGameRenderer(Renderer):
+    """
+    Shows the winner over the finished game. The running game renderer keeps it for its rematches,
+    a later finish only renders the message for the new winner.
+    """
     master: "PingPongRenderer"
     running_game_renderer: "RunningGameRenderer"
     background: pygame.Surface
-    foreground: pygame.Surface
+    foreground: Optional[pygame.Surface]
     message_surface: pygame.Surface
+    hint_surface: pygame.Surface
     sub_rect: locals.Rect
     rect: locals.Rect
 
@@ -558,10 +905,18 @@ class FinishedGameRenderer(Renderer):
         self.master = self.running_game_renderer.master
 
         rect: locals.Rect = self.master.screen.get_clip()
+        self.background = pygame.Surface((rect.width, rect.height))
+        self.background.set_alpha(100)
+        self.foreground = None
+        self.hint_surface = get_font("arial", 20).render("Enter: rematch   Esc: menu", True, NEARLY_BLACK)
+        self.update()
 
-        font = pygame.font.SysFont("arial", 50)
+    def update(self):
+        """Renders the message for the winner of the game."""
+        rect: locals.Rect = self.master.screen.get_clip()
         game = self.running_game_renderer.game
-        self.message_surface = font.render("Player '{0}' won the Game".format(game.player_won.name), True, NEARLY_BLACK)
+        self.message_surface = get_font("arial", 50).render("Player '{0}' won the Game".format(game.player_won.name),
+                                                            True, NEARLY_BLACK)
 
         width = self.message_surface.get_width()
         height = self.message_surface.get_height()
@@ -570,11 +925,10 @@ class FinishedGameRenderer(Renderer):
         self.rect = locals.Rect((left, top), (width, height))
         self.sub_rect = locals.Rect(0, 0, width, height)
 
-        self.background = pygame.Surface((rect.width, rect.height))
-        self.background.set_alpha(100)
-        self.foreground = pygame.Surface((width, height))
-        self.foreground.set_alpha(255)
-        self.foreground.set_colorkey(BLACK)
+        if self.foreground is None or self.foreground.get_size() != (width, height):
+            self.foreground = pygame.Surface((width, height))
+            self.foreground.set_alpha(255)
+            self.foreground.set_colorkey(BLACK)
 
     def draw(self, surface: pygame.Surface):
         surface.fill(WHITE)
@@ -583,6 +937,21 @@ class FinishedGameRenderer(Renderer):
 
         surface.blit(self.background, self.background.get_clip())
         surface.blit(self.foreground, self.rect)
+        surface.blit(self.hint_surface, (self.rect.centerx - self.hint_surface.get_width() // 2, self.rect.bottom + 10))
+
+    def handle_event(self, event: pygame.event.EventType):
+        if event.type == locals.KEYDOWN:
+            if event.key == locals.K_RETURN:
+                # a rematch plays in the finished game with its renderer, nothing is created again
+                self.running_game_renderer.restart()
+                pygame.mouse.set_visible(False)
+                self.master.renderer = self.running_game_renderer
+            elif event.key == locals.K_ESCAPE:
+                self.master.renderer = StartupGameRenderer(self.master)
+
+    def idle_timeout(self) -> Optional[int]:
+        # the finished game does not move anymore
+        return IDLE_TIMEOUT_MS
 
 
 class RunningGameRenderer(Renderer):
@@ -592,68 +961,176 @@ class RunningGameRenderer(Renderer):
     right_player: PlayerTexture
     info: GameInfoTexture
     game_area: locals.Rect
+    batch: BlitBatch
+    particles: Optional[ParticleSystem]
+    heatmap: Optional[HeatmapTexture]
+    finished: Optional[FinishedGameRenderer]
 
     def __init__(self, master: "PingPongRenderer", current_game: Game, ball: BallTexture, left_player: PlayerTexture,
-                 right_player: PlayerTexture, info_texture: GameInfoTexture) -> None:
+                 right_player: PlayerTexture, info_texture: GameInfoTexture,
+                 particles: Optional[ParticleSystem] = None, heatmap: Optional[HeatmapTexture] = None) -> None:
         super().__init__(master)
         self.game = current_game
         self.ball = ball
         self.left_player = left_player
         self.right_player = right_player
         self.info = info_texture
+        self.batch = BlitBatch()
+        self.particles = particles
+        self.heatmap = heatmap
+        self.finished = None
+        # clock time not yet ticked into the game, less than a step of Game.advance
+        self.accumulated = 0.0
 
     def draw(self, surface: pygame.Surface):
         super(RunningGameRenderer, self).draw(surface)
-        self.info.render(surface)
-        self.left_player.render(surface)
-        self.right_player.render(surface)
-        self.ball.render(surface)
+        self.info.queue(self.batch)
+        self.left_player.queue(self.batch)
+        self.right_player.queue(self.batch)
+        self.ball.queue(self.batch)
+        self.batch.submit(surface)
 
-    def tick(self) -> Renderer:
-        screen_rect = self.master.screen.get_clip()
-        rect_y_position = min(pygame.mouse.get_pos()[1], screen_rect.bottom - bar_dimension[1])
-        time_passed = clock.tick()
-        time_passed_seconds = time_passed / 1000.0
+        if self.particles is not None:
+            self.particles.render(surface)
 
-        self.game.time_to_last_tick = time_passed_seconds
-        # self.game.time_to_last_tick = self.time_between_loop
-        # is not really part of drawing, move it somewhere else?
-        self.game.tick(rect_y_position, rect_y_position)
+        if self.heatmap is not None and self.heatmap.visible:
+            self.heatmap.render(surface)
+
+    def handle_event(self, event: pygame.event.EventType):
+        if self.heatmap is not None and event.type == locals.KEYDOWN and event.key == locals.K_h:
+            self.heatmap.visible = not self.heatmap.visible
+
+    def restart(self):
+        """Starts a new match in the same game, keeping the textures, surfaces and listeners."""
+        self.game.reset()
+
+        if self.particles is not None:
+            self.particles.clear()
+
+        if self.ball.trail is not None:
+            self.ball.trail.clear()
+        self.accumulated = 0.0
+        self.game.start()
+        self.master.clock.tick()
+
+    def tick(self) -> Renderer:
+        self.advance()
 
         if self.game.game_state != GameState.RUNNING:
             pygame.mouse.set_visible(True)
 
         if self.game.game_state == GameState.FINISHED:
-            return FinishedGameRenderer(self)
+            return self.finished_renderer()
         return self
 
+    def finished_renderer(self) -> FinishedGameRenderer:
+        """The renderer showing the winner, built on the first finish and updated on the ones of rematches."""
+        if self.finished is None:
+            self.finished = FinishedGameRenderer(self)
+        else:
+            self.finished.update()
+        return self.finished
+
+    def advance(self):
+        """Moves the game and the particles by the time passed since the last tick."""
+        screen_rect = self.master.screen.get_clip()
+        rect_y_position = min(self.master.input.snapshot.mouse_pos[1], screen_rect.bottom - bar_dimension[1])
+        time_passed_seconds = self.master.clock.tick()
+
+        # is not really part of drawing, move it somewhere else?
+        self.accumulated = self.game.advance(self.accumulated + time_passed_seconds, rect_y_position,
+                                             rect_y_position)
+
+        if self.particles is not None:
+            if self.game.game_state == GameState.RUNNING:
+                # a short lived trail behind the ball
+                ball_rect = self.game.ball.rect
+                self.particles.emit(ball_rect.x, ball_rect.y, 3, 15.0, 0.3, (120, 120, 120))
+            self.particles.update(time_passed_seconds)
+
 
 class PingPongRenderer:
+    # the surface the renderers draw into, either the window or the logical surface of the display
     screen: pygame.Surface
+    display: Display
     time_between_loop = 0.01
+    # how often animating renderers are still ticked while the window is in the background
+    unfocused_interval_ms = 50
+    minimized_interval_ms = 250
     renderer: Renderer
+    atlas: Optional[TextureAtlas] = None
+    input: InputSystem
+    minimized: bool = False
+    input_focused: bool = True
+    # the time of the games and the animations, e.g. a ScaledClock to fast forward them
+    clock: Clock
+
+    def __init__(self, logical_size: Optional[Tuple[int, int]] = None, smooth_scaling: bool = False,
+                 clock: Optional[Clock] = None) -> None:
+        self.display = Display(logical_size, smooth_scaling)
+        self.input = InputSystem(self.display)
+        self.clock = WallClock() if clock is None else clock
 
     def start(self):
-        self.screen = pygame.display.set_mode((640, 480), pygame.RESIZABLE, 32)
+        self.display.open((640, 480))
+        self.screen = self.display.screen
+        self.atlas = TextureAtlas()
+        self.input.install()
         self.renderer = StartupGameRenderer(self)
         self.loop()
 
+    def idle_timeout(self) -> Optional[int]:
+        timeout = self.renderer.idle_timeout()
+
+        if self.minimized:
+            interval = self.minimized_interval_ms
+        elif not self.input_focused:
+            interval = self.unfocused_interval_ms
+        else:
+            return timeout
+        return interval if timeout is None else min(timeout, interval)
+
+    def handle_window_event(self, event: pygame.event.EventType):
+        if event.state & locals.APPACTIVE:
+            self.minimized = not event.gain
+
+        if event.state & locals.APPINPUTFOCUS:
+            self.input_focused = bool(event.gain)
+
+    def handle_display_event(self, event: pygame.event.EventType):
+        if event.type == locals.VIDEORESIZE:
+            self.display.resize(event.size)
+        elif event.type == locals.KEYDOWN and event.key == locals.K_F11:
+            self.display.toggle_fullscreen()
+        # without a logical size the renderers draw into the new window surface
+        self.screen = self.display.screen
+
     def loop(self):
         while True:
-            events = pygame.event.get()
+            timeout = self.idle_timeout()
+            events = self.input.poll(timeout).events
+
             for event in events:
                 if event.type == locals.QUIT:
                     pygame.quit()
                     exit()
+                elif event.type == locals.ACTIVEEVENT:
+                    self.handle_window_event(event)
+                elif event.type == locals.VIDEORESIZE or (event.type == locals.KEYDOWN and event.key == locals.K_F11):
+                    self.handle_display_event(event)
                 self.renderer.handle_event(event)
             self.renderer.handle_events(events)
 
             self.renderer = self.renderer.tick()
-            self.renderer.draw(self.screen)
 
-            pygame.display.update()
-            time.sleep(self.time_between_loop)
+            if not self.minimized:
+                self.renderer.draw(self.screen)
+                self.display.present()
+                self.input.presented()
+
+            if timeout is None:
+                time.sleep(self.time_between_loop)
 
 
 if __name__ == '__main__':
-    PingPongRenderer().start()
+    PingPongRenderer(logical_size=(640, 480)).start()
@@ -0,0 +1,303 @@
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pygame.rect import Rect
+
+from balls.game import AiPlayer, Game, MovableUnit
+
+# the simulation steps with a fixed tick, so the paths of frames with different lengths share cache entries
+SIMULATION_STEP = 1 / 120
+# a ball which needs longer than this to reach a bar, e.g. a nearly vertical one, is not predicted
+MAX_SIMULATION_STEPS = 2400
+# the deadline is only checked every few steps, reading the clock costs as much as a step
+DEADLINE_CHECK_INTERVAL = 32
+POSITION_QUANTUM = 2
+DIRECTION_QUANTUM = 128
+SPEED_QUANTUM = 8
+PREDICTION_STEP_BITS = 16
+# cached for the states of a path which does not reach the bar, so it is not simulated again every frame
+UNREACHED = -1
+
+# right side, quantized x, y, direction x, direction y and speed packed into one int
+Key = int
+# top of the ball when it reaches the bar and the seconds until then
+Prediction = Tuple[int, float]
+
+
+class BallPredictor:
+    """
+    Predicts where the ball reaches the bar of one side with a lightweight copy of the ball physics.
+    A ball moving away is expected to be returned by the other bar, so the bar can get into position early.
+
+    Every state of a simulated path is stored in a transposition cache under its quantized key, together
+    with the rest of the path. The ball of the next frames is on the same path, so after one simulation
+    per bounce the predictions are mostly cache hits. A simulation running over the time budget is
+    continued in the next frame, until then the prediction is None and the player falls back to tracking the ball.
+    """
+    budget: float
+    max_entries: int
+    # the ball top shifted by PREDICTION_STEP_BITS or'ed with the steps until the bar,
+    # ints instead of tuples keep the garbage collector from pausing a frame to scan the cache
+    cache: Dict[Key, int]
+    hits: int
+    misses: int
+    over_budget: int
+    pending: Optional["PathSimulation"]
+
+    def __init__(self, budget: float = 0.002, max_entries: int = 100000) -> None:
+        self.budget = budget
+        self.max_entries = max_entries
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+        self.over_budget = 0
+        self.pending = None
+
+    @staticmethod
+    def key(right_side: bool, x: float, y: float, direction_x: float, direction_y: float, speed: float) -> Key:
+        # the offsets keep every field positive and inside its bits, positions overshoot the board a bit
+        key = int(speed) // SPEED_QUANTUM
+        key = (key << 9) | (round(direction_x * DIRECTION_QUANTUM) + DIRECTION_QUANTUM)
+        key = (key << 9) | (round(direction_y * DIRECTION_QUANTUM) + DIRECTION_QUANTUM)
+        key = (key << 12) | (int(y) // POSITION_QUANTUM + 1024)
+        key = (key << 12) | (int(x) // POSITION_QUANTUM + 1024)
+        return (key << 1) | right_side
+
+    def predict(self, current_game: Game, right_side: bool) -> Optional[Prediction]:
+        ball = current_game.ball
+        direction = ball.direction
+
+        if direction.x == 0:
+            return None
+
+        key = self.key(right_side, ball.position.x, ball.position.y, direction.x, direction.y, ball.speed)
+        prediction = self.cache.get(key)
+
+        if prediction is not None:
+            self.hits += 1
+            return self.decode(prediction)
+
+        self.misses += 1
+        if self.pending is None or self.pending.right_side != right_side:
+            self.pending = PathSimulation(current_game, right_side)
+
+        # the paths are keyed by the states on them, so a simulation started in an earlier frame stays valid
+        if not self.pending.run(time.perf_counter() + self.budget):
+            self.over_budget += 1
+            return None
+
+        simulation = self.pending
+        self.pending = None
+        self.store(simulation.path, simulation.ball_top if simulation.reached else None)
+
+        prediction = self.cache.get(key)
+        return None if prediction is None else self.decode(prediction)
+
+    @staticmethod
+    def decode(prediction: int) -> Optional[Prediction]:
+        if prediction == UNREACHED:
+            return None
+        return prediction >> PREDICTION_STEP_BITS, (prediction & ((1 << PREDICTION_STEP_BITS) - 1)) * SIMULATION_STEP
+
+    def store(self, path: List[Key], ball_top: Optional[int]):
+        if len(self.cache) + len(path) > self.max_entries:
+            self.cache.clear()
+
+        steps = len(path) - 1
+        for step, key in enumerate(path):
+            # a quantized key may be on the path twice, the later entry is the nearer one
+            self.cache[key] = UNREACHED if ball_top is None else (ball_top << PREDICTION_STEP_BITS) | (steps - step)
+
+
+class PathSimulation:
+    """The path of the ball to the bar of one side, simulated in slices of a time budget."""
+    right_side: bool
+    path: List[Key]
+    reached: bool
+    ball_top: int
+
+    def __init__(self, current_game: Game, right_side: bool) -> None:
+        ball = current_game.ball
+        board = current_game.screen_rect
+        self.right_side = right_side
+        self.top = board.top
+        self.bottom = board.bottom - ball.rect.height
+        # the planes the ball has to reach to hit the left or the right bar
+        self.left_plane = current_game.left_player.rect.right
+        self.right_plane = current_game.right_player.rect.left - ball.rect.width
+        self.x = ball.position.x
+        self.y = ball.position.y
+        self.direction_x = ball.direction.x
+        self.direction_y = ball.direction.y
+        self.speed = ball.speed
+        self.speedup = 1 + ball.speedup_factor * SIMULATION_STEP
+        self.max_speed = ball.max_speed
+        self.path = []
+        self.reached = False
+        self.ball_top = 0
+
+    def run(self, deadline: float) -> bool:
+        """Simulates until the ball reached the bar or the deadline passed, returns whether it finished."""
+        right_side = self.right_side
+        top, bottom = self.top, self.bottom
+        left_plane, right_plane = self.left_plane, self.right_plane
+        x, y, direction_x, direction_y, speed = self.x, self.y, self.direction_x, self.direction_y, self.speed
+        speedup, max_speed = self.speedup, self.max_speed
+        path = self.path
+        key = BallPredictor.key
+
+        while len(path) < MAX_SIMULATION_STEPS:
+            path.append(key(right_side, x, y, direction_x, direction_y, speed))
+
+            # the walls are checked against the clamped rect like Game does, the position may overshoot them
+            rect_y = min(max(int(y), top), bottom)
+            if rect_y <= top and direction_y < 0:
+                direction_y = -direction_y
+            elif rect_y >= bottom and direction_y > 0:
+                direction_y = -direction_y
+
+            if direction_x > 0 and int(x) >= right_plane:
+                if right_side:
+                    self.reached = True
+                    self.ball_top = rect_y
+                    return True
+                direction_x = -direction_x
+            elif direction_x < 0 and int(x) <= left_plane:
+                if not right_side:
+                    self.reached = True
+                    self.ball_top = rect_y
+                    return True
+                direction_x = -direction_x
+
+            distance = speed * SIMULATION_STEP
+            x += direction_x * distance
+            y += direction_y * distance
+            speed = min(speed * speedup, max_speed)
+
+            if len(path) % DEADLINE_CHECK_INTERVAL == 0 and time.perf_counter() > deadline:
+                self.x, self.y, self.direction_x, self.direction_y, self.speed = x, y, direction_x, direction_y, speed
+                return False
+        return True
+
+
+class LookaheadAiPlayer(AiPlayer):
+    """
+    An ai moving its bar to where the predictor expects the ball, also while the ball moves away.
+
+    Bar collisions only flip the x direction of the ball, where it hits the bar does not change its
+    course, so the search is over the path of the ball and there is no return to aim.
+
+    The predictions are exact, so the bar aims off by an error drawn each time the ball turns towards it,
+    growing with the speed of the ball up to the height of the bar at its top speed. Otherwise two of them
+    never miss.
+    """
+    predictor: BallPredictor
+    aim_error: int
+    # whether the ball moved towards the bar when the aim error was drawn
+    approaching: bool
+
+    def __init__(self, rect: Rect, boundary: Rect, name: str, right_side: bool,
+                 predictor: Optional[BallPredictor] = None) -> None:
+        super().__init__(rect, boundary, name, right_side)
+        self.predictor = BallPredictor() if predictor is None else predictor
+        self.aim_error = 0
+        self.approaching = False
+
+    def reset(self):
+        super().reset()
+        # a simulation still running started from where the ball was before the reset
+        self.predictor.pending = None
+        self.aim_error = 0
+        self.approaching = False
+
+    def update_aim_error(self):
+        ball = self.game.ball
+        approaching = ball.direction.x > 0 if self.right_side else ball.direction.x < 0
+
+        if approaching and not self.approaching:
+            spread = int(self.rect.height * ball.speed / ball.max_speed)
+            self.aim_error = random.randint(-spread, spread)
+        self.approaching = approaching
+
+    def move(self, x: float, y: float):
+        self.update_aim_error()
+        prediction = self.predictor.predict(self.game, self.right_side)
+
+        if prediction is None:
+            super().move(x, y)
+            return
+
+        ball_top, _ = prediction
+        target = ball_top + self.game.ball.rect.height // 2 - self.rect.height // 2 + self.aim_error
+        distance_moved = self.game.time_to_last_tick * self.speed
+        moved = int(min(max(target - self.rect.y, -distance_moved), distance_moved))
+        MovableUnit.move(self, 0, moved)
+        self.speed = min(self.speed + self.speed * self.speedup_factor * self.game.time_to_last_tick, self.max_speed)
+
+
+def benchmark(games: int = 200, tick_seconds: float = 1 / 60, max_ticks: int = 20000):
+    """Plays the tracking ai against the lookahead ai and measures the cost of the lookahead in a tick."""
+    import random
+
+    from balls.game import Ball, create_player
+    from vector2 import Vector2
+
+    area = Rect(0, 50, 640, 430)
+    random.seed(0)
+    predictor = BallPredictor()
+    wins = {"tracking": 0, "lookahead": 0, "unfinished": 0}
+    total_ticks = 0
+    tick_total = tick_max = 0.0
+    slow_ticks = 0
+
+    for index in range(games):
+        # both sides get both ais in turn
+        lookahead_right = index % 2 == 0
+        tracking = create_player(area, {"name": "tracking", "ai": True}, not lookahead_right)
+        player_rect = Rect(area.right - 10 if lookahead_right else area.left, area.centery, 10, 100)
+        lookahead = LookaheadAiPlayer(player_rect, area, "lookahead", lookahead_right, predictor)
+        left, right = (tracking, lookahead) if lookahead_right else (lookahead, tracking)
+        current_game = Game(Ball(Rect(area.center, (10, 5)), area, Vector2(), 5, 250), left, right, area)
+        tracking.game = lookahead.game = current_game
+        current_game.start()
+        current_game.time_to_last_tick = tick_seconds
+
+        for _ in range(max_ticks):
+            start = time.perf_counter()
+            current_game.tick(0, 0)
+            elapsed = time.perf_counter() - start
+            tick_total += elapsed
+            tick_max = max(tick_max, elapsed)
+            total_ticks += 1
+            if elapsed > 0.004:
+                slow_ticks += 1
+
+            if current_game.is_finished():
+                break
+
+        wins[current_game.player_won.name if current_game.is_finished() else "unfinished"] += 1
+
+    print("games {} wins tracking {} lookahead {} unfinished {}, average game {:.0f} ticks".format(
+        games, wins["tracking"], wins["lookahead"], wins["unfinished"], total_ticks / games))
+    hit_rate = predictor.hits / (predictor.hits + predictor.misses)
+    print("tick us avg {:.2f} max {:.1f}, ticks over 4 ms {}, cache hit rate {:.1%}, over budget {}, "
+          "cache entries {}".format(tick_total / total_ticks * 1e6, tick_max * 1e6, slow_ticks, hit_rate,
+                                    predictor.over_budget, len(predictor.cache)))
+
+    left = create_player(area, {"name": "left", "ai": True}, False)
+    right = create_player(area, {"name": "right", "ai": True}, True)
+    current_game = Game(Ball(Rect(area.center, (10, 5)), area, Vector2(), 5, 250), left, right, area)
+    uncached = 0.0
+    for _ in range(100):
+        current_game.start()
+        predictor.cache.clear()
+        predictor.pending = None
+        start = time.perf_counter()
+        predictor.predict(current_game, True)
+        uncached += time.perf_counter() - start
+    print("first prediction of a game us avg {:.1f}".format(uncached / 100 * 1e6))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,214 @@
+import time
+from typing import Tuple, List, Dict, Hashable, Optional, Any
+
+import pygame
+from pygame.rect import Rect
+
+AtlasRegion = Tuple[pygame.Surface, Rect]
+
+
+def display_format(surface: pygame.Surface) -> pygame.Surface:
+    # converting needs a display mode, before that the surface is kept as it is
+    if pygame.display.get_init() and pygame.display.get_surface() is not None:
+        return surface.convert_alpha()
+    return surface
+
+
+class AtlasPage:
+    surface: pygame.Surface
+    shelf_top: int
+    shelf_height: int
+    shelf_left: int
+
+    def __init__(self, size: Tuple[int, int]) -> None:
+        self.surface = display_format(pygame.Surface(size, pygame.SRCALPHA))
+        self.surface.fill((0, 0, 0, 0))
+        self.shelf_top = 0
+        self.shelf_height = 0
+        self.shelf_left = 0
+
+    def allocate(self, width: int, height: int, padding: int) -> Optional[Rect]:
+        page_width, page_height = self.surface.get_size()
+
+        if self.shelf_left + width > page_width:
+            # start a new shelf below the current one
+            self.shelf_top += self.shelf_height + padding
+            self.shelf_left = 0
+            self.shelf_height = 0
+
+        if self.shelf_left + width > page_width or self.shelf_top + height > page_height:
+            return None
+
+        rect = Rect(self.shelf_left, self.shelf_top, width, height)
+        self.shelf_left += width + padding
+        self.shelf_height = max(self.shelf_height, height)
+        return rect
+
+
+class TextureAtlas:
+    """
+    Packs many small surfaces (sprites, pre-rendered shapes, static text) into a few
+    large pages, so a frame can be drawn with blits from a handful of source surfaces.
+
+    Pages are created in the display format if a display mode is already set,
+    otherwise call convert() once it is. Regions returned before that point
+    still reference the unconverted pages.
+
+    Regions are never freed, so at most max_text_regions texts are packed,
+    the callers blit the texts past that themselves.
+    """
+    page_size: Tuple[int, int]
+    padding: int
+    pages: List[AtlasPage]
+    regions: Dict[Hashable, Tuple[int, Rect]]
+    max_text_regions: int
+    text_regions: int
+
+    def __init__(self, page_size: Tuple[int, int] = (1024, 1024), padding: int = 1,
+                 max_text_regions: int = 256) -> None:
+        self.page_size = page_size
+        self.padding = padding
+        self.pages = []
+        self.regions = {}
+        self.max_text_regions = max_text_regions
+        self.text_regions = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.regions
+
+    def get(self, key: Hashable) -> AtlasRegion:
+        page_index, rect = self.regions[key]
+        return self.pages[page_index].surface, rect
+
+    def add(self, key: Hashable, surface: pygame.Surface) -> AtlasRegion:
+        """Packs the surface into a page, adding a surface for an existing key returns the old region."""
+        if key not in self.regions:
+            width, height = surface.get_size()
+            page_index, rect = self.allocate(width, height)
+            self.pages[page_index].surface.blit(surface, rect)
+            self.regions[key] = page_index, rect
+        return self.get(key)
+
+    def allocate(self, width: int, height: int) -> Tuple[int, Rect]:
+        for page_index, page in enumerate(self.pages):
+            rect = page.allocate(width, height, self.padding)
+            if rect:
+                return page_index, rect
+
+        # surfaces larger than a page get a page of their own
+        page = AtlasPage((max(width, self.page_size[0]), max(height, self.page_size[1])))
+        self.pages.append(page)
+        return len(self.pages) - 1, page.allocate(width, height, self.padding)
+
+    def load(self, key: Hashable, filename: str) -> AtlasRegion:
+        if key in self.regions:
+            return self.get(key)
+        return self.add(key, pygame.image.load(filename))
+
+    def text(self, font: pygame.font.Font, font_key: Hashable, text: str,
+             color: Tuple[int, int, int]) -> Optional[AtlasRegion]:
+        """
+        font_key identifies the font across Font objects, e.g. (name, size, bold, italic), the id of the
+        font could be reused by another font once it is collected. None once max_text_regions are packed.
+        """
+        key = ("text", font_key, text, color)
+        if key in self.regions:
+            return self.get(key)
+
+        if self.text_regions >= self.max_text_regions:
+            return None
+        self.text_regions += 1
+        return self.add(key, font.render(text, True, color))
+
+    def convert(self):
+        """Converts all pages to the display format, requires a display mode to be set."""
+        for page in self.pages:
+            page.surface = display_format(page.surface)
+
+
+class BlitBatch:
+    """
+    Collects the draw commands of a frame and submits them with as few Surface.blits
+    calls as possible. Textures which cannot be expressed as blits are rendered
+    in between, keeping the order in which everything was queued.
+    """
+    sequence: List[Tuple[Any, ...]]
+    deferred: List[Tuple[int, Any]]
+
+    def __init__(self) -> None:
+        self.sequence = []
+        self.deferred = []
+
+    def __len__(self) -> int:
+        return len(self.sequence) + len(self.deferred)
+
+    def blit(self, source: pygame.Surface, dest: Tuple[int, int], area: Optional[Rect] = None):
+        if area is None:
+            self.sequence.append((source, dest))
+        else:
+            self.sequence.append((source, dest, area))
+
+    def region(self, region: AtlasRegion, dest: Tuple[int, int]):
+        self.sequence.append((region[0], dest, region[1]))
+
+    def render(self, texture: Any):
+        """Queues a texture which draws itself with its render method."""
+        self.deferred.append((len(self.sequence), texture))
+
+    def clear(self):
+        self.sequence.clear()
+        self.deferred.clear()
+
+    def submit(self, surface: pygame.Surface):
+        start = 0
+        for index, texture in self.deferred:
+            if index > start:
+                surface.blits(self.sequence[start:index], doreturn=False)
+                start = index
+            texture.render(surface)
+
+        if start < len(self.sequence):
+            surface.blits(self.sequence[start:] if start else self.sequence, doreturn=False)
+        self.clear()
+
+
+def benchmark(frames: int = 200):
+    """Compares drawing balls with one pygame.draw call each against a single queued blits call."""
+    from balls import BallTexture, WHITE
+    from balls.game import Ball
+    from vector2 import Vector2
+
+    target = pygame.display.set_mode((640, 480))
+    atlas = TextureAtlas()
+    board = target.get_rect()
+    batch = BlitBatch()
+
+    print("objects  immediate ms/frame  queue ms/frame  blits ms/frame")
+    for count in (1, 10, 100, 1000, 10000):
+        textures = []
+        for index in range(count):
+            ball = Ball(Rect((index * 37) % 640, (index * 53) % 480, 10, 5), board, Vector2(), 5, 250)
+            textures.append(BallTexture(ball, WHITE, atlas))
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            for texture in textures:
+                texture.render(target)
+        immediate = time.perf_counter() - start
+
+        queued = submitted = 0.0
+        for _ in range(frames):
+            start = time.perf_counter()
+            for texture in textures:
+                texture.queue(batch)
+            middle = time.perf_counter()
+            batch.submit(target)
+            queued += middle - start
+            submitted += time.perf_counter() - middle
+
+        print("{:>7}  {:>18.3f}  {:>14.3f}  {:>14.3f}".format(
+            count, immediate / frames * 1000, queued / frames * 1000, submitted / frames * 1000))
+
+
+if __name__ == '__main__':
+    benchmark()
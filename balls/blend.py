@@ -0,0 +1,144 @@
+import time
+from typing import Tuple, Sequence, Dict, Optional, List
+
+import numpy
+import pygame
+
+Color = Tuple[int, int, int]
+Colors = Tuple[Color, ...]
+
+
+def blend_table(colors: Sequence[Color], steps: int) -> numpy.ndarray:
+    """
+    Returns a (steps, 3) uint8 array blending linearly through the colors, which act as evenly spaced stops.
+    The first entry is the first color, the last entry the last color.
+    """
+    if len(colors) < 2:
+        raise ValueError("at least two colors are needed to blend, got {}".format(len(colors)))
+    if steps < 2:
+        raise ValueError("steps needs to be at least 2, got {}".format(steps))
+
+    stops = numpy.asarray(colors, dtype=numpy.float64)
+    positions = numpy.linspace(0, len(stops) - 1, steps)
+    lower = numpy.minimum(positions.astype(numpy.intp), len(stops) - 2)
+    factors = (positions - lower)[:, None]
+    # truncates like the int() of a single blend_color
+    return (stops[lower] + (stops[lower + 1] - stops[lower]) * factors).astype(numpy.uint8)
+
+
+def gradient_array(table: numpy.ndarray, size: Tuple[int, int], horizontal: bool = True) -> numpy.ndarray:
+    """Spreads the table over a (width, height, 3) array, quantizing to the table entries if it is shorter."""
+    width, height = size
+    extent = width if horizontal else height
+    line = table[numpy.arange(extent) * len(table) // extent]
+
+    if horizontal:
+        return numpy.broadcast_to(line[:, None, :], (width, height, 3))
+    return numpy.broadcast_to(line[None, :, :], (width, height, 3))
+
+
+def gradient_surface(colors: Sequence[Color], size: Tuple[int, int], steps: Optional[int] = None,
+                     horizontal: bool = True) -> pygame.Surface:
+    """Renders a gradient through the colors in one surfarray pass, steps defaults to one per pixel."""
+    if steps is None:
+        steps = size[0] if horizontal else size[1]
+    return pygame.surfarray.make_surface(gradient_array(blend_table(colors, steps), size, horizontal))
+
+
+class BlendCache:
+    """
+    Blend tables and gradient surfaces, computed once per (colors, steps) and (colors, size, steps, direction).
+    After the first request a blend slider only does table lookups.
+    """
+    tables: Dict[Tuple[Colors, int], numpy.ndarray]
+    palettes: Dict[Tuple[Colors, int], List[Color]]
+    surfaces: Dict[Tuple[Colors, Tuple[int, int], int, bool], pygame.Surface]
+
+    def __init__(self) -> None:
+        self.tables = {}
+        self.palettes = {}
+        self.surfaces = {}
+
+    def table(self, colors: Sequence[Color], steps: int) -> numpy.ndarray:
+        key = (tuple(colors), steps)
+        table = self.tables.get(key)
+
+        if table is None:
+            table = blend_table(colors, steps)
+            # cached tables are shared, nobody may modify them
+            table.setflags(write=False)
+            self.tables[key] = table
+        return table
+
+    def color(self, colors: Sequence[Color], factor: float, steps: int = 256) -> Color:
+        """Looks up the blended color at factor in 0..1 from the table with the given resolution."""
+        key = (tuple(colors), steps)
+        palette = self.palettes.get(key)
+
+        if palette is None:
+            # plain tuples, indexing numpy rows per lookup costs more than the lookup itself
+            palette = [tuple(color) for color in self.table(colors, steps).tolist()]
+            self.palettes[key] = palette
+        return palette[min(max(int(factor * (steps - 1) + 0.5), 0), steps - 1)]
+
+    def gradient(self, colors: Sequence[Color], size: Tuple[int, int], steps: Optional[int] = None,
+                 horizontal: bool = True) -> pygame.Surface:
+        if steps is None:
+            steps = size[0] if horizontal else size[1]
+        key = (tuple(colors), tuple(size), steps, horizontal)
+        surface = self.surfaces.get(key)
+
+        if surface is None:
+            table = self.table(colors, steps)
+            surface = pygame.surfarray.make_surface(gradient_array(table, size, horizontal))
+            self.surfaces[key] = surface
+        return surface
+
+
+def benchmark(frames: int = 20):
+    """Compares a per pixel Python gradient against gradient_surface and the BlendCache."""
+    colors = ((255, 0, 255), (0, 255, 125), (255, 255, 0))
+    size = (640, 240)
+
+    def blend_color(color1, color2, blend_factor):
+        red1, green1, blue1 = color1
+        red2, green2, blue2 = color2
+        return (int(red1 + (red2 - red1) * blend_factor), int(green1 + (green2 - green1) * blend_factor),
+                int(blue1 + (blue2 - blue1) * blend_factor))
+
+    target = pygame.Surface(size)
+    start = time.perf_counter()
+    for x in range(size[0]):
+        position = x / (size[0] - 1) * (len(colors) - 1)
+        lower = min(int(position), len(colors) - 2)
+        color = blend_color(colors[lower], colors[lower + 1], position - lower)
+        for y in range(size[1]):
+            target.set_at((x, y), color)
+    python = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        gradient_surface(colors, size)
+    vectorized = (time.perf_counter() - start) / frames
+
+    cache = BlendCache()
+    cache.gradient(colors, size)
+    start = time.perf_counter()
+    for _ in range(frames):
+        cache.gradient(colors, size)
+    cached = (time.perf_counter() - start) / frames
+
+    lookups = 100000
+    start = time.perf_counter()
+    for index in range(lookups):
+        cache.color(colors, index / lookups, 640)
+    lookup = (time.perf_counter() - start) / lookups
+
+    print("per pixel gradient: {:.2f} ms".format(python * 1000))
+    print("gradient_surface:   {:.3f} ms".format(vectorized * 1000))
+    print("cached gradient:    {:.4f} ms".format(cached * 1000))
+    print("cached color:       {:.2f} us".format(lookup * 1000000))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,243 @@
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Callable, Optional, Tuple
+
+from pygame.rect import Rect
+
+from balls.game import Game, Player
+
+# version, tick (counted by publishing), game state, ball x, ball y, direction x, direction y, ball speed,
+# left bar y, right bar y, board top, board bottom, time.perf_counter() of publishing
+STATE = struct.Struct("<qqq10d")
+# version, target y of the bar, tick the target was computed for, publish time of that tick
+COMMAND = struct.Struct("<qdqd")
+LEFT = 0
+RIGHT = 1
+# a reader gives up after this many torn reads and keeps what it had, it never waits for a writer
+MAX_READ_ATTEMPTS = 4
+
+BotState = Tuple[int, int, float, float, float, float, float, float, float, float, float, float]
+Command = Tuple[float, int, float]
+
+
+class BotChannel:
+    """
+    A shared memory block between a game and out of process bots.
+
+    The game publishes its state every tick into the state section, each bar has a command section
+    a bot writes its target y into. Both sections are guarded seqlock style: the writer makes the
+    version odd, writes the values and makes it even again. A reader retries a torn read a few times
+    and otherwise returns None, so neither side ever blocks on the other.
+    """
+    memory: shared_memory.SharedMemory
+    owner: bool
+
+    SIZE = STATE.size + 2 * COMMAND.size
+
+    def __init__(self, name: Optional[str] = None) -> None:
+        # without a name a new block is created, with a name an existing one is attached
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(name, create=self.owner, size=self.SIZE if self.owner else 0)
+        self.state_version = 0
+        self.command_versions = [0, 0]
+
+        if self.owner:
+            self.memory.buf[:self.SIZE] = bytes(self.SIZE)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    @staticmethod
+    def command_offset(side: int) -> int:
+        return STATE.size + side * COMMAND.size
+
+    def write(self, layout: struct.Struct, offset: int, version: int, values: tuple) -> int:
+        buffer = self.memory.buf
+        struct.pack_into("<q", buffer, offset, version + 1)
+        layout.pack_into(buffer, offset, version + 1, *values)
+        struct.pack_into("<q", buffer, offset, version + 2)
+        return version + 2
+
+    def read(self, layout: struct.Struct, offset: int) -> Optional[tuple]:
+        buffer = self.memory.buf
+
+        for _ in range(MAX_READ_ATTEMPTS):
+            values = layout.unpack_from(buffer, offset)
+            version = values[0]
+
+            if not version & 1 and struct.unpack_from("<q", buffer, offset)[0] == version:
+                return values
+        return None
+
+    def publish(self, current_game: Game):
+        """Tick listener of the game, writes its state for the bots."""
+        ball = current_game.ball
+        board = current_game.screen_rect
+        self.state_version = self.write(STATE, 0, self.state_version, (
+            self.state_version // 2 + 1, current_game.game_state.value,
+            ball.rect.x, ball.rect.y, ball.direction.x, ball.direction.y, ball.speed,
+            current_game.left_player.rect.y, current_game.right_player.rect.y, board.top, board.bottom,
+            time.perf_counter()))
+
+    def read_state(self) -> Optional[Tuple[int, BotState]]:
+        """Returns the version and the state published last, None if there is none or the read was torn."""
+        values = self.read(STATE, 0)
+
+        if values is None or values[0] == 0:
+            return None
+        return values[0], values[1:]
+
+    def command(self, side: int, target_y: float, tick: int, published_at: float):
+        self.command_versions[side] = self.write(COMMAND, self.command_offset(side), self.command_versions[side],
+                                                 (target_y, tick, published_at))
+
+    def read_command(self, side: int) -> Optional[Tuple[int, Command]]:
+        values = self.read(COMMAND, self.command_offset(side))
+
+        if values is None or values[0] == 0:
+            return None
+        return values[0], values[1:]
+
+    def close(self):
+        self.memory.close()
+
+        if self.owner:
+            self.memory.unlink()
+
+
+class BotPlayer(Player):
+    """
+    A bar moved to the target y a bot wrote into the channel. Without a new command it keeps its
+    position, a slow bot therefore makes the bar lag, never the game.
+    The control latency is the time from publishing a tick to the game reading the command for it.
+    """
+    channel: BotChannel
+    side: int
+    command_version: int
+    latency_count: int
+    latency_total: float
+    latency_max: float
+
+    def __init__(self, rect: Rect, boundary: Rect, name: str, channel: BotChannel, side: int) -> None:
+        super().__init__(rect, boundary, name)
+        self.channel = channel
+        self.side = side
+        self.command_version = 0
+        self.latency_count = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def move(self, x: float, y: float):
+        command = self.channel.read_command(self.side)
+
+        if command is None or command[0] == self.command_version:
+            return
+
+        self.command_version, (target_y, _, published_at) = command
+        latency = time.perf_counter() - published_at
+        self.latency_count += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        super().move(0, int(target_y))
+
+    def average_latency(self) -> float:
+        return self.latency_total / self.latency_count if self.latency_count else 0.0
+
+
+Policy = Callable[[BotState, int], float]
+
+
+def tracking_policy(state: BotState, side: int) -> float:
+    """Keeps the bar centered on the ball, the bars are 100 pixels high."""
+    ball_y = state[3]
+    return ball_y - 50
+
+
+def run_bot(channel_name: str, side: int, policy: Policy = tracking_policy, think_seconds: float = 0.0,
+            run_seconds: float = 10.0):
+    """
+    The loop of a bot process: waits for a new state, computes the target with the policy,
+    which may take think_seconds to simulate a heavy model, and writes it back.
+    """
+    channel = BotChannel(channel_name)
+    seen_version = 0
+    end = time.perf_counter() + run_seconds
+
+    try:
+        while time.perf_counter() < end:
+            published = channel.read_state()
+
+            if published is None or published[0] == seen_version:
+                # a short sleep keeps a waiting bot from burning a core
+                time.sleep(0.0002)
+                continue
+
+            seen_version, state = published
+            target_y = policy(state, side)
+
+            if think_seconds:
+                time.sleep(think_seconds)
+            channel.command(side, target_y, state[0], state[-1])
+    finally:
+        channel.close()
+
+
+def benchmark(seconds: float = 3.0, tick_seconds: float = 1 / 120):
+    """Plays a bot versus bot game with a fast and a slow bot process and reports tick cost and control latency."""
+    from multiprocessing import Process
+
+    from balls.game import Ball
+    from vector2 import Vector2
+
+    area = Rect(0, 50, 640, 430)
+
+    print("left think ms  right think ms  game us/tick  max us/tick  left latency ms avg/max  right latency ms avg/max")
+    for think in ((0.0, 0.0), (0.0, 0.05), (0.2, 0.05)):
+        channel = BotChannel()
+        left = BotPlayer(Rect(area.left, area.centery, 10, 100), area, "left", channel, LEFT)
+        right = BotPlayer(Rect(area.right - 10, area.centery, 10, 100), area, "right", channel, RIGHT)
+        current_game = Game(Ball(Rect(area.center, (10, 5)), area, Vector2(), 5, 250), left, right, area)
+        current_game.ball.speedup_factor = 0
+        current_game.tick_listeners.append(channel.publish)
+
+        bots = [Process(target=run_bot, args=(channel.name, side, tracking_policy, think[side], seconds + 2))
+                for side in (LEFT, RIGHT)]
+        for bot in bots:
+            bot.start()
+        # give the bots time to attach before the game starts
+        time.sleep(0.5)
+
+        current_game.start()
+        current_game.time_to_last_tick = tick_seconds
+        ticks = 0
+        tick_total = tick_max = 0.0
+        end = time.perf_counter() + seconds
+
+        while time.perf_counter() < end:
+            if current_game.is_finished():
+                current_game.start()
+                current_game.ball.rect.center = area.center
+                current_game.ball.position = Vector2(*current_game.ball.rect.topleft)
+            start = time.perf_counter()
+            current_game.tick(0, 0)
+            elapsed = time.perf_counter() - start
+            tick_total += elapsed
+            tick_max = max(tick_max, elapsed)
+            ticks += 1
+            time.sleep(max(0.0, tick_seconds - elapsed))
+
+        for bot in bots:
+            bot.terminate()
+            bot.join()
+        channel.close()
+
+        print("{:>13.0f}  {:>14.0f}  {:>12.1f}  {:>11.1f}  {:>13.2f} / {:>7.2f}  {:>14.2f} / {:>7.2f}".format(
+            think[0] * 1000, think[1] * 1000, tick_total / ticks * 1e6, tick_max * 1e6,
+            left.average_latency() * 1000, left.latency_max * 1000,
+            right.average_latency() * 1000, right.latency_max * 1000))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,126 @@
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class Clock(ABC):
+    """
+    Time source of the games and the renderers, in seconds. now() is the current time on the clock,
+    tick() the time passed since the previous tick, like the ms of pygame.time.Clock.tick() but in seconds.
+    """
+    last_tick: Optional[float]
+
+    def __init__(self) -> None:
+        self.last_tick = None
+
+    @abstractmethod
+    def now(self) -> float:
+        pass
+
+    def tick(self) -> float:
+        now = self.now()
+        passed = 0.0 if self.last_tick is None else now - self.last_tick
+        self.last_tick = now
+        return passed
+
+
+class WallClock(Clock):
+    def now(self) -> float:
+        return time.monotonic()
+
+
+class VirtualClock(Clock):
+    """
+    A clock which only moves when told to, by advance() or by step seconds on every tick, so runs
+    with the same inputs see the same times whatever the machine.
+    """
+    time: float
+    step: Optional[float]
+
+    def __init__(self, step: Optional[float] = None, start: float = 0.0) -> None:
+        super().__init__()
+        self.time = start
+        self.step = step
+
+    def now(self) -> float:
+        return self.time
+
+    def advance(self, seconds: float):
+        self.time += seconds
+
+    def tick(self) -> float:
+        if self.step is not None:
+            self.time += self.step
+        return super().tick()
+
+
+class ScaledClock(Clock):
+    """
+    Runs factor times as fast as its source clock, the wall clock by default. Changing the factor
+    keeps the time continuous, the new factor only applies from then on.
+    """
+    source: Clock
+    factor: float
+
+    def __init__(self, factor: float, source: Optional[Clock] = None) -> None:
+        super().__init__()
+        self.source = WallClock() if source is None else source
+        self.factor = factor
+        self.origin = self.source.now()
+        self.scaled_origin = self.origin
+
+    def now(self) -> float:
+        return self.scaled_origin + (self.source.now() - self.origin) * self.factor
+
+    def set_factor(self, factor: float):
+        self.scaled_origin = self.now()
+        self.origin = self.source.now()
+        self.factor = factor
+
+
+def benchmark(factor: float = 20.0, tick_seconds: float = 1 / 60):
+    """
+    Plays the same seeded ai match on a virtual clock twice and once fast-forwarded on a scaled wall clock.
+    The game moves by a fixed step whatever the clock, so the matches end the same.
+    """
+    import random
+
+    from pygame.rect import Rect
+
+    from balls.game import GameArguments, create_game
+
+    area = Rect(0, 50, 640, 430)
+    arguments: GameArguments = {
+        "left_player": {"name": "left", "ai": True},
+        "right_player": {"name": "right", "ai": True},
+        "rounds": 3,
+    }
+
+    def play(clock: Clock, wait: float = 0.0):
+        random.seed(0)
+        current_game = create_game(area, arguments, clock)
+        ticks = []
+        current_game.tick_listeners.append(ticks.append)
+        current_game.start()
+        clock.tick()
+        accumulated = 0.0
+        start = time.perf_counter()
+
+        while current_game.is_running():
+            if wait:
+                time.sleep(wait)
+            # a fast clock ticks the game more often, never by more
+            accumulated = current_game.advance(accumulated + clock.tick(), 0, 0)
+        return (current_game.player_won.name, current_game.left_score, current_game.right_score,
+                current_game.elapsed(), len(ticks), time.perf_counter() - start)
+
+    for name, clock, wait in (("virtual", VirtualClock(tick_seconds), 0.0),
+                              ("virtual again", VirtualClock(tick_seconds), 0.0),
+                              ("wall x{:g}".format(factor), ScaledClock(factor), tick_seconds)):
+        winner, left, right, elapsed, ticks, wall = play(clock, wait)
+        print("{:<14} winner {:<5} {}:{}  game time {:6.2f} s  {:5} ticks  wall time {:6.2f} s".format(
+            name, winner, left, right, elapsed, ticks, wall))
+
+
+if __name__ == '__main__':
+    benchmark()
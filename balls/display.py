@@ -0,0 +1,135 @@
+import time
+from typing import Optional, Tuple
+
+import pygame
+from pygame import locals
+
+Size = Tuple[int, int]
+
+
+def fit_viewport(logical_size: Size, window_size: Size) -> locals.Rect:
+    """The biggest rect with the aspect ratio of logical_size, centered in the window."""
+    logical_width, logical_height = logical_size
+    window_width, window_height = window_size
+    scale = min(window_width / logical_width, window_height / logical_height)
+    width = max(1, int(logical_width * scale))
+    height = max(1, int(logical_height * scale))
+    return locals.Rect((window_width - width) // 2, (window_height - height) // 2, width, height)
+
+
+class Display:
+    """
+    The window and the surface the renderers draw into.
+
+    Without a logical size the renderers draw straight into the window. With one they draw into
+    an offscreen surface of that size, which present() scales into the window with a single
+    transform, keeping the aspect ratio with black bars. Resizing or going fullscreen then only
+    changes the cost of that one scale, not of every fill and primitive drawn in a frame.
+    """
+    window: pygame.Surface
+    screen: pygame.Surface
+    logical_size: Optional[Size]
+    smooth: bool
+    viewport: locals.Rect
+    fullscreen: bool
+    windowed_size: Size
+    present_target: Optional[pygame.Surface]
+
+    def __init__(self, logical_size: Optional[Size] = None, smooth: bool = False) -> None:
+        self.logical_size = logical_size
+        self.smooth = smooth
+        self.screen = None
+        self.fullscreen = False
+        self.windowed_size = (0, 0)
+        self.present_target = None
+
+    @property
+    def scaled(self) -> bool:
+        return self.logical_size is not None
+
+    def open(self, size: Size, flags: int = pygame.RESIZABLE):
+        self.window = pygame.display.set_mode(size, flags, 32)
+
+        if not self.fullscreen:
+            self.windowed_size = self.window.get_size()
+
+        if self.logical_size is None:
+            self.screen = self.window
+            self.present_target = None
+            self.viewport = self.window.get_rect()
+            return
+
+        # the logical surface survives resizes, so renderers keep drawing into the same surface
+        if self.screen is None:
+            self.screen = pygame.Surface(self.logical_size, 0, self.window)
+
+        self.viewport = fit_viewport(self.logical_size, self.window.get_size())
+        # the bars around the viewport are never drawn over, filling them once is enough
+        self.window.fill((0, 0, 0))
+        self.present_target = self.window.subsurface(self.viewport)
+
+    def resize(self, size: Size):
+        if not self.fullscreen:
+            self.open(size)
+
+    def toggle_fullscreen(self):
+        self.fullscreen = not self.fullscreen
+
+        if self.fullscreen:
+            self.open((0, 0), pygame.FULLSCREEN)
+        else:
+            self.open(self.windowed_size)
+
+    def to_logical(self, pos: Tuple[int, int]) -> Tuple[int, int]:
+        """Maps a window position to the logical surface, positions on the bars are clamped to its border."""
+        if self.logical_size is None:
+            return pos
+
+        logical_width, logical_height = self.logical_size
+        x = (pos[0] - self.viewport.x) * logical_width // self.viewport.width
+        y = (pos[1] - self.viewport.y) * logical_height // self.viewport.height
+        return min(max(x, 0), logical_width - 1), min(max(y, 0), logical_height - 1)
+
+    def present(self):
+        if self.present_target is not None:
+            if self.smooth:
+                pygame.transform.smoothscale(self.screen, self.viewport.size, self.present_target)
+            else:
+                pygame.transform.scale(self.screen, self.viewport.size, self.present_target)
+        pygame.display.update()
+
+
+def benchmark(frames: int = 30):
+    """Compares drawing the game directly at window size against drawing at 640x480 and scaling once."""
+    from balls import PingPongRenderer, StartupGameRenderer, create_game_renderer
+
+    def create_running_game(master: PingPongRenderer):
+        renderer = create_game_renderer(master, StartupGameRenderer.get_game_arguments)
+        renderer.game.start()
+        return renderer
+
+    print("window      mode            startup ms/frame  running game ms/frame")
+    for window_size in ((1280, 720), (1920, 1080), (3840, 2160)):
+        for logical_size, smooth, mode in ((None, False, "direct"), ((640, 480), False, "scale"),
+                                           ((640, 480), True, "smoothscale")):
+            master = PingPongRenderer(logical_size, smooth)
+            master.display.open(window_size, 0)
+            master.screen = master.display.screen
+            master.atlas = None
+            results = []
+
+            for create in (StartupGameRenderer, create_running_game):
+                renderer = create(master)
+                start = time.perf_counter()
+                for _ in range(frames):
+                    renderer.tick()
+                    renderer.draw(master.screen)
+                    master.display.present()
+                results.append((time.perf_counter() - start) / frames * 1000)
+
+            print("{:>4}x{:<5}  {:<14}  {:>16.2f}  {:>21.2f}".format(
+                window_size[0], window_size[1], mode, results[0], results[1]))
+
+
+if __name__ == '__main__':
+    benchmark()
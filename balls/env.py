@@ -0,0 +1,369 @@
+import random
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy
+import pygame
+from pygame.rect import Rect
+
+from balls import WHITE, BallTexture, PlayerTexture
+from balls.game import MIN_SERVE_DIRECTION_X, AiPlayer, Ball, Collision, Game, Player, create_player
+from vector2 import Vector2
+
+BOARD = Rect(0, 0, 640, 430)
+BAR_SIZE = (10, 100)
+BALL_SIZE = (10, 5)
+BALL_SPEED = 250
+BALL_SPEEDUP = 0.1
+BALL_MAX_SPEED = 20000
+# the bar of the agent moves as fast as an ai bar starts
+BAR_SPEED = 300
+AI_SPEEDUP = 0.09
+AI_MAX_SPEED = 20000
+# stay, up, down
+ACTION_DIRECTIONS = numpy.array([0, -1, 1])
+ACTION_COUNT = len(ACTION_DIRECTIONS)
+# ball x, ball y, ball direction x, ball direction y, ball speed, agent bar center y, opponent bar center y
+OBSERVATION_SIZE = 7
+# speeds are observed in this unit, so the observation stays near the range of the positions
+SPEED_SCALE = 1000
+
+
+def observation(ball_x, ball_y, direction_x, direction_y, speed, agent_y, opponent_y, out: numpy.ndarray):
+    """Writes the observations of one or many games, positions relative to the board, into out."""
+    out[..., 0] = (ball_x - BOARD.left) / BOARD.width
+    out[..., 1] = (ball_y - BOARD.top) / BOARD.height
+    out[..., 2] = direction_x
+    out[..., 3] = direction_y
+    out[..., 4] = speed / SPEED_SCALE
+    out[..., 5] = (agent_y + BAR_SIZE[1] // 2 - BOARD.top) / BOARD.height
+    out[..., 6] = (opponent_y + BAR_SIZE[1] // 2 - BOARD.top) / BOARD.height
+    return out
+
+
+class BoardImage:
+    """Renders a ball and two bars offscreen with their textures and returns the pixels as an RGB array."""
+    ball: Ball
+    left_player: Player
+    right_player: Player
+    surface: pygame.Surface
+    textures: tuple
+
+    def __init__(self, ball: Ball, left_player: Player, right_player: Player) -> None:
+        self.ball = ball
+        self.left_player = left_player
+        self.right_player = right_player
+        self.surface = pygame.Surface(BOARD.size)
+        self.textures = (PlayerTexture(left_player, WHITE), PlayerTexture(right_player, WHITE),
+                         BallTexture(ball, WHITE))
+
+    def render(self) -> numpy.ndarray:
+        self.surface.fill((0, 0, 0))
+
+        for texture in self.textures:
+            texture.render(self.surface)
+        # a third of the time of surfarray.array3d, which also indexes x first instead of the rows
+        pixels = pygame.image.tostring(self.surface, "RGB")
+        return numpy.frombuffer(pixels, dtype=numpy.uint8).reshape(BOARD.height, BOARD.width, 3)
+
+
+class PongEnv:
+    """
+    A reset/step environment around one Game, without a window. The agent moves the left bar,
+    the right one is an AiPlayer.
+
+    The action is an index into ACTION_DIRECTIONS, the observation an OBSERVATION_SIZE float32 array.
+    The reward is 1 for a won and -1 for a lost game, plus hit_reward whenever the agent returns the ball.
+    A game running for max_ticks is truncated.
+    """
+    tick_seconds: float
+    max_ticks: int
+    hit_reward: float
+    game: Game
+    agent: Player
+    opponent: AiPlayer
+    ticks: int
+    image: Optional[BoardImage]
+
+    def __init__(self, tick_seconds: float = 1 / 60, max_ticks: int = 3600, hit_reward: float = 0.1,
+                 render: bool = False) -> None:
+        self.tick_seconds = tick_seconds
+        self.max_ticks = max_ticks
+        self.hit_reward = hit_reward
+        self.render_enabled = render
+        self.observation = numpy.zeros(OBSERVATION_SIZE, dtype=numpy.float32)
+        self.reward = 0.0
+        self.ticks = 0
+        self.image = None
+        self.create_game()
+
+    def create_game(self):
+        self.agent = create_player(BOARD, {"name": "agent", "ai": False}, False)
+        self.opponent = create_player(BOARD, {"name": "opponent", "ai": True}, True)
+        ball = Ball(Rect(BOARD.center, BALL_SIZE), BOARD, Vector2(), 5, BALL_SPEED)
+        self.game = Game(ball, self.agent, self.opponent, BOARD)
+        self.opponent.game = self.game
+        self.game.time_to_last_tick = self.tick_seconds
+        self.game.collision_listeners.append(self.on_collision)
+
+        if self.render_enabled:
+            self.image = BoardImage(ball, self.agent, self.opponent)
+
+    def on_collision(self, _: Game, collision: Collision):
+        if collision == Collision.LEFT_PLAYER:
+            self.reward += self.hit_reward
+
+    def reset(self, seed: Optional[int] = None) -> Tuple[numpy.ndarray, Dict]:
+        # Game.start picks the direction of the ball with the random module
+        if seed is not None:
+            random.seed(seed)
+
+        self.create_game()
+        self.game.start()
+        self.ticks = 0
+        return self.observe(), {}
+
+    def observe(self) -> numpy.ndarray:
+        ball = self.game.ball
+        return observation(ball.rect.x, ball.rect.y, ball.direction.x, ball.direction.y, ball.speed,
+                           self.agent.rect.y, self.opponent.rect.y, self.observation).copy()
+
+    def step(self, action: int) -> Tuple[numpy.ndarray, float, bool, bool, Dict]:
+        """Returns observation, reward, terminated, truncated and info like a gym environment."""
+        if not self.game.is_running():
+            raise RuntimeError("the game is not running, call reset first")
+
+        self.reward = 0.0
+        y = self.agent.rect.y + ACTION_DIRECTIONS[action] * int(BAR_SPEED * self.tick_seconds)
+        # the ai bar ignores the position passed to it
+        self.game.tick(y, y)
+        self.ticks += 1
+
+        terminated = self.game.is_finished()
+        if terminated:
+            self.reward += 1.0 if self.game.player_won is self.agent else -1.0
+        truncated = not terminated and self.ticks >= self.max_ticks
+        return self.observe(), self.reward, terminated, truncated, {}
+
+    def render(self) -> numpy.ndarray:
+        """The board as a read only (height, width, 3) uint8 array, needs render=True."""
+        if self.image is None:
+            raise RuntimeError("the environment was created without rendering")
+        return self.image.render()
+
+
+class VectorPongEnv:
+    """
+    Many PongEnv games stepped at once, with the rules of Game and the tracking of AiPlayer
+    written as NumPy operations over arrays with one entry per game.
+
+    Games which terminated or were truncated are reset right away, the observation returned for
+    them is the first one of their next game.
+    """
+    count: int
+    tick_seconds: float
+    max_ticks: int
+    hit_reward: float
+
+    def __init__(self, count: int, tick_seconds: float = 1 / 60, max_ticks: int = 3600, hit_reward: float = 0.1,
+                 render: bool = False, seed: Optional[int] = None) -> None:
+        self.count = count
+        self.tick_seconds = tick_seconds
+        self.max_ticks = max_ticks
+        self.hit_reward = hit_reward
+        self.random = numpy.random.default_rng(seed)
+        self.position_x = numpy.zeros(count)
+        self.position_y = numpy.zeros(count)
+        self.rect_x = numpy.zeros(count, dtype=numpy.int64)
+        self.rect_y = numpy.zeros(count, dtype=numpy.int64)
+        self.direction_x = numpy.zeros(count)
+        self.direction_y = numpy.zeros(count)
+        self.speed = numpy.zeros(count)
+        self.agent_y = numpy.zeros(count, dtype=numpy.int64)
+        self.opponent_y = numpy.zeros(count, dtype=numpy.int64)
+        self.opponent_speed = numpy.zeros(count)
+        self.ticks = numpy.zeros(count, dtype=numpy.int64)
+        self.observations = numpy.zeros((count, OBSERVATION_SIZE), dtype=numpy.float32)
+        self.image = None
+
+        if render:
+            ball = Ball(Rect(BOARD.center, BALL_SIZE), BOARD, Vector2(), 5, BALL_SPEED)
+            left = Player(Rect((BOARD.left, BOARD.centery), BAR_SIZE), BOARD, "agent")
+            right = Player(Rect((BOARD.right - BAR_SIZE[0], BOARD.centery), BAR_SIZE), BOARD, "opponent")
+            self.image = BoardImage(ball, left, right)
+
+    def reset(self, seed: Optional[int] = None) -> Tuple[numpy.ndarray, Dict]:
+        if seed is not None:
+            self.random = numpy.random.default_rng(seed)
+        self.reset_games(numpy.ones(self.count, dtype=bool))
+        return self.observe(), {}
+
+    def reset_games(self, games: numpy.ndarray):
+        """Starts new games where games is true, like Game.start does."""
+        count = int(games.sum())
+
+        if not count:
+            return
+
+        # the ball heads from the center to a random point of the board, steep headings are drawn again
+        direction_x = numpy.zeros(count)
+        direction_y = numpy.zeros(count)
+        steep = numpy.ones(count, dtype=bool)
+        while steep.any():
+            redrawn = int(steep.sum())
+            destination_x = self.random.integers(0, BOARD.right, redrawn, endpoint=True) - 2.5
+            destination_y = self.random.integers(0, BOARD.bottom, redrawn, endpoint=True) - 2.5
+            heading_x = destination_x - BOARD.centerx
+            heading_y = destination_y - BOARD.centery
+            length = numpy.sqrt(heading_x * heading_x + heading_y * heading_y)
+            # the length of a heading to the exact center is 0, like Vector2 such a ball gets no direction
+            length[length == 0] = numpy.inf
+            direction_x[steep] = heading_x / length
+            direction_y[steep] = heading_y / length
+            steep = numpy.abs(direction_x) < MIN_SERVE_DIRECTION_X
+
+        self.direction_x[games] = direction_x
+        self.direction_y[games] = direction_y
+        self.position_x[games] = BOARD.centerx
+        self.position_y[games] = BOARD.centery
+        self.rect_x[games] = BOARD.centerx
+        self.rect_y[games] = BOARD.centery
+        self.speed[games] = BALL_SPEED
+        self.agent_y[games] = BOARD.centery
+        self.opponent_y[games] = BOARD.centery
+        self.opponent_speed[games] = BAR_SPEED
+        self.ticks[games] = 0
+
+    def observe(self) -> numpy.ndarray:
+        return observation(self.rect_x, self.rect_y, self.direction_x, self.direction_y, self.speed, self.agent_y,
+                           self.opponent_y, self.observations).copy()
+
+    def step(self, actions: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray, Dict]:
+        """Ticks every game, returns observations, rewards, terminated, truncated and info as arrays."""
+        ball_width, ball_height = BALL_SIZE
+        bar_width, bar_height = BAR_SIZE
+        seconds = self.tick_seconds
+        rect_x, rect_y = self.rect_x, self.rect_y
+        rewards = numpy.zeros(self.count, dtype=numpy.float32)
+
+        # the bars, as in Game.handle_bar_ball_collision
+        left_plane = BOARD.left + bar_width
+        hit = ((self.agent_y < rect_y + ball_height) & (self.agent_y + bar_height > rect_y)
+               & (rect_x <= left_plane))
+        rewards[hit & (self.direction_x < 0)] = self.hit_reward
+        numpy.copysign(self.direction_x, numpy.where(hit, 1.0, self.direction_x), out=self.direction_x)
+        rect_x[hit] = left_plane
+
+        right_plane = BOARD.right - bar_width - ball_width
+        hit = ((self.opponent_y < rect_y + ball_height) & (self.opponent_y + bar_height > rect_y)
+               & (rect_x >= right_plane))
+        numpy.copysign(self.direction_x, numpy.where(hit, -1.0, self.direction_x), out=self.direction_x)
+        rect_x[hit] = right_plane
+
+        # the walls, as in Game.handle_wall_ball_collision
+        top = rect_y <= BOARD.top
+        numpy.copysign(self.direction_y, numpy.where(top, 1.0, self.direction_y), out=self.direction_y)
+        rect_y[top] = BOARD.top
+        bottom = rect_y >= BOARD.bottom - ball_height
+        numpy.copysign(self.direction_y, numpy.where(bottom, -1.0, self.direction_y), out=self.direction_y)
+        rect_y[bottom] = BOARD.bottom - ball_height
+
+        lost = rect_x <= BOARD.left
+        won = ~lost & (rect_x >= BOARD.right - ball_width)
+        terminated = lost | won
+        running = ~terminated
+        rewards[won] += 1.0
+        rewards[lost] -= 1.0
+
+        # the agent bars, as in Player.move
+        agent_y = self.agent_y + ACTION_DIRECTIONS[actions] * int(BAR_SPEED * seconds)
+        numpy.clip(agent_y, BOARD.top, BOARD.bottom - bar_height, out=agent_y)
+        self.agent_y[running] = agent_y[running]
+
+        # the opponent bars, as in AiPlayer.move
+        tracking = running & (self.direction_x > 0)
+        # games with the ball moving away divide by zero or get negative ticks, their bars are not moved
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            ticks = (BOARD.right - (rect_x + ball_width)) // self.direction_x
+            target_y = ticks * self.direction_y + (rect_y + ball_height // 2)
+            moved = numpy.sign(target_y - (self.opponent_y + bar_height // 2)) * (seconds * self.opponent_speed)
+            opponent_y = self.opponent_y + numpy.nan_to_num(moved).astype(numpy.int64)
+        numpy.clip(opponent_y, BOARD.top, BOARD.bottom - bar_height, out=opponent_y)
+        self.opponent_y[tracking] = opponent_y[tracking]
+        speed = self.opponent_speed[tracking]
+        self.opponent_speed[tracking] = numpy.minimum(speed + speed * AI_SPEEDUP * seconds, AI_MAX_SPEED)
+
+        # the balls, as in Ball.move_to_time
+        distance = seconds * self.speed
+        position_x = self.position_x + self.direction_x * distance
+        position_y = self.position_y + self.direction_y * distance
+        self.position_x[running] = position_x[running]
+        self.position_y[running] = position_y[running]
+        moved_x = numpy.clip(position_x.astype(numpy.int64), BOARD.left, BOARD.right - ball_width)
+        moved_y = numpy.clip(position_y.astype(numpy.int64), BOARD.top, BOARD.bottom - ball_height)
+        rect_x[running] = moved_x[running]
+        rect_y[running] = moved_y[running]
+        speed = self.speed[running]
+        self.speed[running] = numpy.minimum(speed + speed * BALL_SPEEDUP * seconds, BALL_MAX_SPEED)
+
+        self.ticks += 1
+        truncated = running & (self.ticks >= self.max_ticks)
+        self.reset_games(terminated | truncated)
+        return self.observe(), rewards, terminated, truncated, {}
+
+    def render(self, index: int = 0) -> numpy.ndarray:
+        """The board of one game as a read only (height, width, 3) uint8 array, needs render=True."""
+        if self.image is None:
+            raise RuntimeError("the environment was created without rendering")
+
+        # the board image draws a scratch ball and bars, they are moved to the game first
+        self.image.left_player.rect.y = self.agent_y[index]
+        self.image.right_player.rect.y = self.opponent_y[index]
+        self.image.ball.rect.topleft = (self.rect_x[index], self.rect_y[index])
+        return self.image.render()
+
+
+def benchmark(steps: int = 20000):
+    """Compares the steps per second of PongEnv with VectorPongEnv of several sizes, and of rendering."""
+    random_actions = numpy.random.default_rng(0)
+
+    env = PongEnv()
+    env.reset(seed=0)
+    actions = random_actions.integers(0, ACTION_COUNT, steps)
+    games = 0
+    start = time.perf_counter()
+    for action in actions:
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+            games += 1
+    elapsed = time.perf_counter() - start
+    print("env                steps/s     games")
+    print("{:<16}  {:>9.0f}  {:>8}".format("PongEnv", steps / elapsed, games))
+
+    for count in (1, 64, 1024, 16384):
+        vector_env = VectorPongEnv(count, seed=0)
+        vector_env.reset()
+        vector_steps = max(100, steps // count)
+        actions = random_actions.integers(0, ACTION_COUNT, (vector_steps, count))
+        games = 0
+        start = time.perf_counter()
+        for step_actions in actions:
+            _, _, terminated, truncated, _ = vector_env.step(step_actions)
+            games += int(terminated.sum() + truncated.sum())
+        elapsed = time.perf_counter() - start
+        print("{:<16}  {:>9.0f}  {:>8}".format("Vector x{}".format(count), vector_steps * count / elapsed, games))
+
+    env = PongEnv(render=True)
+    env.reset(seed=0)
+    start = time.perf_counter()
+    for _ in range(1000):
+        if not env.game.is_running():
+            env.reset()
+        env.step(0)
+        env.render()
+    print("{:<16}  {:>9.0f}".format("PongEnv render", 1000 / (time.perf_counter() - start)))
+
+
+if __name__ == '__main__':
+    benchmark()
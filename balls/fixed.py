@@ -0,0 +1,397 @@
+import struct
+import time
+import zlib
+from array import array
+from math import isqrt
+from random import Random
+from typing import List, Optional
+
+from pygame.rect import Rect
+
+from balls.clock import Clock
+from balls.game import Ball, Game, GameArguments, GameState, Player, PlayerArguments
+
+# positions and speeds are in 1/256 pixels
+SUBPIXEL_BITS = 8
+# directions are unit vectors scaled by 1 << 16
+DIRECTION_BITS = 16
+DIRECTION_ONE = 1 << DIRECTION_BITS
+# saved hashes are little endian 4 byte crc32 values, the item size of array("L") differs between platforms
+HASH = struct.Struct("<I")
+
+
+class FixedDirection:
+    """Integer direction with the x and y attributes of Vector2, so the collision handlers of Game can flip it."""
+    __slots__ = ("x", "y")
+
+    def __init__(self, x: int = 0, y: int = 0) -> None:
+        self.x = x
+        self.y = y
+
+    def __repr__(self) -> str:
+        return "FixedDirection({}, {})".format(self.x, self.y)
+
+
+def normalized_direction(x: int, y: int) -> FixedDirection:
+    squared = x * x + y * y
+    length = isqrt(squared)
+    # round the length up, so no component ends up longer than DIRECTION_ONE
+    if length * length < squared:
+        length += 1
+    return FixedDirection(x * DIRECTION_ONE // length, y * DIRECTION_ONE // length)
+
+
+class FixedPointBall(Ball):
+    """
+    A ball moved with integers only: position in subpixels, direction scaled by DIRECTION_ONE,
+    speed in subpixels per second and time in whole milliseconds. The rect is derived from the
+    subpixel position, changes the collision handlers make to the rect are taken over before moving.
+    """
+    direction: FixedDirection
+    x: int
+    y: int
+    speed: int
+    speedup_permille: int
+
+    def __init__(self, rect: Rect, boundary: Rect, radius: int, speed: int, speedup_permille: int = 100) -> None:
+        super().__init__(rect, boundary, FixedDirection(), radius, speed << SUBPIXEL_BITS)
+        self.x = rect.x << SUBPIXEL_BITS
+        self.y = rect.y << SUBPIXEL_BITS
+        self.speedup_permille = speedup_permille
+
+    def reset(self):
+        super().reset()
+        self.x = self.rect.x << SUBPIXEL_BITS
+        self.y = self.rect.y << SUBPIXEL_BITS
+
+    def sync_from_rect(self):
+        if self.rect.x != self.x >> SUBPIXEL_BITS:
+            self.x = self.rect.x << SUBPIXEL_BITS
+        if self.rect.y != self.y >> SUBPIXEL_BITS:
+            self.y = self.rect.y << SUBPIXEL_BITS
+
+    def move_to_time(self, time_to_last_tick: float):
+        self.move_ms(round(time_to_last_tick * 1000))
+
+    def move_ms(self, milliseconds: int):
+        self.sync_from_rect()
+        distance = self.speed * milliseconds // 1000
+        self.x += self.direction.x * distance >> DIRECTION_BITS
+        self.y += self.direction.y * distance >> DIRECTION_BITS
+        self.rect.x = self.x >> SUBPIXEL_BITS
+        self.rect.y = self.y >> SUBPIXEL_BITS
+        self.check_boundary()
+        self.sync_from_rect()
+        self.speed += self.speed * self.speedup_permille * milliseconds // 1000000
+
+
+class FixedPointAiPlayer(Player):
+    """The AiPlayer strategy in integers, with the speed in subpixels per second."""
+    game: "FixedPointGame"
+    speed: int
+    right_side: bool
+    speedup_permille: int
+    start_speed: int
+
+    def __init__(self, rect: Rect, boundary: Rect, name: str, right_side: bool) -> None:
+        super().__init__(rect, boundary, name)
+        self.speed = 300 << SUBPIXEL_BITS
+        self.start_speed = self.speed
+        self.right_side = right_side
+        self.speedup_permille = 90
+
+    def reset(self):
+        super().reset()
+        self.speed = self.start_speed
+
+    def move(self, x: int, y: int):
+        ball = self.game.ball
+        direction_x = ball.direction.x
+
+        # a ball moving straight up or down never reaches a bar
+        if direction_x == 0:
+            return
+        elif direction_x < 0 and self.right_side:
+            return
+        elif direction_x > 0 and not self.right_side:
+            return
+
+        if self.right_side:
+            distance = self.game.screen_rect.right - ball.rect.right
+        else:
+            distance = self.game.screen_rect.left - ball.rect.left
+        y = distance * ball.direction.y // direction_x + ball.rect.centery
+
+        if y < self.rect.centery:
+            direction = -1
+        elif y > self.rect.centery:
+            direction = 1
+        else:
+            direction = 0
+
+        milliseconds = self.game.tick_ms
+        moved = direction * (self.speed * milliseconds // 1000 >> SUBPIXEL_BITS)
+        super(Player, self).move(0, moved)
+        self.speed += self.speed * self.speedup_permille * milliseconds // 1000000
+
+
+class FixedPointGame(Game):
+    """
+    A Game whose ticks only use integer math, so the same seed and inputs give bit-exact
+    identical states on every machine. Time passes in whole milliseconds via tick_ms,
+    the start direction comes from a Random seeded with `seed`. The clock only times the
+    game for elapsed() and stays out of the states, a VirtualClock makes that repeatable too.
+    """
+    ball: FixedPointBall
+    tick_ms: int
+    ticks: int
+    seed: int
+    random: Random
+
+    STATE_FORMAT = struct.Struct("<qqqqqqqqqqqqB")
+
+    def __init__(self, ball: FixedPointBall, left_player: Player, right_player: Player, board_rect: Rect,
+                 seed: int = 0, rounds_to_win: int = 1, clock: Optional[Clock] = None) -> None:
+        super().__init__(ball, left_player, right_player, board_rect, rounds_to_win, clock)
+        self.seed = seed
+        self.random = Random(seed)
+        self.tick_ms = 0
+        self.ticks = 0
+
+    def reset(self) -> None:
+        super().reset()
+        # a reset game replays the same match as a new game with the seed
+        self.random.seed(self.seed)
+        self.ticks = 0
+
+    @property
+    def time_to_last_tick(self) -> float:
+        return self.tick_ms / 1000
+
+    @time_to_last_tick.setter
+    def time_to_last_tick(self, seconds: float):
+        self.tick_ms = round(seconds * 1000)
+
+    def serve(self) -> None:
+        center_x, center_y = self.screen_rect.center
+        direction_x = direction_y = 0
+
+        while direction_x == 0 and direction_y == 0:
+            direction_x = self.random.randint(0, self.screen_rect.right) - center_x
+            direction_y = self.random.randint(0, self.screen_rect.bottom) - center_y
+
+        self.ball.direction = normalized_direction(direction_x, direction_y)
+        self.game_state = GameState.RUNNING
+
+    def tick(self, left_player_pos: float, right_player_pos: float) -> None:
+        super().tick(int(left_player_pos), int(right_player_pos))
+        self.ticks += 1
+
+    def snapshot(self) -> tuple:
+        """Everything the next tick depends on as plain ints, restore() brings the game back to it."""
+        ball = self.ball
+        return (self.ticks, ball.x, ball.y, ball.direction.x, ball.direction.y, ball.speed,
+                self.left_player.rect.y, self.right_player.rect.y,
+                getattr(self.left_player, "speed", 0), getattr(self.right_player, "speed", 0),
+                self.left_score, self.right_score, self.game_state.value)
+
+    def restore(self, snapshot: tuple):
+        (self.ticks, x, y, direction_x, direction_y, speed, left_y, right_y, left_speed, right_speed,
+         self.left_score, self.right_score, state) = snapshot
+        ball = self.ball
+        ball.x, ball.y = x, y
+        ball.rect.x, ball.rect.y = x >> SUBPIXEL_BITS, y >> SUBPIXEL_BITS
+        ball.direction = FixedDirection(direction_x, direction_y)
+        ball.speed = speed
+        self.left_player.rect.y = left_y
+        self.right_player.rect.y = right_y
+
+        if hasattr(self.left_player, "speed"):
+            self.left_player.speed = left_speed
+        if hasattr(self.right_player, "speed"):
+            self.right_player.speed = right_speed
+        self.game_state = GameState(state)
+
+    def state(self) -> bytes:
+        return self.STATE_FORMAT.pack(*self.snapshot())
+
+    def state_hash(self) -> int:
+        return zlib.crc32(self.state())
+
+
+def create_fixed_game(area: Rect, arguments: GameArguments, seed: int = 0,
+                      clock: Optional[Clock] = None) -> FixedPointGame:
+    left_player = create_fixed_player(area, arguments["left_player"], False)
+    right_player = create_fixed_player(area, arguments["right_player"], True)
+
+    ball = FixedPointBall(Rect(area.center, (10, 5)), area, 5, 250)
+    current_game = FixedPointGame(ball, left_player, right_player, area, seed, arguments.get("rounds") or 1, clock)
+
+    for player in (left_player, right_player):
+        if isinstance(player, FixedPointAiPlayer):
+            player.game = current_game
+    return current_game
+
+
+def create_fixed_player(area: Rect, arguments: PlayerArguments, right_side: bool) -> Player:
+    width = (arguments["width"] if "width" in arguments else 10)
+    height = (arguments["height"] if "height" in arguments else 100)
+    left = area.right - width if right_side else area.left
+
+    player_rect = Rect(left, area.centery, width, height)
+    if arguments["ai"]:
+        return FixedPointAiPlayer(player_rect, area, arguments["name"], right_side)
+    return Player(player_rect, area, arguments["name"])
+
+
+class DivergenceChecker:
+    """
+    Records the state hash of every tick and compares it against the hashes of a reference run,
+    e.g. one loaded from another machine. diverged_at is the first tick whose hash differed.
+    """
+    hashes: array
+    reference: Optional[array]
+    diverged_at: Optional[int]
+
+    def __init__(self, reference: Optional[array] = None) -> None:
+        self.hashes = array("L")
+        self.reference = reference
+        self.diverged_at = None
+
+    def record(self, current_game: FixedPointGame) -> int:
+        state_hash = current_game.state_hash()
+        index = len(self.hashes)
+        self.hashes.append(state_hash)
+
+        if (self.diverged_at is None and self.reference is not None and index < len(self.reference)
+                and self.reference[index] != state_hash):
+            self.diverged_at = index
+        return state_hash
+
+    def save(self, path: str):
+        with open(path, "wb") as file:
+            file.write(struct.pack("<{}I".format(len(self.hashes)), *self.hashes))
+
+    @staticmethod
+    def load(path: str) -> array:
+        with open(path, "rb") as file:
+            data = file.read()
+        return array("L", (state_hash for state_hash, in HASH.iter_unpack(data)))
+
+
+def simulate(seed: int, ticks: int, tick_ms: int = 16, checker: Optional[DivergenceChecker] = None,
+             max_game_ticks: int = 10000) -> List[int]:
+    """
+    Runs ai versus ai games for the ticks and returns the state hashes. A new game is started when one
+    finished or ran for max_game_ticks, a nearly vertical ball may never reach a bar and only speeds up.
+    """
+    area = Rect(0, 50, 640, 430)
+    arguments: GameArguments = {
+        "left_player": {"name": "left", "ai": True},
+        "right_player": {"name": "right", "ai": True},
+    }
+    checker = DivergenceChecker() if checker is None else checker
+    current_game = create_fixed_game(area, arguments, seed)
+    current_game.start()
+    current_game.tick_ms = tick_ms
+
+    for _ in range(ticks):
+        if current_game.is_finished() or current_game.ticks >= max_game_ticks:
+            current_game = create_fixed_game(area, arguments, current_game.random.randrange(1 << 32))
+            current_game.start()
+            current_game.tick_ms = tick_ms
+        current_game.tick(0, 0)
+        checker.record(current_game)
+    return list(checker.hashes)
+
+
+def benchmark(ticks: int = 50000):
+    """Compares ticking and snapshotting the float Game with the fixed point one and checks determinism."""
+    from balls.game import create_game
+    from vector2 import Vector2
+
+    area = Rect(0, 50, 640, 430)
+    arguments: GameArguments = {
+        "left_player": {"name": "left", "ai": True},
+        "right_player": {"name": "right", "ai": True},
+    }
+    float_state = struct.Struct("<qdddddqqddB")
+
+    def float_snapshot(current_game: Game, tick: int) -> tuple:
+        ball = current_game.ball
+        # the float vectors are mutated in place, a snapshot needs copies of them
+        return (tick, Vector2(ball.position.x, ball.position.y), Vector2(ball.direction.x, ball.direction.y),
+                ball.speed, current_game.left_player.rect.y, current_game.right_player.rect.y,
+                current_game.left_player.speed, current_game.right_player.speed, current_game.game_state.value)
+
+    def create_float_game() -> Game:
+        current_game = create_game(area, arguments)
+        current_game.right_player.game = current_game
+        current_game.start()
+        current_game.time_to_last_tick = 0.016
+        return current_game
+
+    def float_state_hash(current_game: Game, tick: int) -> int:
+        ball = current_game.ball
+        return zlib.crc32(float_state.pack(
+            tick, ball.position.x, ball.position.y, ball.direction.x, ball.direction.y, ball.speed,
+            current_game.left_player.rect.y, current_game.right_player.rect.y,
+            current_game.left_player.speed, current_game.right_player.speed, current_game.game_state.value))
+
+    float_game = create_float_game()
+    game_ticks = 0
+    start = time.perf_counter()
+    for _ in range(ticks):
+        if float_game.is_finished() or game_ticks >= 10000:
+            float_game = create_float_game()
+            game_ticks = 0
+        float_game.tick(0, 0)
+        game_ticks += 1
+    float_tick = (time.perf_counter() - start) / ticks
+
+    start = time.perf_counter()
+    for index in range(ticks):
+        float_state_hash(float_game, index)
+    float_hash = (time.perf_counter() - start) / ticks
+
+    start = time.perf_counter()
+    for index in range(ticks):
+        float_snapshot(float_game, index)
+    float_copy = (time.perf_counter() - start) / ticks
+
+    start = time.perf_counter()
+    simulate(1, ticks)
+    fixed_tick_and_hash = (time.perf_counter() - start) / ticks
+
+    fixed_game = create_fixed_game(area, arguments, 1)
+    fixed_game.start()
+    start = time.perf_counter()
+    for _ in range(ticks):
+        fixed_game.state_hash()
+    fixed_hash = (time.perf_counter() - start) / ticks
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        fixed_game.snapshot()
+    fixed_copy = (time.perf_counter() - start) / ticks
+
+    print("                  us/tick  us/snapshot  us/snapshot + hash")
+    print("float game:       {:>7.2f}  {:>11.2f}  {:>18.2f}".format(float_tick * 1e6, float_copy * 1e6,
+                                                                     float_hash * 1e6))
+    print("fixed point game: {:>7.2f}  {:>11.2f}  {:>18.2f}".format(
+        (fixed_tick_and_hash - fixed_hash) * 1e6, fixed_copy * 1e6, fixed_hash * 1e6))
+
+    first = simulate(7, ticks)
+    checker = DivergenceChecker(array("L", first))
+    simulate(7, ticks, checker=checker)
+    print("two runs of seed 7 over {} ticks diverged at: {}".format(ticks, checker.diverged_at))
+
+    tampered = array("L", first)
+    tampered[ticks // 2] ^= 1
+    checker = DivergenceChecker(tampered)
+    simulate(7, ticks, checker=checker)
+    print("against a tampered reference diverged at: {} (expected {})".format(checker.diverged_at, ticks // 2))
+
+
+if __name__ == '__main__':
+    benchmark()
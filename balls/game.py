@@ -1,21 +1,38 @@
+import time
 from abc import ABC
-from datetime import datetime
 from enum import Enum
 from random import randint
-from typing import Union, Optional, TypedDict
+from typing import Union, Optional, TypedDict, Callable, List
 
 from pygame.rect import Rect
 
+from balls.clock import Clock, WallClock
+from balls.log import get_logger
 from vector2 import Vector2
 
+log = get_logger("balls.game")
+
+# games move by this fixed step whatever the frame rate, so they play the same on every machine
+TICK_SECONDS = 1 / 120
+# a frame ticks a game at most this often, the time of a longer stall is dropped instead of caught up
+MAX_ADVANCE_STEPS = 120
+# serves are at most 60 degrees off the horizontal, bounces keep it that way
+MIN_SERVE_DIRECTION_X = 0.5
+
 
 class MovableUnit(ABC):
     rect: Rect
     boundary: Rect
+    start: Rect
 
     def __init__(self, rect: Rect, boundary: Rect) -> None:
         self.rect = rect
         self.boundary = boundary
+        self.start = Rect(rect)
+
+    def reset(self):
+        """Moves the unit back to where it was created, keeping the same rect."""
+        self.rect.update(self.start)
 
     def move(self, x: float, y: float):
         self.rect.move_ip(x, y)
@@ -42,14 +59,28 @@ class Ball(MovableUnit):
     speed: int
     position: Vector2
     speedup_factor: float
+    start_speed: int
+    # the speedup stops here, an endless rally would otherwise move the ball beyond what a rect can hold,
+    # high enough above the one of the ai bars that they still fall behind the ball
+    max_speed: int
 
     def __init__(self, rect: Rect, boundary: Rect, direction: Vector2, radius: int, speed: int) -> None:
         super().__init__(rect, boundary)
         self.radius = radius
         self.direction = direction
         self.speed = speed
+        self.start_speed = speed
         self.position = Vector2(rect.left, rect.top)
         self.speedup_factor = 0.1
+        self.max_speed = 20000
+
+    def reset(self):
+        super().reset()
+        self.position.x = self.rect.left
+        self.position.y = self.rect.top
+        self.direction.x = 0
+        self.direction.y = 0
+        self.speed = self.start_speed
 
     def move(self, x: int, y: int):
         self.rect.move_ip(x, y)
@@ -60,7 +91,7 @@ class Ball(MovableUnit):
         self.rect.x = int(self.position.x)
         self.rect.y = int(self.position.y)
         self.check_boundary()
-        self.speed += self.speed * self.speedup_factor * time_to_last_tick
+        self.speed = min(self.speed + self.speed * self.speedup_factor * time_to_last_tick, self.max_speed)
 
 
 class Player(MovableUnit):
@@ -83,12 +114,21 @@ class AiPlayer(Player):
     speed: int
     right_side: bool
     speedup_factor: float
+    start_speed: int
+    # reached about 3 seconds after the ball reached its own
+    max_speed: int
 
     def __init__(self, rect: Rect, boundary: Rect, name: str, right_side: bool) -> None:
         super().__init__(rect, boundary, name)
         self.speed = 300
+        self.start_speed = 300
         self.right_side = right_side
         self.speedup_factor = 0.09
+        self.max_speed = 20000
+
+    def reset(self):
+        super().reset()
+        self.speed = self.start_speed
 
     def move(self, x: float, y: float):
         ball_direction = self.game.ball.direction
@@ -114,7 +154,7 @@ class AiPlayer(Player):
         distance_moved = self.game.time_to_last_tick * self.speed
         moved = int(direction * distance_moved)
         super(Player, self).move(0, moved)
-        self.speed += self.speed * self.speedup_factor * self.game.time_to_last_tick
+        self.speed = min(self.speed + self.speed * self.speedup_factor * self.game.time_to_last_tick, self.max_speed)
 
 
 class GameState(Enum):
@@ -124,11 +164,25 @@ class GameState(Enum):
     FINISHED = 3
 
 
+class Collision(Enum):
+    LEFT_PLAYER = 0
+    RIGHT_PLAYER = 1
+    TOP_WALL = 2
+    BOTTOM_WALL = 3
+    LEFT_WALL = 4
+    RIGHT_WALL = 5
+
+
+CollisionListener = Callable[["Game", Collision], None]
+TickListener = Callable[["Game"], None]
+
+
 class PlayerArguments(TypedDict):
     width: Optional[int]
     height: Optional[int]
     name: str
     ai: bool
+    lookahead: Optional[bool]
 
 
 class BallArguments(TypedDict):
@@ -138,19 +192,21 @@ class BallArguments(TypedDict):
 class GameArguments(TypedDict):
     left_player: PlayerArguments
     right_player: PlayerArguments
+    # rounds a player needs to win the game, 1 if missing
+    rounds: Optional[int]
 
 
-def create_game(area, arguments: GameArguments) -> "Game":
+def create_game(area, arguments: GameArguments, clock: Optional[Clock] = None) -> "Game":
     left_player = create_player(area, arguments["left_player"], False)
     right_player = create_player(area, arguments["right_player"], True)
 
     ball = Ball(Rect(area.center, (10, 5)), area, Vector2(), 5, 250)
-    current_game = Game(ball, left_player, right_player, area)
+    current_game = Game(ball, left_player, right_player, area, arguments.get("rounds") or 1, clock)
 
     if arguments["left_player"]["ai"]:
         left_player.game = current_game
 
-    if arguments["left_player"]["ai"]:
+    if arguments["right_player"]["ai"]:
         right_player.game = current_game
     return current_game
 
@@ -165,7 +221,11 @@ def create_player(area: Rect, arguments: PlayerArguments, right_side: bool) -> P
     top = area.centery
 
     player_rect = Rect(left, top, width, height)
-    if arguments["ai"]:
+    if arguments["ai"] and arguments.get("lookahead"):
+        # the ai module builds on this one
+        from balls.ai import LookaheadAiPlayer
+        left_player = LookaheadAiPlayer(player_rect, area, arguments["name"], right_side)
+    elif arguments["ai"]:
         left_player = AiPlayer(player_rect, area, arguments["name"], right_side)
     else:
         left_player = Player(player_rect, area, arguments["name"])
@@ -179,27 +239,88 @@ class Game:
     right_player: Player
     screen_rect: Rect
     time_to_last_tick: float
-    started_at: Optional[datetime]
+    # when the game started on its clock
+    started_at: Optional[float]
     player_won: Optional[Player]
-
-    def __init__(self, ball: Ball, left_player: Player, right_player: Player, board_rect: Rect) -> None:
+    collision_listeners: List[CollisionListener]
+    tick_listeners: List[TickListener]
+    rounds_to_win: int
+    left_score: int
+    right_score: int
+    clock: Clock
+
+    def __init__(self, ball: Ball, left_player: Player, right_player: Player, board_rect: Rect,
+                 rounds_to_win: int = 1, clock: Optional[Clock] = None) -> None:
         self.screen_rect = board_rect
         self.right_player = right_player
         self.left_player = left_player
         self.ball = ball
         self.game_state = GameState.WAIT_TO_START
         self.time_to_last_tick = 0
+        self.started_at = None
+        self.player_won = None
+        self.collision_listeners = []
+        self.tick_listeners = []
+        self.rounds_to_win = rounds_to_win
+        self.left_score = 0
+        self.right_score = 0
+        self.clock = WallClock() if clock is None else clock
+
+    def reset(self) -> None:
+        """
+        Puts the game back to before its start for another match. The ball, the players and the listeners
+        stay the same objects, so whatever draws or observes the game keeps working without rebuilding.
+        """
+        self.reset_units()
+        self.game_state = GameState.WAIT_TO_START
+        self.time_to_last_tick = 0
+        self.started_at = None
         self.player_won = None
+        self.left_score = 0
+        self.right_score = 0
+
+    def reset_units(self):
+        self.ball.reset()
+        self.left_player.reset()
+        self.right_player.reset()
 
     def start(self) -> None:
-        y_direction = randint(0, self.screen_rect.bottom)
-        x_direction = randint(0, self.screen_rect.right)
-        destination = Vector2(x_direction, y_direction) - (Vector2(5, 5) / 2)
-        heading = Vector2.from_points(self.screen_rect.center, destination)
-        heading.normalize()
-        self.ball.direction = heading
+        self.started_at = self.clock.now()
+        self.serve()
+
+    def serve(self) -> None:
+        # a nearly vertical ball takes minutes to reach a bar and then sweeps over all of it, no bar misses it
+        heading = Vector2()
+        while abs(heading.x) < MIN_SERVE_DIRECTION_X:
+            y_direction = randint(0, self.screen_rect.bottom)
+            x_direction = randint(0, self.screen_rect.right)
+            destination = Vector2(x_direction, y_direction) - (Vector2(5, 5) / 2)
+            heading = Vector2.from_points(self.screen_rect.center, destination)
+            heading.normalize()
+        self.ball.direction.x = heading.x
+        self.ball.direction.y = heading.y
         self.game_state = GameState.RUNNING
-        self.started_at = datetime.now()
+
+    def elapsed(self) -> float:
+        """Seconds on the clock of the game since it started."""
+        return self.clock.now() - self.started_at
+
+    def advance(self, seconds: float, left_player_pos: float, right_player_pos: float, step: float = TICK_SECONDS,
+                max_steps: int = MAX_ADVANCE_STEPS) -> float:
+        """
+        Ticks the game by fixed steps for the passed seconds and returns the rest, less than a step,
+        to be passed on with the seconds of the next frame. Nothing is left once the game stopped running.
+        """
+        steps = 0
+
+        while seconds >= step and self.is_running():
+            if steps == max_steps:
+                return 0.0
+            seconds -= step
+            self.time_to_last_tick = step
+            self.tick(left_player_pos, right_player_pos)
+            steps += 1
+        return seconds if self.is_running() else 0.0
 
     def is_running(self):
         return self.game_state == GameState.RUNNING
@@ -212,20 +333,24 @@ class Game:
 
     def tick(self, left_player_pos: float, right_player_pos: float) -> None:
         if self.game_state != GameState.RUNNING:
-            print("cannot tick when not running")
+            log.warning("cannot tick when not running", state=self.game_state.name)
             return
 
         # handle collision of ball with other objects
+        direction_x = self.ball.direction.x
         self.handle_bar_ball_collision(self.left_player.rect, self.ball)
+        if self.ball.direction.x != direction_x:
+            self.notify_collision(Collision.LEFT_PLAYER)
+
+        direction_x = self.ball.direction.x
         self.handle_bar_ball_collision(self.right_player.rect, self.ball)
+        if self.ball.direction.x != direction_x:
+            self.notify_collision(Collision.RIGHT_PLAYER)
+
         game_result = self.handle_wall_ball_collision(self.screen_rect, self.ball)
 
         if game_result is not None:
-            self.game_state = GameState.FINISHED
-            if game_result:
-                self.player_won = self.left_player
-            else:
-                self.player_won = self.right_player
+            self.finish_round(game_result)
         else:
             # move player bars
             self.left_player.move(0, left_player_pos)
@@ -233,6 +358,35 @@ class Game:
 
             # calculate the next position for the ball
             self.ball.move_to_time(self.time_to_last_tick)
+        self.notify_tick()
+
+    def finish_round(self, left_won: bool):
+        """Scores the round, then either finishes the game or serves the next round from the start positions."""
+        if left_won:
+            self.left_score += 1
+            score = self.left_score
+        else:
+            self.right_score += 1
+            score = self.right_score
+
+        if score >= self.rounds_to_win:
+            self.game_state = GameState.FINISHED
+            self.player_won = self.left_player if left_won else self.right_player
+        else:
+            self.reset_units()
+            self.serve()
+
+    def notify_tick(self):
+        """Called at the end of every tick, including the one which finished the game."""
+        for listener in self.tick_listeners:
+            listener(self)
+
+    def notify_collision(self, collision: Collision):
+        if log.debug_enabled:
+            log.debug("collision", kind=collision.name, ball=tuple(self.ball.rect))
+
+        for listener in self.collision_listeners:
+            listener(self, collision)
 
     @staticmethod
     def handle_bar_ball_collision(bar_rect: Rect, ball: Ball):
@@ -280,18 +434,28 @@ class Game:
                 ball.direction.y = -ball.direction.y
             ball.move(0, rect.top + y_bound - ball.rect.y)
 
-        print("i am colliding: {} with {}, direction: {}".format(rect, self.ball.rect, self.ball.direction))
+        if log.debug_enabled:
+            log.debug("object collision", rect=tuple(rect), ball=tuple(self.ball.rect),
+                      direction=(self.ball.direction.x, self.ball.direction.y))
 
     def handle_wall_ball_collision(self, rect: Rect, ball: Ball) -> Union[bool, None]:
         # If the image goes off the end of the screen, move it back
+        direction_y = ball.direction.y
         self.handle_wall_top_collision(rect, ball)
         self.handle_wall_bottom_collision(rect, ball)
+
+        # only report bounces, the ball may touch a wall for several ticks
+        if ball.direction.y != direction_y:
+            self.notify_collision(Collision.TOP_WALL if ball.direction.y > 0 else Collision.BOTTOM_WALL)
+
         left_collided = self.handle_wall_left_collision(rect, ball)
         right_collided = self.handle_wall_right_collision(rect, ball)
 
         if left_collided:
+            self.notify_collision(Collision.LEFT_WALL)
             return False
         elif right_collided:
+            self.notify_collision(Collision.RIGHT_WALL)
             return True
         else:
             return None
@@ -331,3 +495,71 @@ class Game:
             ball.rect.right = rect.right
             return True
         return False
+
+
+def benchmark(matches: int = 200):
+    """Measures the time and the memory allocated to get the next match or round going, rebuilding against resetting."""
+    import tracemalloc
+
+    # the renderers build on this module
+    from balls import PingPongRenderer, StartupGameRenderer, TextureAtlas, create_game_renderer
+
+    master = PingPongRenderer()
+    master.display.open((640, 480), 0)
+    master.screen = master.display.screen
+    master.atlas = TextureAtlas()
+    arguments = StartupGameRenderer.get_game_arguments()
+    area = Rect(0, 50, 640, 430)
+
+    def rebuild_renderer():
+        create_game_renderer(master, StartupGameRenderer.get_game_arguments).game.start()
+
+    renderer = create_game_renderer(master, StartupGameRenderer.get_game_arguments)
+    renderer.game.start()
+
+    def rebuild_game():
+        create_game(area, arguments).start()
+
+    current_game = create_game(area, arguments)
+    current_game.start()
+
+    def reset_game():
+        current_game.reset()
+        current_game.start()
+
+    rounds_game = create_game(area, {**arguments, "rounds": matches * 10})
+    rounds_game.start()
+
+    def next_round():
+        rounds_game.finish_round(True)
+
+    def finish_match():
+        renderer.restart()
+        while renderer.game.is_running():
+            renderer.game.finish_round(True)
+        renderer.finished_renderer()
+
+    print("{:<28} {:>10} {:>10} {:>14}".format("", "mean us", "max us", "peak bytes"))
+    for name, function in (("new game and renderer", rebuild_renderer),
+                           ("RunningGameRenderer.restart", renderer.restart),
+                           ("new game", rebuild_game), ("Game.reset", reset_game), ("next round", next_round),
+                           ("restart and finish screen", finish_match)):
+        times = []
+        for _ in range(matches):
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        peak = 0
+        for _ in range(matches):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            function()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+        tracemalloc.stop()
+        print("{:<28} {:>10.1f} {:>10.1f} {:>14}".format(name, sum(times) / matches * 1e6, max(times) * 1e6, peak))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,227 @@
+import time
+from typing import Dict, Iterable
+
+import numpy
+from pygame.rect import Rect
+
+from balls.game import Collision, Game
+
+LEFT = 0
+RIGHT = 1
+ARRAYS = ("ball", "bars", "errors", "misses")
+
+
+class Heatmap:
+    """
+    Histograms of a board fed from the ticks of its games, without keeping the ticks themselves:
+
+    - ball: (rows, columns) ticks the ball spent in each cell
+    - bars: (2, rows) ticks the center of the left and right bar spent in each row
+    - errors: (rows, error bins) ball center minus bar center whenever the ball reached a bar,
+      by the row the ball arrived in, the error bins span -board height to +board height
+    - misses: (2, rows) balls the left and right bar missed, by the row they arrived in
+
+    The cells of a tick are collected in preallocated buffers and counted with one bincount per
+    buffer_ticks ticks. Histograms of the same board and cell size can be merged, e.g. the ones of
+    worker processes, the memory stays the same whatever number of games went into them.
+    """
+    board: Rect
+    cell: int
+    columns: int
+    rows: int
+    error_bins: int
+    ticks: int
+
+    def __init__(self, board: Rect, cell: int = 10, buffer_ticks: int = 1024) -> None:
+        self.board = Rect(board)
+        self.cell = cell
+        self.columns = -(-board.width // cell)
+        self.rows = -(-board.height // cell)
+        self.error_bins = 2 * self.rows
+        self.ball = numpy.zeros((self.rows, self.columns), dtype=numpy.int64)
+        self.bars = numpy.zeros((2, self.rows), dtype=numpy.int64)
+        self.errors = numpy.zeros((self.rows, self.error_bins), dtype=numpy.int64)
+        self.misses = numpy.zeros((2, self.rows), dtype=numpy.int64)
+        self.ticks = 0
+        self.ball_cells = numpy.zeros(buffer_ticks, dtype=numpy.intp)
+        # the left bar rows first, the right ones shifted by rows
+        self.bar_cells = numpy.zeros(2 * buffer_ticks, dtype=numpy.intp)
+        self.buffered = 0
+
+    def attach(self, current_game: Game):
+        current_game.tick_listeners.append(self.on_tick)
+        current_game.collision_listeners.append(self.on_collision)
+
+    def detach(self, current_game: Game):
+        current_game.tick_listeners.remove(self.on_tick)
+        current_game.collision_listeners.remove(self.on_collision)
+
+    def row(self, y: int) -> int:
+        return min(max((y - self.board.top) // self.cell, 0), self.rows - 1)
+
+    def on_tick(self, current_game: Game):
+        ball = current_game.ball.rect
+        column = min(max((ball.centerx - self.board.left) // self.cell, 0), self.columns - 1)
+        index = self.buffered
+        self.ball_cells[index] = self.row(ball.centery) * self.columns + column
+        self.bar_cells[2 * index] = self.row(current_game.left_player.rect.centery)
+        self.bar_cells[2 * index + 1] = self.rows + self.row(current_game.right_player.rect.centery)
+        self.buffered = index + 1
+        self.ticks += 1
+
+        if self.buffered == len(self.ball_cells):
+            self.flush()
+
+    def on_collision(self, current_game: Game, collision: Collision):
+        if collision == Collision.LEFT_PLAYER or collision == Collision.LEFT_WALL:
+            side, bar = LEFT, current_game.left_player.rect
+        elif collision == Collision.RIGHT_PLAYER or collision == Collision.RIGHT_WALL:
+            side, bar = RIGHT, current_game.right_player.rect
+        else:
+            return
+
+        ball = current_game.ball.rect
+        row = self.row(ball.centery)
+        error = ball.centery - bar.centery
+        error_bin = min(max((error + self.board.height) // self.cell, 0), self.error_bins - 1)
+        self.errors[row, error_bin] += 1
+
+        if collision == Collision.LEFT_WALL or collision == Collision.RIGHT_WALL:
+            self.misses[side, row] += 1
+
+    def flush(self):
+        """Counts the buffered ticks into the histograms."""
+        if not self.buffered:
+            return
+
+        cells = self.ball_cells[:self.buffered]
+        self.ball += numpy.bincount(cells, minlength=self.ball.size).reshape(self.ball.shape)
+        cells = self.bar_cells[:2 * self.buffered]
+        self.bars += numpy.bincount(cells, minlength=self.bars.size).reshape(self.bars.shape)
+        self.buffered = 0
+
+    def state(self) -> Dict[str, numpy.ndarray]:
+        """The histograms, e.g. to send them from a worker process or to save them with numpy.savez."""
+        self.flush()
+        arrays = {name: getattr(self, name) for name in ARRAYS}
+        arrays["ticks"] = numpy.array(self.ticks)
+        return arrays
+
+    def merge(self, state: Dict[str, numpy.ndarray]):
+        """Adds the histograms of a state() of the same board and cell size."""
+        for name in ARRAYS:
+            histogram = getattr(self, name)
+
+            if state[name].shape != histogram.shape:
+                raise ValueError("cannot merge {} of shape {} into {}".format(name, state[name].shape,
+                                                                             histogram.shape))
+            histogram += state[name]
+        self.ticks += int(state["ticks"])
+
+    def save(self, path: str):
+        numpy.savez(path, **self.state())
+
+    def load(self, path: str):
+        """Merges the histograms saved in the file."""
+        with numpy.load(path) as state:
+            self.merge(state)
+
+
+heatmaps: Dict[tuple, Heatmap] = {}
+
+
+def get_heatmap(board: Rect) -> Heatmap:
+    """Returns the heatmap shared by all games on the board, creating it on first use."""
+    key = tuple(board)
+    heatmap = heatmaps.get(key)
+
+    if heatmap is None:
+        heatmap = Heatmap(board)
+        heatmaps[key] = heatmap
+    return heatmap
+
+
+BOARD = Rect(0, 50, 640, 430)
+
+
+def play_games(seed: int, games: int, tick_seconds: float = 1 / 60,
+               max_ticks: int = 20000) -> Dict[str, numpy.ndarray]:
+    """Plays ai games on BOARD in a worker process and returns the state of their heatmap."""
+    import random
+
+    from balls.game import GameArguments, create_game
+
+    random.seed(seed)
+    arguments: GameArguments = {
+        "left_player": {"name": "left", "ai": True},
+        "right_player": {"name": "right", "ai": True},
+    }
+    heatmap = Heatmap(BOARD)
+
+    for _ in range(games):
+        current_game = create_game(BOARD, arguments)
+        heatmap.attach(current_game)
+        current_game.start()
+        current_game.time_to_last_tick = tick_seconds
+        ticks = 0
+
+        while current_game.is_running() and ticks < max_ticks:
+            current_game.tick(0, 0)
+            ticks += 1
+    return heatmap.state()
+
+
+def merge_states(board: Rect, states: Iterable[Dict[str, numpy.ndarray]]) -> Heatmap:
+    heatmap = Heatmap(board)
+
+    for state in states:
+        heatmap.merge(state)
+    return heatmap
+
+
+def benchmark(games: int = 200, workers: int = 2):
+    """Feeds a heatmap from ai games, once in this process and once from worker processes."""
+    from multiprocessing import Pool
+
+    from balls.game import GameArguments, create_game
+
+    arguments: GameArguments = {
+        "left_player": {"name": "left", "ai": True},
+        "right_player": {"name": "right", "ai": True},
+    }
+    current_game = create_game(BOARD, arguments)
+    current_game.start()
+    heatmap = Heatmap(BOARD)
+    start = time.perf_counter()
+    for _ in range(100000):
+        heatmap.on_tick(current_game)
+    print("feeding a tick {:.2f} us".format((time.perf_counter() - start) / 100000 * 1e6))
+
+    # the histograms keep their size however many games went into them
+    for count in (games // 40, games // 4):
+        state = play_games(1, count)
+        print("{:>4} games, {:>8} ticks: heatmap {} bytes".format(
+            count, int(state["ticks"]), sum(array.nbytes for array in state.values())))
+
+    start = time.perf_counter()
+    single = play_games(0, games)
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pool = Pool(workers)
+    states = pool.starmap(play_games, [(seed, games // workers) for seed in range(workers)])
+    # the workers import pygame, which catches SIGTERM, so the terminate() of leaving a with block waits forever
+    pool.close()
+    pool.join()
+    merged = merge_states(BOARD, states)
+    parallel_time = time.perf_counter() - start
+
+    print("{} games in one process {:.1f} s, {} ticks; in {} workers merged {:.1f} s, {} ticks".format(
+        games, single_time, int(single["ticks"]), workers, parallel_time, merged.ticks))
+    misses = merged.misses.sum(axis=1)
+    print("misses left {} right {}, most missed row of the right bar {}".format(
+        misses[LEFT], misses[RIGHT], int(merged.misses[RIGHT].argmax())))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,260 @@
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from balls.game import AiPlayer, Game, TickListener
+
+DEFAULT_PATH = "highscores.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    finished_at REAL NOT NULL,
+    winner TEXT NOT NULL,
+    loser TEXT NOT NULL,
+    winner_ai INTEGER NOT NULL,
+    loser_ai INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    ball_speed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS matches_duration ON matches (duration);
+CREATE INDEX IF NOT EXISTS matches_finished_at ON matches (finished_at);
+"""
+INSERT = ("INSERT INTO matches (finished_at, winner, loser, winner_ai, loser_ai, duration, ball_speed) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+# finished at, winner, loser, winner is ai, loser is ai, duration in seconds, final ball speed
+Match = Tuple[float, str, str, bool, bool, float, float]
+# id, winner, duration, ball speed, finished at
+Highscore = Tuple[int, str, float, float, float]
+
+
+def connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, check_same_thread=False)
+    # readers do not block the writer and the other way around, and commits do not wait for fsync
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class MatchStore:
+    """
+    Match history in SQLite. record() only puts the match into a queue, a writer thread inserts
+    the queued matches in batches of up to batch_size with one transaction each, so the render
+    loop never waits for the disk. The queries run on a separate connection.
+
+    written counts the matches in the database written by this store, readers can compare it
+    to see if their cached results are outdated.
+    """
+    path: str
+    batch_size: int
+    written: int
+
+    def __init__(self, path: str = DEFAULT_PATH, batch_size: int = 1024) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.written = 0
+        self.pending: queue.Queue = queue.Queue()
+
+        writer = connect(path)
+        writer.executescript(SCHEMA)
+        self.reader = connect(path)
+        self.thread = threading.Thread(target=self.run, args=(writer,), name="match-store-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def record(self, match: Match):
+        self.pending.put(match)
+
+    def record_game(self, current_game: Game):
+        winner = current_game.player_won
+        loser = current_game.right_player if winner is current_game.left_player else current_game.left_player
+        # the duration is game time, a fast forwarded match still has its real length
+        self.record((time.time(), winner.name, loser.name, isinstance(winner, AiPlayer), isinstance(loser, AiPlayer),
+                     current_game.elapsed(), current_game.ball.speed))
+
+    def run(self, writer: sqlite3.Connection):
+        while True:
+            batch = [self.pending.get()]
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            # None asks the writer to stop, after writing everything queued before it
+            stop = None in batch
+            matches = [match for match in batch if match is not None]
+
+            if matches:
+                with writer:
+                    writer.executemany(INSERT, matches)
+                self.written += len(matches)
+
+            for _ in batch:
+                self.pending.task_done()
+
+            if stop:
+                writer.close()
+                return
+
+    def flush(self):
+        """Waits until everything recorded so far is written."""
+        self.pending.join()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.pending.put(None)
+            self.thread.join()
+            self.reader.close()
+            atexit.unregister(self.close)
+
+    def fastest_wins(self, limit: int, after: Optional[Tuple[float, int]] = None) -> List[Highscore]:
+        """
+        The fastest wins, after the (duration, id) of the last row of a previous page if given.
+        Paging from the last row uses the duration index, an OFFSET would step over all skipped rows.
+        """
+        if after is None:
+            cursor = self.reader.execute("SELECT id, winner, duration, ball_speed, finished_at FROM matches "
+                                         "ORDER BY duration, id LIMIT ?", (limit,))
+        else:
+            cursor = self.reader.execute("SELECT id, winner, duration, ball_speed, finished_at FROM matches "
+                                         "WHERE (duration, id) > (?, ?) ORDER BY duration, id LIMIT ?",
+                                         (after[0], after[1], limit))
+        return cursor.fetchall()
+
+    def history(self, limit: int) -> List[Tuple[float, str, str, float]]:
+        """The latest matches: finished at, winner, loser and duration."""
+        return self.reader.execute("SELECT finished_at, winner, loser, duration FROM matches "
+                                   "ORDER BY finished_at DESC LIMIT ?", (limit,)).fetchall()
+
+
+stores = {}
+
+
+def get_store(path: str = DEFAULT_PATH) -> MatchStore:
+    """Returns the store of the path, opening it on first use."""
+    store = stores.get(path)
+
+    if store is None:
+        store = MatchStore(path)
+        stores[path] = store
+    return store
+
+
+def record_when_finished(store: MatchStore) -> TickListener:
+    """
+    A tick listener which records the game in the store whenever it finished. Listeners are only
+    notified by ticks of a running game, so a match is recorded once, also if the game is reset and played again.
+    """
+    def listener(current_game: Game):
+        if current_game.is_finished():
+            store.record_game(current_game)
+    return listener
+
+
+class HighscorePages:
+    """
+    Pages of the fastest wins, cached until the store wrote new matches. Pages are read from the
+    boundary row of the previous page, so only pages next to already read ones can be read.
+    """
+    store: MatchStore
+    page_size: int
+    pages: List[List[Highscore]]
+    version: int
+
+    def __init__(self, store: MatchStore, page_size: int = 10) -> None:
+        self.store = store
+        self.page_size = page_size
+        self.pages = []
+        self.version = -1
+
+    def outdated(self) -> bool:
+        return self.version != self.store.written
+
+    def get(self, index: int) -> List[Highscore]:
+        if self.outdated():
+            self.version = self.store.written
+            self.pages.clear()
+
+        while len(self.pages) <= index:
+            after = None
+            if self.pages:
+                last = self.pages[-1]
+                if len(last) < self.page_size:
+                    return []
+                after = (last[-1][2], last[-1][0])
+            self.pages.append(self.store.fastest_wins(self.page_size, after))
+        return self.pages[index]
+
+    def has_page(self, index: int) -> bool:
+        return index == 0 or bool(self.get(index))
+
+
+def benchmark(rows: int = 1000000, page_size: int = 10):
+    """Writes a million matches through the store and compares queries with and without the duration index."""
+    import os
+    import random
+    import tempfile
+
+    random.seed(0)
+    directory = tempfile.mkdtemp()
+    names = ["Player{}".format(index) for index in range(100)]
+
+    def random_match(index: int) -> Match:
+        return (index, random.choice(names), random.choice(names), random.random() < 0.5, random.random() < 0.5,
+                random.uniform(1, 600), random.uniform(250, 2000))
+
+    matches = [random_match(index) for index in range(rows)]
+
+    # committing every match on its own, like a synchronous write in the render loop would
+    synchronous = connect(os.path.join(directory, "synchronous.db"))
+    synchronous.executescript(SCHEMA)
+    count = 2000
+    start = time.perf_counter()
+    for match in matches[:count]:
+        with synchronous:
+            synchronous.execute(INSERT, match)
+    print("synchronous insert and commit    {:8.1f} us/match".format((time.perf_counter() - start) / count * 1e6))
+    synchronous.close()
+
+    store = MatchStore(os.path.join(directory, "store.db"))
+    start = time.perf_counter()
+    for match in matches:
+        store.record(match)
+    recorded = time.perf_counter() - start
+    store.flush()
+    written = time.perf_counter() - start
+    print("record in the render loop        {:8.2f} us/match".format(recorded / rows * 1e6))
+    print("written by the writer thread     {:8.2f} us/match, {} matches".format(written / rows * 1e6, store.written))
+
+    def measure(name: str, sql: str, parameters: tuple = (), repeat: int = 20):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            store.reader.execute(sql, parameters).fetchall()
+        print("{:<32} {:8.3f} ms".format(name, (time.perf_counter() - start) / repeat * 1000))
+
+    columns = "SELECT id, winner, duration, ball_speed, finished_at FROM matches"
+    measure("top 10, duration index", columns + " ORDER BY duration, id LIMIT 10")
+    measure("top 10, full scan", columns + " NOT INDEXED ORDER BY duration, id LIMIT 10", repeat=3)
+    pages = HighscorePages(store, page_size)
+    for index in range(1000):
+        pages.get(index)
+    last = pages.get(999)[-1]
+    measure("page 1000 after last row", columns + " WHERE (duration, id) > (?, ?) ORDER BY duration, id LIMIT ?",
+            (last[2], last[0], page_size))
+    measure("page 1000 with offset", columns + " ORDER BY duration, id LIMIT ? OFFSET ?", (page_size, 999 * page_size))
+    start = time.perf_counter()
+    for _ in range(10000):
+        pages.get(500)
+    print("{:<32} {:8.3f} ms".format("cached page", (time.perf_counter() - start) / 10000 * 1000))
+
+    store.close()
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,202 @@
+import time
+from typing import List, Optional, Tuple
+
+import pygame
+from pygame import locals
+
+from balls.display import Display
+
+# posted by a timer to end an idle wait for events
+WAKE_UP_EVENT = locals.USEREVENT
+
+ALLOWED_EVENTS = [
+    locals.QUIT,
+    locals.ACTIVEEVENT,
+    locals.KEYDOWN,
+    locals.KEYUP,
+    locals.MOUSEMOTION,
+    locals.MOUSEBUTTONDOWN,
+    locals.MOUSEBUTTONUP,
+    locals.VIDEORESIZE,
+    locals.VIDEOEXPOSE,
+    WAKE_UP_EVENT,
+]
+
+
+class InputSnapshot:
+    """The input of a single frame, with the mouse motions between two button events merged into one event."""
+    events: List[pygame.event.EventType]
+    mouse_pos: Tuple[int, int]
+    timestamp: float
+    motion_timestamp: Optional[float]
+
+    def __init__(self, events: List[pygame.event.EventType], mouse_pos: Tuple[int, int], timestamp: float,
+                 motion_timestamp: Optional[float]) -> None:
+        self.events = events
+        self.mouse_pos = mouse_pos
+        self.timestamp = timestamp
+        self.motion_timestamp = motion_timestamp
+
+
+class InputSystem:
+    """
+    Reads the event queue once per frame. Only the event types the game handles are let
+    into the queue, and the MOUSEMOTION events between two button events of a frame are
+    merged into the latest of them, so clicks keep their place among the motions.
+
+    Events are timestamped (time.perf_counter) when they are read, which is the start
+    of the input-to-photon latency recorded by presented().
+
+    With a scaled display, the positions of mouse events and mouse_pos are mapped to its
+    logical surface, relative motions stay in window pixels.
+    """
+    mouse_pos: Tuple[int, int]
+    snapshot: InputSnapshot
+    latency_count: int
+    latency_total: float
+    latency_max: float
+    display: Optional[Display]
+
+    def __init__(self, display: Optional[Display] = None) -> None:
+        self.display = display
+        self.mouse_pos = (0, 0)
+        self.snapshot = InputSnapshot([], self.mouse_pos, time.perf_counter(), None)
+        self.latency_count = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def install(self, allowed: Optional[List[int]] = None):
+        """Restricts the event queue to the allowed event types, needs an initialized display."""
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(ALLOWED_EVENTS if allowed is None else allowed)
+        self.mouse_pos = self.to_logical_pos(pygame.mouse.get_pos())
+
+    def to_logical_pos(self, pos: Tuple[int, int]) -> Tuple[int, int]:
+        if self.display is None:
+            return pos
+        return self.display.to_logical(pos)
+
+    def to_logical(self, event: pygame.event.EventType) -> pygame.event.EventType:
+        if self.display is None or not self.display.scaled:
+            return event
+
+        attributes = dict(event.dict)
+        attributes["pos"] = self.display.to_logical(event.pos)
+        return pygame.event.Event(event.type, attributes)
+
+    def poll(self, timeout: Optional[int] = None) -> InputSnapshot:
+        """Reads all queued events, waiting up to timeout ms for the first one if a timeout is given."""
+        if timeout is None:
+            events = pygame.event.get()
+        else:
+            events = self.wait(timeout)
+
+        self.snapshot = self.coalesce(events, time.perf_counter())
+        return self.snapshot
+
+    @staticmethod
+    def wait(timeout: int) -> List[pygame.event.EventType]:
+        # pygame.event.wait has no timeout before pygame 2, so a timer wakes it up instead
+        pygame.time.set_timer(WAKE_UP_EVENT, max(1, timeout))
+        events = [pygame.event.wait()]
+        pygame.time.set_timer(WAKE_UP_EVENT, 0)
+        events.extend(pygame.event.get())
+        return [event for event in events if event.type != WAKE_UP_EVENT]
+
+    def coalesce(self, events: List[pygame.event.EventType], timestamp: float) -> InputSnapshot:
+        coalesced = []
+        # motions since the last button event, merged into one motion in front of the next button event,
+        # so a click still sees the hover of the motions before it and never of the ones after it
+        motions = []
+        motion_timestamp = None
+
+        for event in events:
+            if event.type == locals.MOUSEMOTION:
+                motions.append(event)
+                motion_timestamp = timestamp
+                continue
+
+            if event.type == locals.MOUSEBUTTONDOWN or event.type == locals.MOUSEBUTTONUP:
+                if motions:
+                    coalesced.append(self.merge_motions(motions))
+                    motions = []
+                event = self.to_logical(event)
+                self.mouse_pos = event.pos
+            coalesced.append(event)
+
+        if motions:
+            coalesced.append(self.merge_motions(motions))
+
+        return InputSnapshot(coalesced, self.mouse_pos, timestamp, motion_timestamp)
+
+    def merge_motions(self, motions: List[pygame.event.EventType]) -> pygame.event.EventType:
+        motion = motions[-1]
+
+        if len(motions) > 1:
+            rel_x = sum(event.rel[0] for event in motions)
+            rel_y = sum(event.rel[1] for event in motions)
+            motion = pygame.event.Event(locals.MOUSEMOTION, pos=motion.pos, rel=(rel_x, rel_y), buttons=motion.buttons)
+        motion = self.to_logical(motion)
+        self.mouse_pos = motion.pos
+        return motion
+
+    def presented(self):
+        """Records the latency of the latest mouse motion, call right after the frame was presented."""
+        if self.snapshot.motion_timestamp is None:
+            return
+
+        latency = time.perf_counter() - self.snapshot.motion_timestamp
+        self.latency_count += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def average_latency(self) -> float:
+        return self.latency_total / self.latency_count if self.latency_count else 0.0
+
+
+def benchmark(frames: int = 50):
+    """Floods the queue with mouse motions and compares per-event handling with coalescing."""
+    from balls import PingPongRenderer, StartupGameRenderer, TextureAtlas
+
+    master = PingPongRenderer()
+    master.screen = pygame.display.set_mode((640, 480))
+    master.atlas = TextureAtlas()
+    renderer = StartupGameRenderer(master)
+    input_system = InputSystem()
+    input_system.install()
+
+    print("motions/frame  per-event ms/frame  coalesced ms/frame  latency ms")
+    for flood in (10, 100, 1000, 10000):
+        results = []
+        for coalescing in (False, True):
+            input_system.latency_count = 0
+            input_system.latency_total = 0.0
+            elapsed = 0.0
+
+            for frame in range(frames):
+                for index in range(flood):
+                    pos = ((frame * 7 + index) % 640, (frame * 3 + index) % 480)
+                    pygame.event.post(pygame.event.Event(locals.MOUSEMOTION, pos=pos, rel=(1, 1), buttons=(0, 0, 0)))
+
+                start = time.perf_counter()
+                if coalescing:
+                    events = input_system.poll().events
+                else:
+                    events = pygame.event.get()
+                    input_system.snapshot = InputSnapshot(events, input_system.mouse_pos, start, start)
+
+                for event in events:
+                    renderer.handle_event(event)
+                renderer.handle_events(events)
+                renderer.draw(master.screen)
+                pygame.display.update()
+                input_system.presented()
+                elapsed += time.perf_counter() - start
+            results.append((elapsed / frames * 1000, input_system.average_latency() * 1000))
+
+        print("{:>13}  {:>18.3f}  {:>18.3f}  {:>5.2f} -> {:.2f}".format(
+            flood, results[0][0], results[1][0], results[0][1], results[1][1]))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,47 @@
+from typing import Callable, Dict, Hashable, Iterable, Tuple
+
+import pygame
+
+Color = Tuple[int, int, int]
+
+
+class LabelCache:
+    """
+    Text surfaces rendered once per key, either lazily on first use or upfront with prerender.
+    The text for a key is produced by `text_for`, e.g. pygame.key.name for key codes.
+    """
+    font: pygame.font.Font
+    color: Color
+    text_for: Callable[[Hashable], str]
+    labels: Dict[Hashable, pygame.Surface]
+
+    def __init__(self, font: pygame.font.Font, color: Color, text_for: Callable[[Hashable], str] = str,
+                 antialias: bool = True) -> None:
+        self.font = font
+        self.color = color
+        self.text_for = text_for
+        self.antialias = antialias
+        self.labels = {}
+
+    def get(self, key: Hashable) -> pygame.Surface:
+        label = self.labels.get(key)
+
+        if label is None:
+            label = self.font.render(self.text_for(key), self.antialias, self.color)
+            self.labels[key] = label
+        return label
+
+    def prerender(self, keys: Iterable[Hashable]):
+        for key in keys:
+            self.get(key)
+
+    def render_lines(self, surface: pygame.Surface, keys: Iterable[Hashable], topleft: Tuple[int, int],
+                     line_height: int):
+        """Blits the labels of the keys below each other with a single blits call."""
+        left, top = topleft
+        sequence = []
+
+        for key in keys:
+            sequence.append((self.get(key), (left, top)))
+            top += line_height
+        surface.blits(sequence, doreturn=False)
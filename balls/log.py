@@ -0,0 +1,254 @@
+import atexit
+import os
+import sys
+import threading
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional, TextIO, Any
+
+
+class Level(IntEnum):
+    DEBUG = 10
+    INFO = 20
+    WARNING = 30
+    ERROR = 40
+
+
+class EventLog:
+    """
+    Structured log records in a preallocated ring buffer, written out in batches by a background thread.
+
+    Recording a record only stores its values in the buffer slots, formatting and writing happen
+    on the flush thread. When the buffer is full the oldest records are overwritten and counted as dropped.
+    Field values are formatted when flushed, so they should not be mutated afterwards, pass tuples instead of Rects.
+    """
+    capacity: int
+    flush_interval: float
+    sink: Optional[TextIO]
+    dropped: int
+
+    def __init__(self, capacity: int = 4096, sink: Optional[TextIO] = None, flush_interval: float = 0.1) -> None:
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.sink = sink
+        self.times: List[float] = [0.0] * capacity
+        self.levels: List[Level] = [Level.DEBUG] * capacity
+        self.names: List[str] = [""] * capacity
+        self.events: List[str] = [""] * capacity
+        self.fields: List[Optional[Dict[str, Any]]] = [None] * capacity
+        # index of the oldest record and number of records in the buffer
+        self.head = 0
+        self.count = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+        # keeps batches in order and lets flush() wait for a batch the thread is writing
+        self.flush_lock = threading.Lock()
+        self.wake_up = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def record(self, level: Level, name: str, event: str, fields: Optional[Dict[str, Any]]):
+        with self.lock:
+            if self.count == self.capacity:
+                self.head = (self.head + 1) % self.capacity
+                self.count -= 1
+                self.dropped += 1
+
+            index = (self.head + self.count) % self.capacity
+            self.times[index] = time.time()
+            self.levels[index] = level
+            self.names[index] = name
+            self.events[index] = event
+            self.fields[index] = fields
+            self.count += 1
+
+        if self.thread is None:
+            self.start()
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self.run, name="event-log-flush", daemon=True)
+        self.thread.start()
+        atexit.register(self.flush)
+
+    def run(self):
+        while True:
+            self.wake_up.wait(self.flush_interval)
+            self.wake_up.clear()
+            self.flush()
+
+    def take(self) -> List[tuple]:
+        """Removes all buffered records and returns them oldest first."""
+        with self.lock:
+            records = []
+            for offset in range(self.count):
+                index = (self.head + offset) % self.capacity
+                records.append((self.times[index], self.levels[index], self.names[index], self.events[index],
+                                self.fields[index]))
+                self.fields[index] = None
+            self.head = (self.head + self.count) % self.capacity
+            self.count = 0
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            records.append((time.time(), Level.WARNING, "balls.log", "records dropped", {"count": dropped}))
+        return records
+
+    @staticmethod
+    def format(record: tuple) -> str:
+        timestamp, level, name, event, fields = record
+        line = "{:.3f} {} {} {}".format(timestamp, level.name, name, event)
+
+        if fields:
+            line += " " + " ".join("{}={}".format(key, value) for key, value in fields.items())
+        return line + "\n"
+
+    def flush(self):
+        with self.flush_lock:
+            records = self.take()
+
+            if records:
+                sink = sys.stdout if self.sink is None else self.sink
+                sink.write("".join(self.format(record) for record in records))
+                sink.flush()
+
+
+class Logger:
+    """
+    A named view on an EventLog. Every level has a boolean flag, so hot paths can skip building
+    the fields of disabled records with `if log.debug_enabled:` at the cost of one attribute check.
+    """
+    name: str
+    event_log: EventLog
+    level: Level
+    debug_enabled: bool
+    info_enabled: bool
+    warning_enabled: bool
+    error_enabled: bool
+
+    def __init__(self, name: str, event_log: EventLog, level: Level = Level.WARNING) -> None:
+        self.name = name
+        self.event_log = event_log
+        self.set_level(level)
+
+    def set_level(self, level: Level):
+        self.level = level
+        self.debug_enabled = level <= Level.DEBUG
+        self.info_enabled = level <= Level.INFO
+        self.warning_enabled = level <= Level.WARNING
+        self.error_enabled = level <= Level.ERROR
+
+    def debug(self, event: str, **fields):
+        if self.debug_enabled:
+            self.event_log.record(Level.DEBUG, self.name, event, fields)
+
+    def info(self, event: str, **fields):
+        if self.info_enabled:
+            self.event_log.record(Level.INFO, self.name, event, fields)
+
+    def warning(self, event: str, **fields):
+        if self.warning_enabled:
+            self.event_log.record(Level.WARNING, self.name, event, fields)
+
+    def error(self, event: str, **fields):
+        if self.error_enabled:
+            self.event_log.record(Level.ERROR, self.name, event, fields)
+
+
+def level_from_environment(default: Level = Level.WARNING) -> Level:
+    """Reads the level of new loggers from BALLS_LOG_LEVEL, e.g. BALLS_LOG_LEVEL=debug."""
+    name = os.environ.get("BALLS_LOG_LEVEL")
+    if not name:
+        return default
+    try:
+        return Level[name.upper()]
+    except KeyError:
+        # a typo in a logging setting should not keep the game from starting
+        print("unknown log level in BALLS_LOG_LEVEL: {}, using {}".format(name, default.name), file=sys.stderr)
+        return default
+
+
+event_log = EventLog()
+loggers: Dict[str, Logger] = {}
+
+
+def get_logger(name: str, level: Optional[Level] = None) -> Logger:
+    """Returns the logger with the name, creating it on the shared event_log if needed."""
+    logger = loggers.get(name)
+
+    if logger is None:
+        logger = Logger(name, event_log, level_from_environment() if level is None else level)
+        loggers[name] = logger
+    elif level is not None:
+        logger.set_level(level)
+    return logger
+
+
+def benchmark(ticks: int = 100000):
+    """Measures Game.tick with its collision records printed, disabled, only buffered and flushed."""
+    import random
+
+    from pygame import Rect
+
+    import balls.game
+    from balls.game import Game, Ball, AiPlayer, Collision
+    from vector2 import Vector2
+
+    game_log = balls.game.log
+    # run as a script this module is loaded twice, the game logs into the log of the package module
+    records = game_log.event_log
+    original_level = game_log.level
+    devnull = open(os.devnull, "w")
+
+    def print_collision(current_game: Game, collision: Collision):
+        print("collision: {} ball: {}".format(collision.name, current_game.ball.rect), file=devnull)
+
+    def run(level: Level, printing: bool = False, flush_interval: float = 0.1):
+        # the same start direction, and therefore the same collisions, for every run
+        random.seed(0)
+        # bars as high as the tiny board never miss, so the ball bounces back and forth forever
+        area = Rect(0, 0, 60, 40)
+        left = AiPlayer(Rect(0, 0, 10, 40), area, "left", False)
+        right = AiPlayer(Rect(50, 0, 10, 40), area, "right", True)
+        current_game = Game(Ball(Rect(area.center, (10, 5)), area, Vector2(), 5, 250), left, right, area)
+        left.game = right.game = current_game
+        # without speedup the ball keeps a sane speed over all ticks
+        current_game.ball.speedup_factor = 0
+        left.speedup_factor = right.speedup_factor = 0
+        current_game.start()
+        current_game.time_to_last_tick = 0.01
+        counter = [0]
+        current_game.collision_listeners.append(lambda _, __: counter.__setitem__(0, counter[0] + 1))
+
+        if printing:
+            current_game.collision_listeners.append(print_collision)
+        game_log.set_level(level)
+        records.flush_interval = flush_interval
+        records.wake_up.set()
+
+        start = time.perf_counter()
+        for _ in range(ticks):
+            current_game.tick(0, 0)
+        elapsed = time.perf_counter() - start
+        records.flush()
+        return elapsed / ticks * 1e6, counter[0]
+
+    records.sink = devnull
+    print("logging   us/tick  collisions")
+    # a flush interval of an hour keeps everything in the buffer, like a burst between two flushes
+    for name, level, printing, flush_interval in (("print", Level.WARNING, True, 0.1),
+                                                  ("off", Level.WARNING, False, 0.1),
+                                                  ("buffered", Level.DEBUG, False, 3600),
+                                                  ("flushed", Level.DEBUG, False, 0.01)):
+        per_tick, collisions = min(run(level, printing, flush_interval) for _ in range(3))
+        print("{:<8}  {:>7.2f}  {:>10}".format(name, per_tick, collisions))
+
+    game_log.set_level(original_level)
+    records.flush_interval = 0.1
+    records.flush()
+    records.sink = None
+    devnull.close()
+
+
+if __name__ == '__main__':
+    benchmark()
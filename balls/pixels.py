@@ -0,0 +1,105 @@
+import time
+from typing import Tuple, Union
+
+import numpy
+import pygame
+
+ColorArray = Union[numpy.ndarray, Tuple[int, int, int]]
+
+
+def map_colors(surface: pygame.Surface, colors: ColorArray) -> numpy.ndarray:
+    """Maps RGB colors, a (n, 3) array or a single color, to the pixel values of the surface format."""
+    colors = numpy.asarray(colors, dtype=numpy.uint32)
+    shifts = surface.get_shifts()
+    losses = surface.get_losses()
+    masks = surface.get_masks()
+
+    mapped = ((colors[..., 0] >> losses[0]) << shifts[0]) & masks[0]
+    mapped |= ((colors[..., 1] >> losses[1]) << shifts[1]) & masks[1]
+    mapped |= ((colors[..., 2] >> losses[2]) << shifts[2]) & masks[2]
+    # plotted pixels are opaque
+    mapped |= masks[3]
+    return mapped
+
+
+def map_palette(surface: pygame.Surface, colors: ColorArray) -> numpy.ndarray:
+    """Maps RGB colors to the nearest palette index of an 8 bit surface, mapping every distinct color once."""
+    colors = numpy.asarray(colors, dtype=numpy.uint8)
+
+    if colors.ndim == 1:
+        return numpy.uint8(surface.map_rgb(*colors))
+
+    unique, inverse = numpy.unique(colors, axis=0, return_inverse=True)
+    indices = numpy.array([surface.map_rgb(*color) for color in unique], dtype=numpy.uint8)
+    return indices[inverse.reshape(-1)]
+
+
+def clip_points(surface: pygame.Surface, xs: numpy.ndarray, ys: numpy.ndarray) -> numpy.ndarray:
+    width, height = surface.get_size()
+    return (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+
+
+def plot_pixels(surface: pygame.Surface, xs: numpy.ndarray, ys: numpy.ndarray, colors: ColorArray,
+                clip: bool = True):
+    """
+    Sets the pixels at the coordinates xs, ys to colors in one vectorized assignment.
+    Colors are either a single RGB color or one per point as (n, 3) array.
+    Later points win if the same pixel is written more than once.
+    """
+    xs = numpy.asarray(xs, dtype=numpy.intp)
+    ys = numpy.asarray(ys, dtype=numpy.intp)
+    colors = numpy.asarray(colors)
+
+    if clip:
+        inside = clip_points(surface, xs, ys)
+        if not inside.all():
+            xs = xs[inside]
+            ys = ys[inside]
+            if colors.ndim == 2:
+                colors = colors[inside]
+
+    bytesize = surface.get_bytesize()
+
+    if bytesize in (2, 4):
+        pixels = pygame.surfarray.pixels2d(surface)
+        pixels[xs, ys] = map_colors(surface, colors)
+    elif bytesize == 1:
+        pixels = pygame.surfarray.pixels2d(surface)
+        pixels[xs, ys] = map_palette(surface, colors)
+    elif bytesize == 3:
+        pixels = pygame.surfarray.pixels3d(surface)
+        pixels[xs, ys] = colors
+    else:
+        raise ValueError("cannot plot pixels on a surface with {} bytes per pixel".format(bytesize))
+    # the surface stays locked until the array reference is gone
+    del pixels
+
+
+def benchmark(points: int = 200000):
+    """Compares plotting random pixels with Surface.set_at against plot_pixels."""
+    surface = pygame.Surface((640, 480), 0, 32)
+    random = numpy.random.default_rng(0)
+    xs = random.integers(0, 640, points)
+    ys = random.integers(0, 480, points)
+    colors = random.integers(0, 256, (points, 3), dtype=numpy.uint8)
+
+    positions = list(zip(xs.tolist(), ys.tolist()))
+    color_tuples = [tuple(color) for color in colors.tolist()]
+    start = time.perf_counter()
+    surface.lock()
+    for position, color in zip(positions, color_tuples):
+        surface.set_at(position, color)
+    surface.unlock()
+    set_at = time.perf_counter() - start
+
+    start = time.perf_counter()
+    plot_pixels(surface, xs, ys, colors)
+    vectorized = time.perf_counter() - start
+
+    print("{} points".format(points))
+    print("set_at loop: {:>12,.0f} pixels/s".format(points / set_at))
+    print("plot_pixels: {:>12,.0f} pixels/s".format(points / vectorized))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,122 @@
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+import pygame
+
+RotatedSprite = Tuple[pygame.Surface, Tuple[int, int]]
+
+
+def surface_bytes(surface: pygame.Surface) -> int:
+    width, height = surface.get_size()
+    return width * height * surface.get_bytesize()
+
+
+class RotationCache:
+    """
+    Caches rotated versions of a sprite, so rotating sprites do not have to be
+    resampled with pygame.transform.rotate on every frame.
+
+    Angles are quantized to multiples of `step` degrees. Every cached surface is stored
+    together with the offset from the sprite center to its top left corner.
+    Surfaces are evicted in least recently used order when the cache grows over `max_bytes`.
+    """
+    sprite: pygame.Surface
+    step: float
+    max_bytes: int
+    size_bytes: int
+    hits: int
+    misses: int
+
+    def __init__(self, sprite: pygame.Surface, step: float = 2.0, max_bytes: int = 16 * 1024 * 1024) -> None:
+        if step <= 0:
+            raise ValueError("step needs to be greater than zero, got {}".format(step))
+        self.sprite = sprite
+        self.step = step
+        self.steps = max(1, int(round(360.0 / step)))
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.rotated: "OrderedDict[int, RotatedSprite]" = OrderedDict()
+
+    def quantize(self, angle: float) -> int:
+        return int(round(angle / self.step)) % self.steps
+
+    def get(self, angle: float) -> RotatedSprite:
+        """
+        Returns the rotated sprite for the given angle in degrees and the offset
+        which needs to be added to the sprite center to get its blit position.
+        """
+        index = self.quantize(angle)
+        rotated = self.rotated.get(index)
+
+        if rotated is not None:
+            self.hits += 1
+            self.rotated.move_to_end(index)
+            return rotated
+
+        self.misses += 1
+        return self.render(index)
+
+    def render(self, index: int) -> RotatedSprite:
+        surface = pygame.transform.rotate(self.sprite, index * self.step)
+        width, height = surface.get_size()
+        rotated = surface, (-(width // 2), -(height // 2))
+        self.rotated[index] = rotated
+        self.size_bytes += surface_bytes(surface)
+        self.evict()
+        return rotated
+
+    def evict(self):
+        # always keep the most recently used surface, even if it alone exceeds the limit
+        while self.size_bytes > self.max_bytes and len(self.rotated) > 1:
+            _, (surface, _) = self.rotated.popitem(last=False)
+            self.size_bytes -= surface_bytes(surface)
+
+    def prerender(self):
+        """Renders every quantized angle upfront, as far as the memory limit allows."""
+        for index in range(self.steps):
+            if index not in self.rotated:
+                self.render(index)
+
+    def blit(self, surface: pygame.Surface, center: Tuple[float, float], angle: float) -> pygame.Rect:
+        rotated, (offset_x, offset_y) = self.get(angle)
+        return surface.blit(rotated, (int(center[0]) + offset_x, int(center[1]) + offset_y))
+
+    def clear(self):
+        self.rotated.clear()
+        self.size_bytes = 0
+
+
+def benchmark(sprite_count: int = 500, frames: int = 120):
+    """Compares rotating every sprite on every frame with rotating through a RotationCache."""
+    sprite = pygame.Surface((64, 64), pygame.SRCALPHA)
+    pygame.draw.polygon(sprite, (255, 255, 255), [(32, 0), (64, 64), (0, 64)])
+    target = pygame.Surface((640, 480))
+    centers = [((index * 37) % 640, (index * 53) % 480) for index in range(sprite_count)]
+    speeds = [90.0 + (index % 7) * 45.3 for index in range(sprite_count)]
+
+    start = time.perf_counter()
+    for frame in range(frames):
+        for center, speed in zip(centers, speeds):
+            rotated = pygame.transform.rotate(sprite, frame * speed / 60.0)
+            width, height = rotated.get_size()
+            target.blit(rotated, (center[0] - width // 2, center[1] - height // 2))
+    uncached = time.perf_counter() - start
+
+    cache = RotationCache(sprite, step=2.0)
+    start = time.perf_counter()
+    for frame in range(frames):
+        for center, speed in zip(centers, speeds):
+            cache.blit(target, center, frame * speed / 60.0)
+    cached = time.perf_counter() - start
+
+    print("{} sprites, {} frames".format(sprite_count, frames))
+    print("per-frame rotate: {:.2f} ms/frame".format(uncached / frames * 1000))
+    print("rotation cache:   {:.2f} ms/frame ({} hits, {} misses, {} KiB cached)".format(
+        cached / frames * 1000, cache.hits, cache.misses, cache.size_bytes // 1024))
+
+
+if __name__ == '__main__':
+    benchmark()
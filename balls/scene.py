@@ -0,0 +1,121 @@
+from typing import List, Optional, Tuple
+
+import pygame
+from pygame.rect import Rect
+
+Color = Tuple[int, int, int]
+
+
+class DirtyAttribute:
+    """An attribute which marks its node dirty whenever a different value is assigned."""
+    name: str
+
+    def __set_name__(self, owner, name: str):
+        self.name = "_" + name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return getattr(instance, self.name)
+
+    def __set__(self, instance, value):
+        if getattr(instance, self.name, None) != value:
+            setattr(instance, self.name, value)
+            instance.mark_dirty()
+
+
+class Node:
+    """
+    A node of a retained mode widget tree.
+
+    Every node keeps the surface it was last painted to and is only repainted when it,
+    or one of its children, was marked dirty. The rect of a node is relative to its parent.
+    """
+    rect: Rect
+    background: Optional[Color]
+    parent: Optional["Node"]
+    children: List["Node"]
+    dirty: bool
+    surface: Optional[pygame.Surface]
+
+    def __init__(self, rect: Rect, background: Optional[Color] = None) -> None:
+        self.rect = rect
+        self.background = background
+        self.parent = None
+        self.children = []
+        self.dirty = True
+        self.surface = None
+
+    def add(self, child: "Node") -> "Node":
+        child.parent = self
+        self.children.append(child)
+        self.mark_dirty()
+        return child
+
+    def mark_dirty(self):
+        node = self
+        # stop early, an already dirty node has dirty ancestors too
+        while node is not None and not node.dirty:
+            node.dirty = True
+            node = node.parent
+
+    def paint(self, surface: pygame.Surface):
+        """Paints the content of this node in local coordinates, children are composed above it."""
+        pass
+
+    def compose(self) -> pygame.Surface:
+        if self.surface is None or self.surface.get_size() != self.rect.size:
+            if self.background is None:
+                self.surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+            else:
+                self.surface = pygame.Surface(self.rect.size)
+            self.dirty = True
+
+        if self.dirty:
+            if self.background is None:
+                self.surface.fill((0, 0, 0, 0))
+            else:
+                self.surface.fill(self.background)
+            self.paint(self.surface)
+
+            for child in self.children:
+                self.surface.blit(child.compose(), child.rect)
+            self.dirty = False
+        return self.surface
+
+    def render(self, surface: pygame.Surface):
+        surface.blit(self.compose(), self.rect)
+
+    def hit(self, x: int, y: int) -> Optional["Node"]:
+        """Returns the deepest node at the position, which is relative to the parent of this node."""
+        if not self.rect.collidepoint(x, y):
+            return None
+
+        x -= self.rect.left
+        y -= self.rect.top
+        for child in reversed(self.children):
+            node = child.hit(x, y)
+            if node is not None:
+                return node
+        return self
+
+    def update_hover(self, x: int, y: int):
+        """Updates the hovering state of every hoverable node below this one."""
+        x -= self.rect.left
+        y -= self.rect.top
+        for child in self.children:
+            if hasattr(child, "hovering"):
+                child.hovering = child.rect.collidepoint(x, y)
+            child.update_hover(x, y)
+
+
+class Label(Node):
+    text_surface: pygame.Surface
+
+    def __init__(self, text_surface: pygame.Surface, topleft: Tuple[int, int]) -> None:
+        super().__init__(Rect(topleft, text_surface.get_size()))
+        self.text_surface = text_surface
+
+    def paint(self, surface: pygame.Surface):
+        surface.blit(self.text_surface, (0, 0))
+
@@ -0,0 +1,106 @@
+import time
+from collections import OrderedDict
+from typing import Tuple, Optional, Sequence, Any
+
+import pygame
+
+Color = Tuple[int, int, int]
+Point = Tuple[int, int]
+Shape = Tuple[Any, ...]
+
+
+def polygon(points: Sequence[Point], color: Color, width: int = 0) -> Shape:
+    return "polygon", color, tuple(points), width
+
+
+def circles(centers: Sequence[Point], color: Color, radius: int, width: int = 0) -> Shape:
+    return "circles", color, tuple(centers), radius, width
+
+
+def draw_shape(surface: pygame.Surface, shape: Shape):
+    kind = shape[0]
+
+    if kind == "polygon":
+        _, color, points, width = shape
+        if len(points) >= 3:
+            pygame.draw.polygon(surface, color, points, width)
+    elif kind == "circles":
+        _, color, centers, radius, width = shape
+        for center in centers:
+            pygame.draw.circle(surface, color, center, radius, width)
+    else:
+        raise ValueError("unknown shape kind: {}".format(kind))
+
+
+class ShapeCache:
+    """
+    Rasterizes a set of shapes once into an offscreen surface, keyed by their geometry.
+    Asking for the same geometry again returns the cached surface, the least recently
+    used surfaces are dropped when more than max_entries are cached. By default only the
+    latest surface is kept, shapes which only grow never ask for an older one again.
+    """
+    size: Tuple[int, int]
+    background: Optional[Color]
+    max_entries: int
+
+    def __init__(self, size: Tuple[int, int], background: Optional[Color] = None, max_entries: int = 1) -> None:
+        self.size = size
+        self.background = background
+        self.max_entries = max_entries
+        self.surfaces: "OrderedDict[Tuple[Shape, ...], pygame.Surface]" = OrderedDict()
+
+    def get(self, *shapes: Shape) -> pygame.Surface:
+        surface = self.surfaces.get(shapes)
+
+        if surface is not None:
+            self.surfaces.move_to_end(shapes)
+            return surface
+
+        surface = self.rasterize(shapes)
+        self.surfaces[shapes] = surface
+
+        while len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def rasterize(self, shapes: Tuple[Shape, ...]) -> pygame.Surface:
+        if self.background is None:
+            surface = pygame.Surface(self.size, pygame.SRCALPHA)
+            surface.fill((0, 0, 0, 0))
+        else:
+            surface = pygame.Surface(self.size)
+            surface.fill(self.background)
+
+        for shape in shapes:
+            draw_shape(surface, shape)
+        return surface
+
+
+def benchmark(frames: int = 100):
+    """Compares redrawing the draw_polygon scene every frame against blitting the cached shapes."""
+    target = pygame.Surface((640, 480))
+    cache = ShapeCache(target.get_size(), (255, 255, 255))
+
+    print("points  redraw ms/frame  cached ms/frame")
+    for count in (3, 10, 50, 200):
+        points = [((index * 97) % 640, (index * 61) % 480) for index in range(count)]
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            target.fill((255, 255, 255))
+            pygame.draw.polygon(target, (0, 255, 0), points, 10)
+            for point in points:
+                pygame.draw.circle(target, (0, 0, 255), point, 1000, 10)
+        redraw = time.perf_counter() - start
+
+        layer = cache.get(polygon(points, (0, 255, 0), 10), circles(points, (0, 0, 255), 1000, 10))
+        start = time.perf_counter()
+        for _ in range(frames):
+            target.blit(layer, (0, 0))
+        cached = time.perf_counter() - start
+
+        print("{:>6}  {:>15.3f}  {:>15.3f}".format(count, redraw / frames * 1000, cached / frames * 1000))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,237 @@
+import math
+import time
+from typing import List, Optional, Tuple
+
+import pygame
+from pygame import locals
+
+from balls import Renderer, PlayerTexture, BallTexture, PingPongRenderer, StartupGameRenderer, BLACK, WHITE
+from balls.clock import Clock
+from balls.game import Game, GameArguments, TICK_SECONDS, create_game
+
+# the logical board every spectated game is simulated on, tiles show it scaled down
+BOARD_SIZE = (640, 430)
+# many games are simulated, so they move by a coarser step than a played game
+SPECTATED_TICK_SECONDS = 4 * TICK_SECONDS
+
+
+class SpectatedGame:
+    """A game with the textures drawing it into a tile and the state it was last drawn in."""
+    index: int
+    game: Game
+    ball: BallTexture
+    left_player: PlayerTexture
+    right_player: PlayerTexture
+    drawn_state: Optional[Tuple[int, ...]]
+    finished_games: int
+    scale: float
+
+    def __init__(self, index: int, clock: Clock) -> None:
+        self.index = index
+        self.finished_games = 0
+        self.scale = 1.0
+        self.accumulated = 0.0
+        self.game = create_game(locals.Rect((0, 0), BOARD_SIZE), self.get_game_arguments(), clock)
+        self.ball = BallTexture(self.game.ball, WHITE, scale=self.scale)
+        self.left_player = PlayerTexture(self.game.left_player, WHITE, scale=self.scale)
+        self.right_player = PlayerTexture(self.game.right_player, WHITE, scale=self.scale)
+        self.drawn_state = None
+        self.game.start()
+
+    def restart(self):
+        # the textures draw the same ball and players, so only the game needs to be reset
+        self.game.reset()
+        self.drawn_state = None
+        self.game.start()
+
+    def get_game_arguments(self) -> GameArguments:
+        return {
+            "left_player": {"name": "Bot{}L".format(self.index), "ai": True},
+            "right_player": {"name": "Bot{}R".format(self.index), "ai": True},
+        }
+
+    def set_scale(self, scale: float):
+        self.scale = scale
+        self.ball.scale = scale
+        self.left_player.scale = scale
+        self.right_player.scale = scale
+        self.drawn_state = None
+
+    def advance(self, seconds: float):
+        # both players are ai, they move themselves
+        self.accumulated = self.game.advance(self.accumulated + seconds, 0, 0, SPECTATED_TICK_SECONDS)
+
+        if self.game.is_finished():
+            self.finished_games += 1
+            self.restart()
+
+    def view_state(self) -> Tuple[int, ...]:
+        """The positions in tile pixels, the tile only needs to be drawn again if they changed."""
+        scale = self.scale
+        ball = self.game.ball.rect
+        return (int(ball.x * scale), int(ball.y * scale), int(self.game.left_player.rect.y * scale),
+                int(self.game.right_player.rect.y * scale))
+
+    def draw(self, tile: pygame.Surface):
+        tile.fill(BLACK)
+        self.left_player.render(tile)
+        self.right_player.render(tile)
+        self.ball.render(tile)
+
+
+class SpectatorRenderer(Renderer):
+    """
+    Shows many concurrently running ai games, each in a tile of the window.
+
+    Every tile is a subsurface of the screen and is only drawn again when the positions of its
+    game changed in tile pixels. Games which do not fit onto the screen at `min_tile_width`
+    are unseen: they are simulated `unseen_speedup` times faster and never drawn.
+    PAGEUP and PAGEDOWN page through the games, ESCAPE returns to the start screen.
+    """
+    games: List[SpectatedGame]
+    first_visible: int
+    visible_count: int
+    tiles: List[pygame.Surface]
+    tile_rects: List[locals.Rect]
+    layout_surface: Optional[pygame.Surface]
+    layout_size: Tuple[int, int]
+    min_tile_width: int
+    unseen_speedup: float
+    drawn_tiles: int
+
+    def __init__(self, master: "PingPongRenderer", game_count: int = 64, min_tile_width: int = 64,
+                 unseen_speedup: float = 4.0) -> None:
+        super().__init__(master)
+        self.games = [SpectatedGame(index, master.clock) for index in range(game_count)]
+        self.min_tile_width = min_tile_width
+        self.unseen_speedup = unseen_speedup
+        self.first_visible = 0
+        self.visible_count = 0
+        self.tiles = []
+        self.tile_rects = []
+        self.layout_surface = None
+        self.layout_size = (0, 0)
+        self.drawn_tiles = 0
+        master.clock.tick()
+
+    def layout(self, surface: pygame.Surface):
+        """Splits the surface into a grid of tiles, as many as fit with at least min_tile_width."""
+        width, height = surface.get_size()
+        board_width, board_height = BOARD_SIZE
+        max_columns = max(1, width // self.min_tile_width)
+
+        # the fewest columns, and therefore the biggest tiles, which still show every game
+        for columns in range(1, max_columns + 1):
+            tile_width = width // columns
+            tile_height = max(1, int(tile_width * board_height / board_width))
+            rows = height // tile_height
+
+            if rows * columns >= len(self.games):
+                rows = math.ceil(len(self.games) / columns)
+                break
+        rows = max(1, rows)
+
+        if tile_height > height:
+            # a window lower than one tile still shows a row, of tiles shrunk to its height
+            tile_height = max(1, height)
+            tile_width = max(1, min(tile_width, int(tile_height * board_width / board_height)))
+
+        # one pixel of each tile stays as gap between the tiles
+        scale = (tile_width - 1) / board_width
+        self.visible_count = min(len(self.games), rows * columns)
+        self.tile_rects = []
+        self.tiles = []
+
+        for index in range(self.visible_count):
+            row, column = divmod(index, columns)
+            rect = locals.Rect(column * tile_width, row * tile_height, tile_width - 1, tile_height - 1)
+            self.tile_rects.append(rect)
+            self.tiles.append(surface.subsurface(rect))
+
+        for game in self.games:
+            game.set_scale(scale)
+
+        self.layout_surface = surface
+        self.layout_size = surface.get_size()
+        self.first_visible = min(self.first_visible, max(0, len(self.games) - self.visible_count))
+        surface.fill((40, 40, 40))
+
+    def is_visible(self, index: int) -> bool:
+        return self.first_visible <= index < self.first_visible + self.visible_count
+
+    def tick(self) -> Renderer:
+        seconds = self.master.clock.tick()
+        unseen_seconds = seconds * self.unseen_speedup
+
+        for game in self.games:
+            game.advance(seconds if self.is_visible(game.index) else unseen_seconds)
+        return self
+
+    def draw(self, surface: pygame.Surface):
+        if surface is not self.layout_surface or surface.get_size() != self.layout_size:
+            self.layout(surface)
+
+        drawn = 0
+        for tile, game in zip(self.tiles, self.games[self.first_visible:]):
+            state = game.view_state()
+
+            if state != game.drawn_state:
+                game.draw(tile)
+                game.drawn_state = state
+                drawn += 1
+        self.drawn_tiles = drawn
+
+    def page(self, offset: int):
+        last_page_start = max(0, len(self.games) - self.visible_count)
+        self.first_visible = min(max(0, self.first_visible + offset), last_page_start)
+
+        for game in self.games:
+            game.drawn_state = None
+        # tiles without a game on the last page stay empty
+        self.layout_surface.fill((40, 40, 40))
+
+    def handle_event(self, event: pygame.event.EventType):
+        if event.type == locals.KEYDOWN:
+            if event.key == locals.K_PAGEDOWN:
+                self.page(self.visible_count)
+            elif event.key == locals.K_PAGEUP:
+                self.page(-self.visible_count)
+            elif event.key == locals.K_ESCAPE:
+                self.master.renderer = StartupGameRenderer(self.master)
+
+
+def benchmark(frames: int = 240):
+    """Measures a frame of ticking, drawing and presenting the spectator view for several game counts."""
+    master = PingPongRenderer()
+    master.screen = pygame.display.set_mode((1280, 720), 0, 32)
+
+    print("games  visible  tick ms/frame  draw ms/frame  update ms/frame  tiles drawn/frame")
+    for game_count in (16, 64, 128, 256):
+        spectator = SpectatorRenderer(master, game_count)
+        spectator.draw(master.screen)
+        ticked = drawn = updated = 0.0
+        tiles = 0
+
+        for _ in range(frames):
+            frame_start = start = time.perf_counter()
+            spectator.tick()
+            ticked += time.perf_counter() - start
+
+            start = time.perf_counter()
+            spectator.draw(master.screen)
+            drawn += time.perf_counter() - start
+            tiles += spectator.drawn_tiles
+
+            start = time.perf_counter()
+            pygame.display.update()
+            updated += time.perf_counter() - start
+            # pace the simulation like a 60 FPS loop
+            time.sleep(max(0.0, 1 / 60 - (time.perf_counter() - frame_start)))
+
+        print("{:>5}  {:>7}  {:>13.2f}  {:>13.2f}  {:>15.2f}  {:>17.1f}".format(
+            game_count, spectator.visible_count, ticked / frames * 1000, drawn / frames * 1000,
+            updated / frames * 1000, tiles / frames))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,158 @@
+import time
+from typing import Optional, Tuple
+
+import numpy
+import pygame
+
+
+class Swarm:
+    """
+    Followers which steer toward a target while keeping apart from each other.
+
+    Neighbors are found with a uniform grid of `separation` sized cells: per cell the number of
+    followers and the sum of their positions are counted in one pass, each follower is then pushed
+    away from the centroid of the others in its own and the eight surrounding cells and down the
+    gradient of the cell counts, so crowds spread out instead of piling up on the target.
+    This costs O(followers + cells) per update instead of comparing every pair.
+    """
+    size: Tuple[int, int]
+    position: numpy.ndarray
+    velocity: numpy.ndarray
+    speed: float
+    separation: float
+    separation_weight: float
+    steering: float
+
+    def __init__(self, count: int, size: Tuple[int, int], speed: float = 250.0, separation: float = 12.0,
+                 separation_weight: float = 1.5, steering: float = 8.0, seed: Optional[int] = None) -> None:
+        self.size = size
+        self.speed = speed
+        self.separation = separation
+        self.separation_weight = separation_weight
+        self.steering = steering
+        random = numpy.random.default_rng(seed)
+        self.position = random.random((count, 2), dtype=numpy.float32) * numpy.array(size, dtype=numpy.float32)
+        self.velocity = numpy.zeros((count, 2), dtype=numpy.float32)
+        self.columns = int(numpy.ceil(size[0] / separation))
+        self.rows = int(numpy.ceil(size[1] / separation))
+
+    def __len__(self) -> int:
+        return len(self.position)
+
+    def cells(self) -> numpy.ndarray:
+        cell = (self.position / self.separation).astype(numpy.intp)
+        numpy.clip(cell[:, 0], 0, self.columns - 1, out=cell[:, 0])
+        numpy.clip(cell[:, 1], 0, self.rows - 1, out=cell[:, 1])
+        return cell[:, 1] * self.columns + cell[:, 0]
+
+    def neighborhood(self, values: numpy.ndarray) -> numpy.ndarray:
+        """Sums a (rows, columns) grid over the 3x3 block of cells around every cell."""
+        padded = numpy.pad(values, 1)
+        summed = numpy.zeros_like(values)
+
+        for row in range(3):
+            for column in range(3):
+                summed += padded[row:row + self.rows, column:column + self.columns]
+        return summed
+
+    def separation_force(self) -> numpy.ndarray:
+        cells = self.cells()
+        grid_size = self.rows * self.columns
+        shape = (self.rows, self.columns)
+        counts = numpy.bincount(cells, minlength=grid_size).reshape(shape).astype(numpy.float32)
+        sum_x = numpy.bincount(cells, self.position[:, 0], grid_size).reshape(shape).astype(numpy.float32)
+        sum_y = numpy.bincount(cells, self.position[:, 1], grid_size).reshape(shape).astype(numpy.float32)
+
+        # followers flow from crowded toward emptier cells, which keeps a dense crowd from collapsing
+        padded = numpy.pad(counts, 1, mode="edge")
+        gradient_x = (padded[1:-1, 2:] - padded[1:-1, :-2]).ravel()[cells]
+        gradient_y = (padded[2:, 1:-1] - padded[:-2, 1:-1]).ravel()[cells]
+
+        counts = self.neighborhood(counts).ravel()[cells]
+        sum_x = self.neighborhood(sum_x).ravel()[cells]
+        sum_y = self.neighborhood(sum_y).ravel()[cells]
+
+        # leave the follower itself out of its neighborhood
+        others = counts - 1
+        has_neighbors = others > 0
+        others[~has_neighbors] = 1
+        away = numpy.empty_like(self.position)
+        away[:, 0] = self.position[:, 0] - (sum_x - self.position[:, 0]) / others
+        away[:, 1] = self.position[:, 1] - (sum_y - self.position[:, 1]) / others
+        away[~has_neighbors] = 0
+
+        distance = numpy.hypot(away[:, 0], away[:, 1])
+        # the closer the crowd, the harder the push, nothing beyond the separation distance
+        strength = numpy.clip(1 - distance / (2 * self.separation), 0, 1) / numpy.maximum(distance, 1e-3)
+        force = away * (strength * self.speed)[:, None]
+        force[:, 0] -= gradient_x * (self.speed / 2)
+        force[:, 1] -= gradient_y * (self.speed / 2)
+        return force
+
+    def update(self, target: Tuple[float, float], seconds: float):
+        heading = numpy.asarray(target, dtype=numpy.float32) - self.position
+        distance = numpy.hypot(heading[:, 0], heading[:, 1])
+        # followers on the target stand still instead of dividing by zero
+        heading *= (self.speed / numpy.maximum(distance, 1.0))[:, None]
+
+        desired = heading
+        desired += self.separation_force() * self.separation_weight
+        speed = numpy.hypot(desired[:, 0], desired[:, 1])
+        too_fast = speed > self.speed
+        desired[too_fast] *= (self.speed / speed[too_fast])[:, None]
+
+        # turn toward the desired velocity gradually, which smooths out the jumps of the cell counts
+        self.velocity += (desired - self.velocity) * min(1.0, self.steering * seconds)
+        self.position += self.velocity * seconds
+
+    def render(self, surface: pygame.Surface, sprite: pygame.Surface):
+        """Blits the sprite centered on every follower with a single blits call."""
+        width, height = sprite.get_size()
+        offset = numpy.array((width / 2, height / 2), dtype=numpy.float32)
+        positions = (self.position - offset).astype(numpy.intp).tolist()
+        surface.blits([(sprite, position) for position in positions], doreturn=False)
+
+
+def follower_sprite(radius: int = 4, color: Tuple[int, int, int] = (0, 120, 255)) -> pygame.Surface:
+    """A circle with a run length encoded colorkey, which blits a lot faster than per pixel alpha."""
+    sprite = pygame.Surface((radius * 2, radius * 2))
+    sprite.fill((255, 0, 255))
+    pygame.draw.circle(sprite, color, (radius, radius), radius)
+    sprite.set_colorkey((255, 0, 255), pygame.RLEACCEL)
+    return sprite
+
+
+def benchmark(frames: int = 60):
+    """Measures update plus render time per frame and how many followers fit into 60 FPS."""
+    surface = pygame.Surface((640, 480), 0, 32)
+    sprite = follower_sprite()
+    seconds = 1 / 60
+    budget = 1000 / 60
+
+    print("followers  update ms/frame  render ms/frame  total ms/frame")
+    fitting = 0
+    for count in (1000, 2000, 5000, 10000, 20000, 50000):
+        swarm = Swarm(count, surface.get_size(), seed=0)
+        update = render = 0.0
+
+        for frame in range(frames):
+            target = (320 + 200 * numpy.cos(frame / 20), 240 + 150 * numpy.sin(frame / 20))
+            start = time.perf_counter()
+            swarm.update(target, seconds)
+            update += time.perf_counter() - start
+
+            surface.fill((255, 255, 255))
+            start = time.perf_counter()
+            swarm.render(surface, sprite)
+            render += time.perf_counter() - start
+
+        total = (update + render) / frames * 1000
+        if total <= budget:
+            fitting = count
+        print("{:>9}  {:>15.2f}  {:>15.2f}  {:>14.2f}".format(
+            count, update / frames * 1000, render / frames * 1000, total))
+    print("largest measured swarm within the 60 FPS budget: {} followers".format(fitting))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -4,7 +4,10 @@ Borrowed from https://github.com/Nearoo/pygame-text-input under the MIT license.
 Modified from mytlogos.
 """
 
+import math
 import os.path
+import sys
+import time
 
 import pygame
 import pygame.locals as pl
@@ -12,6 +15,90 @@ import pygame.locals as pl
 pygame.font.init()
 
 
+def monotonic_ms():
+    return time.monotonic() * 1000
+
+
+class KeyRepeatScheduler:
+    """
+    Generates key repeats for held keys from a single monotonic clock.
+    Repeats are handed out directly to the owner that holds the key, instead of being posted
+    as synthetic events into the global event queue, so no other event handler sees them.
+    Repeats are due at exact multiples of the interval after the initial delay, as long as they
+    are polled at least once per interval. A poll hands out at most one repeat per key, after a
+    stall the schedule restarts from the poll instead of releasing every missed repeat at once.
+    """
+
+    def __init__(self, clock=monotonic_ms):
+        """
+        :param clock: Function returning the current time in ms, must never go backwards
+        """
+        self.clock = clock
+        self.held = {}  # {owner: {key: [next_repeat_ms, interval_ms, unicode]}}
+
+    def now(self):
+        return self.clock()
+
+    def press(self, owner, key, unicode, initial_ms, interval_ms, now=None):
+        keys = self.held.setdefault(owner, {})
+
+        # Keep the schedule of keys which are already held
+        if key not in keys:
+            now = self.clock() if now is None else now
+            keys[key] = [now + initial_ms, interval_ms, unicode]
+
+    def release(self, owner, key):
+        keys = self.held.get(owner)
+
+        if keys and key in keys:
+            del keys[key]
+
+            if not keys:
+                del self.held[owner]
+
+    def release_all(self, owner):
+        self.held.pop(owner, None)
+
+    def is_holding(self, owner):
+        return owner in self.held
+
+    def due(self, owner, now=None):
+        """Returns (key, unicode) for every repeat of the owner which became due since the last call."""
+        keys = self.held.get(owner)
+
+        if not keys:
+            return []
+
+        now = self.clock() if now is None else now
+        repeats = []
+
+        for key, schedule in keys.items():
+            next_repeat, interval, unicode = schedule
+
+            if next_repeat <= now:
+                repeats.append((key, unicode))
+                next_repeat += interval
+
+                if next_repeat <= now:
+                    next_repeat = now + interval
+            schedule[0] = next_repeat
+        return repeats
+
+    def next_due_ms(self, owner, now=None):
+        """Returns the time in ms until the next repeat of the owner, None if it holds no keys."""
+        keys = self.held.get(owner)
+
+        if not keys:
+            return None
+
+        now = self.clock() if now is None else now
+        return max(0, min(schedule[0] for schedule in keys.values()) - now)
+
+
+# Shared by all TextInputs, only the focused inputs hold keys
+key_repeat_scheduler = KeyRepeatScheduler()
+
+
 class TextInput:
     """
     This class lets the user input a piece of text, e.g. a name or a message.
@@ -20,6 +107,7 @@ class TextInput:
     """
     width: int
     focused: bool
+    changed: bool
 
     def __init__(
             self,
@@ -32,7 +120,8 @@ class TextInput:
             repeat_keys_initial_ms=400,
             repeat_keys_interval_ms=35,
             max_string_length=-1,
-            width=-1):
+            width=-1,
+            repeat_scheduler=None):
         """
         :param initial_string: Initial text to be displayed
         :param font_family: name or list of names for font (see pygame.font.match_font for precise format)
@@ -43,6 +132,7 @@ class TextInput:
         :param repeat_keys_initial_ms: Time in ms before keys are repeated when held
         :param repeat_keys_interval_ms: Interval between key press repetition when held
         :param max_string_length: Allowed length of text
+        :param repeat_scheduler: KeyRepeatScheduler for held keys, defaults to the shared key_repeat_scheduler
         """
 
         # Text related vars:
@@ -62,9 +152,11 @@ class TextInput:
         # Text-surface will be created during the first update call:
         self.surface = pygame.Surface((1, 1))
         self.surface.set_alpha(0)
+        self.rendered_state = None
+        self.changed = False  # Whether the last update call produced a new surface
 
         # Vars to make keydowns repeat after user pressed a key for some time:
-        self.keyrepeat_counters = {}  # {event.key: (counter_int, event.unicode)} (look for "***")
+        self.repeat_scheduler = key_repeat_scheduler if repeat_scheduler is None else repeat_scheduler
         self.keyrepeat_intial_interval_ms = repeat_keys_initial_ms
         self.keyrepeat_interval_ms = repeat_keys_interval_ms
 
@@ -74,83 +166,34 @@ class TextInput:
         self.cursor_position = len(initial_string)  # Inside text
         self.cursor_visible = True  # Switches every self.cursor_switch_ms ms
         self.cursor_switch_ms = 500  # /|\
-        self.cursor_ms_counter = 0
-
-        self.clock = pygame.time.Clock()
+        self.cursor_switched_at = self.repeat_scheduler.now()
 
     def update(self, events):
+        self.changed = False
+
         if not self.focused:
+            # Keys released while unfocused would otherwise keep repeating after focusing again
+            self.repeat_scheduler.release_all(self)
             return
 
+        now = self.repeat_scheduler.now()
+
         for event in events:
             if event.type == pygame.KEYDOWN:
-                self.cursor_visible = True  # So the user sees where he writes
-
-                # If none exist, create counter for that key:
-                if event.key not in self.keyrepeat_counters:
-                    self.keyrepeat_counters[event.key] = [0, event.unicode]
-
-                if event.key == pl.K_BACKSPACE:
-                    self.input_string = (
-                            self.input_string[:max(self.cursor_position - 1, 0)]
-                            + self.input_string[self.cursor_position:]
-                    )
-
-                    # Subtract one from cursor_pos, but do not go below zero:
-                    self.cursor_position = max(self.cursor_position - 1, 0)
-                elif event.key == pl.K_DELETE:
-                    self.input_string = (
-                            self.input_string[:self.cursor_position]
-                            + self.input_string[self.cursor_position + 1:]
-                    )
-
-                elif event.key == pl.K_RETURN:
-                    return True
-
-                elif event.key == pl.K_RIGHT:
-                    # Add one to cursor_pos, but do not exceed len(input_string)
-                    self.cursor_position = min(self.cursor_position + 1, len(self.input_string))
-
-                elif event.key == pl.K_LEFT:
-                    # Subtract one from cursor_pos, but do not go below zero:
-                    self.cursor_position = max(self.cursor_position - 1, 0)
-
-                elif event.key == pl.K_END:
-                    self.cursor_position = len(self.input_string)
+                self.repeat_scheduler.press(
+                    self, event.key, event.unicode, self.keyrepeat_intial_interval_ms, self.keyrepeat_interval_ms, now
+                )
 
-                elif event.key == pl.K_HOME:
-                    self.cursor_position = 0
-                elif event.key == pl.K_KP_ENTER:
+                if self.handle_key(event.key, event.unicode):
                     return True
-                elif event.key == pl.K_TAB or not len(event.unicode):
-                    continue
-                elif len(self.input_string) < self.max_string_length or self.max_string_length == -1:
-                    # If no special key is pressed, add unicode of key to input_string
-                    self.input_string = (
-                            self.input_string[:self.cursor_position]
-                            + event.unicode
-                            + self.input_string[self.cursor_position:]
-                    )
-                    self.cursor_position += len(event.unicode)  # Some are empty, e.g. K_UP
 
             elif event.type == pl.KEYUP:
-                # *** Because KEYUP doesn't include event.unicode, this dict is stored in such a weird way
-                if event.key in self.keyrepeat_counters:
-                    del self.keyrepeat_counters[event.key]
-
-        # Update key counters:
-        for key in self.keyrepeat_counters:
-            self.keyrepeat_counters[key][0] += self.clock.get_time()  # Update clock
-
-            # Generate new key events if enough time has passed:
-            if self.keyrepeat_counters[key][0] >= self.keyrepeat_intial_interval_ms:
-                self.keyrepeat_counters[key][0] = (
-                        self.keyrepeat_intial_interval_ms
-                        - self.keyrepeat_interval_ms
-                )
+                self.repeat_scheduler.release(self, event.key)
 
-                event_key, event_unicode = key, self.keyrepeat_counters[key][1]
-                pygame.event.post(pygame.event.Event(pl.KEYDOWN, key=event_key, unicode=event_unicode))
+        # Apply the repeats of held keys:
+        for key, unicode in self.repeat_scheduler.due(self, now):
+            if self.handle_key(key, unicode):
+                return True
 
         visible_string = self.input_string
 
@@ -165,14 +208,21 @@ class TextInput:
         while 0 < self.width < self.font_object.size(visible_string)[0]:
             visible_string = visible_string[1:]
 
-        # Re-render text surface:
-        self.surface = self.font_object.render(visible_string, self.antialias, self.text_color)
-
         # Update self.cursor_visible
-        self.cursor_ms_counter += self.clock.get_time()
-        if self.cursor_ms_counter >= self.cursor_switch_ms:
-            self.cursor_ms_counter %= self.cursor_switch_ms
-            self.cursor_visible = not self.cursor_visible
+        switches = int((now - self.cursor_switched_at) // self.cursor_switch_ms)
+        if switches > 0:
+            self.cursor_switched_at += switches * self.cursor_switch_ms
+            if switches % 2:
+                self.cursor_visible = not self.cursor_visible
+
+        # Only re-render the text surface if something visible changed:
+        state = (visible_string, self.cursor_visible, self.cursor_position, self.text_color)
+        if state == self.rendered_state:
+            return False
+
+        self.rendered_state = state
+        self.changed = True
+        self.surface = self.font_object.render(visible_string, self.antialias, self.text_color)
 
         if self.cursor_visible:
             cursor_y_pos = self.font_object.size(self.input_string[:self.cursor_position])[0]
@@ -181,9 +231,76 @@ class TextInput:
                 cursor_y_pos -= self.cursor_surface.get_width()
             self.surface.blit(self.cursor_surface, (cursor_y_pos, 0))
 
-        self.clock.tick()
         return False
 
+    def handle_key(self, key, unicode):
+        """
+        Applies a single key press, either a real one or a repeat of a held key.
+        Returns True if the key confirms the input.
+        """
+        self.cursor_visible = True  # So the user sees where he writes
+        self.cursor_switched_at = self.repeat_scheduler.now()
+
+        if key == pl.K_BACKSPACE:
+            self.input_string = (
+                    self.input_string[:max(self.cursor_position - 1, 0)]
+                    + self.input_string[self.cursor_position:]
+            )
+
+            # Subtract one from cursor_pos, but do not go below zero:
+            self.cursor_position = max(self.cursor_position - 1, 0)
+        elif key == pl.K_DELETE:
+            self.input_string = (
+                    self.input_string[:self.cursor_position]
+                    + self.input_string[self.cursor_position + 1:]
+            )
+
+        elif key == pl.K_RETURN:
+            return True
+
+        elif key == pl.K_RIGHT:
+            # Add one to cursor_pos, but do not exceed len(input_string)
+            self.cursor_position = min(self.cursor_position + 1, len(self.input_string))
+
+        elif key == pl.K_LEFT:
+            # Subtract one from cursor_pos, but do not go below zero:
+            self.cursor_position = max(self.cursor_position - 1, 0)
+
+        elif key == pl.K_END:
+            self.cursor_position = len(self.input_string)
+
+        elif key == pl.K_HOME:
+            self.cursor_position = 0
+        elif key == pl.K_KP_ENTER:
+            return True
+        elif key == pl.K_TAB or not len(unicode):
+            return False
+        elif len(self.input_string) < self.max_string_length or self.max_string_length == -1:
+            # If no special key is pressed, add unicode of key to input_string
+            self.input_string = (
+                    self.input_string[:self.cursor_position]
+                    + unicode
+                    + self.input_string[self.cursor_position:]
+            )
+            self.cursor_position += len(unicode)  # Some are empty, e.g. K_UP
+        return False
+
+    def next_update_ms(self):
+        """
+        Returns the time in ms until the next update call would change the surface without new events,
+        None if it does not change on its own.
+        """
+        if not self.focused:
+            return None
+
+        now = self.repeat_scheduler.now()
+        next_switch = max(0, self.cursor_switched_at + self.cursor_switch_ms - now)
+        next_repeat = self.repeat_scheduler.next_due_ms(self, now)
+
+        if next_repeat is None:
+            return next_switch
+        return min(next_switch, next_repeat)
+
     def get_surface(self):
         return self.surface
 
@@ -204,7 +321,48 @@ class TextInput:
         self.cursor_position = 0
 
 
+def benchmark_key_repeat(input_count=200, seconds=2.0):
+    """
+    Holds down a key on many inputs and checks that every input gets the same number of repeats
+    at frame rates polling more often than the repeat interval, then measures the update throughput.
+    At 10 fps the frames are further apart than the interval and every frame gets a single repeat.
+    """
+    pygame.init()
+
+    for fps in (10, 60, 144):
+        if 1000 / fps <= 35:
+            expected = int((seconds * 1000 - 400) // 35) + 1
+        else:
+            # one repeat per frame from the first frame after the initial delay
+            expected = int(seconds * fps) - math.ceil(400 * fps / 1000) + 1
+
+        fake_time = [0.0]
+        scheduler = KeyRepeatScheduler(clock=lambda: fake_time[0])
+        inputs = [TextInput(repeat_scheduler=scheduler) for _ in range(input_count)]
+        press = [pygame.event.Event(pl.KEYDOWN, key=pl.K_a, unicode="a", mod=0)]
+
+        for text_input in inputs:
+            text_input.focused = True
+            text_input.update(press)
+
+        frames = int(seconds * fps)
+        start = time.perf_counter()
+        for frame in range(1, frames + 1):
+            fake_time[0] = frame * 1000.0 / fps
+            for text_input in inputs:
+                text_input.update([])
+        elapsed = time.perf_counter() - start
+
+        repeats = {len(text_input.get_text()) - 1 for text_input in inputs}
+        print("{:>3} fps: repeats per input {} (expected {}), {:.1f} us per update".format(
+            fps, sorted(repeats), expected, elapsed / (frames * input_count) * 1e6))
+
+
 if __name__ == "__main__":
+    if "benchmark" in sys.argv:
+        benchmark_key_repeat()
+        sys.exit()
+
     pygame.init()
 
     # Create TextInput-object
@@ -0,0 +1,160 @@
+import time
+from typing import Tuple, Optional
+
+import numpy
+import pygame
+
+Color = Tuple[int, int, int]
+
+
+class RingBuffer:
+    """Fixed capacity buffer of 2D points, appending to a full buffer evicts the oldest point in O(1)."""
+    capacity: int
+    points: numpy.ndarray
+    head: int
+    size: int
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity needs to be at least 1, got {}".format(capacity))
+        self.capacity = capacity
+        self.points = numpy.zeros((capacity, 2), dtype=numpy.float64)
+        # index the next point is written to
+        self.head = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, x: float, y: float) -> bool:
+        """Appends a point, returns whether the oldest point was evicted for it."""
+        self.points[self.head] = (x, y)
+        self.head = (self.head + 1) % self.capacity
+
+        if self.size < self.capacity:
+            self.size += 1
+            return False
+        return True
+
+    def last(self) -> Tuple[float, float]:
+        x, y = self.points[self.head - 1]
+        return x, y
+
+    def ordered(self) -> numpy.ndarray:
+        """Returns the points from oldest to newest, only a full buffer needs to be copied for that."""
+        if self.size < self.capacity:
+            return self.points[:self.size]
+        return numpy.concatenate((self.points[self.head:], self.points[:self.head]))
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+
+
+class Trail:
+    """
+    A polyline through the newest points of a RingBuffer, maintained on a cached surface.
+
+    New segments are drawn onto the surface as they are appended, segments of evicted
+    points are only removed when the surface is rebuilt after `rebuild_every` evictions.
+    The drawn trail therefore consists of between capacity and capacity + rebuild_every
+    points, a rebuild_every of 1 keeps it exact at the cost of a full redraw per eviction.
+    """
+    buffer: RingBuffer
+    surface: pygame.Surface
+    color: Color
+    background: Optional[Color]
+    rebuild_every: int
+    stale: int
+
+    def __init__(self, size: Tuple[int, int], capacity: int, color: Color, background: Optional[Color] = None,
+                 rebuild_every: Optional[int] = None) -> None:
+        self.buffer = RingBuffer(capacity)
+        self.color = color
+        self.background = background
+        self.rebuild_every = max(1, capacity // 4) if rebuild_every is None else max(1, rebuild_every)
+        self.stale = 0
+
+        if background is None:
+            self.surface = pygame.Surface(size, pygame.SRCALPHA)
+        else:
+            self.surface = pygame.Surface(size)
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def append(self, x: float, y: float):
+        previous = self.buffer.last() if len(self.buffer) else None
+
+        if self.buffer.append(x, y):
+            self.stale += 1
+
+            if self.stale >= self.rebuild_every:
+                self.rebuild()
+                return
+
+        if previous is not None:
+            pygame.draw.aaline(self.surface, self.color, previous, (x, y))
+
+    def rebuild(self):
+        self.fill()
+        if len(self.buffer) > 1:
+            pygame.draw.aalines(self.surface, self.color, False, self.buffer.ordered().tolist())
+        self.stale = 0
+
+    def fill(self):
+        if self.background is None:
+            self.surface.fill((0, 0, 0, 0))
+        else:
+            self.surface.fill(self.background)
+
+    def clear(self):
+        self.buffer.clear()
+        self.stale = 0
+        self.fill()
+
+    def render(self, surface: pygame.Surface, dest: Tuple[int, int] = (0, 0)):
+        surface.blit(self.surface, dest)
+
+
+def benchmark(frames: int = 30):
+    """Compares a Python list trimmed with del and fully redrawn each frame against a Trail."""
+    target = pygame.Surface((640, 480))
+    random = numpy.random.default_rng(0)
+
+    print("points    list + aalines ms/frame  trail ms/frame  amortized rebuild ms/frame")
+    for length in (100, 1000, 10000, 100000):
+        xs = random.integers(0, 640, length + frames).tolist()
+        ys = random.integers(0, 480, length + frames).tolist()
+
+        points = list(zip(xs[:length], ys[:length]))
+        start = time.perf_counter()
+        for frame in range(frames):
+            points.append((xs[length + frame], ys[length + frame]))
+            del points[0]
+            target.fill((255, 255, 255))
+            pygame.draw.aalines(target, (0, 255, 0), False, points)
+        listed = time.perf_counter() - start
+
+        trail = Trail(target.get_size(), length, (0, 255, 0), (255, 255, 255))
+        for index in range(length):
+            trail.buffer.append(xs[index], ys[index])
+        trail.rebuild()
+
+        start = time.perf_counter()
+        for frame in range(frames):
+            trail.append(xs[length + frame], ys[length + frame])
+            trail.render(target)
+        trailed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        trail.rebuild()
+        rebuild = (time.perf_counter() - start) / trail.rebuild_every
+
+        print("{:>6}  {:>24.3f}  {:>14.3f}  {:>26.3f}".format(
+            length, listed / frames * 1000, trailed / frames * 1000, rebuild * 1000))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,254 @@
+import os
+import time
+from typing import Dict, Iterator, List, Tuple
+
+import numpy
+from numpy.lib.format import open_memmap
+
+from balls.game import Collision, Game
+
+# the columns of a trajectory, one value per tick
+COLUMNS = {
+    "ball_x": numpy.float32,
+    "ball_y": numpy.float32,
+    "ball_speed": numpy.float32,
+    "left_y": numpy.int32,
+    "right_y": numpy.int32,
+}
+# one record per archived match, appended to the index file in the order the chunks are written
+INDEX_RECORD = numpy.dtype([
+    ("match", "<i8"),
+    ("chunk", "<i4"),
+    ("start", "<i8"),
+    ("ticks", "<i8"),
+    ("bounces", "<i4"),
+    ("winner", "i1"),
+])
+INDEX_FILE = "index.bin"
+LEFT_WINNER = 0
+RIGHT_WINNER = 1
+
+Trajectory = Dict[str, numpy.ndarray]
+
+
+class TrajectoryArchive:
+    """
+    Trajectories of whole matches in a directory of columnar chunks. A chunk holds the ticks of many
+    matches one after the other, with a .npy file per column. Matches are collected in memory until
+    a chunk is full, then every column is written with open_memmap and the index records of its
+    matches are appended to the index file.
+
+    The index is small and read as a whole, a query selects matches by it and maps only the chunks
+    containing them, reading just the pages of the selected ticks. Queries see the written chunks,
+    flush() writes the collected matches early.
+    """
+    directory: str
+    chunk_ticks: int
+    chunk: int
+    rows: int
+    matches: int
+
+    def __init__(self, directory: str, chunk_ticks: int = 1 << 20) -> None:
+        self.directory = directory
+        self.chunk_ticks = chunk_ticks
+        os.makedirs(directory, exist_ok=True)
+
+        index = self.read_index()
+        # appending to an existing archive continues after its last chunk and match
+        self.chunk = int(index["chunk"].max()) + 1 if len(index) else 0
+        self.matches = int(index["match"].max()) + 1 if len(index) else 0
+        self.buffers = {name: numpy.empty(chunk_ticks, dtype) for name, dtype in COLUMNS.items()}
+        self.rows = 0
+        self.pending: List[tuple] = []
+
+    def chunk_path(self, chunk: int, column: str) -> str:
+        return os.path.join(self.directory, "chunk_{:06d}_{}.npy".format(chunk, column))
+
+    def append(self, trajectory: Trajectory, bounces: int, winner: int) -> int:
+        """Adds the trajectory of a match, returns its match id."""
+        ticks = len(trajectory["ball_x"])
+
+        if self.rows + ticks > self.chunk_ticks:
+            self.flush()
+
+        if ticks > self.chunk_ticks:
+            # a match longer than a chunk gets a bigger chunk of its own
+            self.buffers = {name: numpy.empty(ticks, dtype) for name, dtype in COLUMNS.items()}
+
+        for name, buffer in self.buffers.items():
+            buffer[self.rows:self.rows + ticks] = trajectory[name]
+
+        match = self.matches
+        self.pending.append((match, self.chunk, self.rows, ticks, bounces, winner))
+        self.matches += 1
+        self.rows += ticks
+        return match
+
+    def flush(self):
+        if not self.rows:
+            return
+
+        for name, buffer in self.buffers.items():
+            column = open_memmap(self.chunk_path(self.chunk, name), mode="w+", dtype=buffer.dtype, shape=(self.rows,))
+            column[:] = buffer[:self.rows]
+            column.flush()
+            del column
+
+        with open(os.path.join(self.directory, INDEX_FILE), "ab") as file:
+            numpy.array(self.pending, dtype=INDEX_RECORD).tofile(file)
+
+        if len(self.buffers["ball_x"]) != self.chunk_ticks:
+            self.buffers = {name: numpy.empty(self.chunk_ticks, dtype) for name, dtype in COLUMNS.items()}
+        self.pending.clear()
+        self.chunk += 1
+        self.rows = 0
+
+    def read_index(self) -> numpy.ndarray:
+        path = os.path.join(self.directory, INDEX_FILE)
+
+        if not os.path.exists(path):
+            return numpy.empty(0, dtype=INDEX_RECORD)
+        return numpy.fromfile(path, dtype=INDEX_RECORD)
+
+    def query(self, min_bounces: int = 0, columns: Tuple[str, ...] = tuple(COLUMNS)) \
+            -> Iterator[Tuple[numpy.void, Trajectory]]:
+        """Yields the index record and the columns of every written match with at least min_bounces bar hits."""
+        index = self.read_index()
+        selected = index[index["bounces"] >= min_bounces]
+
+        for chunk in numpy.unique(selected["chunk"]):
+            mapped = {name: numpy.load(self.chunk_path(chunk, name), mmap_mode="r") for name in columns}
+
+            for record in selected[selected["chunk"] == chunk]:
+                start = record["start"]
+                end = start + record["ticks"]
+                yield record, {name: column[start:end] for name, column in mapped.items()}
+
+
+class TrajectoryRecorder:
+    """
+    Records the trajectory of a game into preallocated column arrays, one row per tick, and adds it to
+    the archive when the game finished. The arrays double when a match runs longer than them.
+    """
+    archive: TrajectoryArchive
+    ticks: int
+    bounces: int
+
+    def __init__(self, archive: TrajectoryArchive, capacity: int = 4096) -> None:
+        self.archive = archive
+        self.columns = {name: numpy.empty(capacity, dtype) for name, dtype in COLUMNS.items()}
+        self.ticks = 0
+        self.bounces = 0
+
+    def attach(self, current_game: Game):
+        current_game.tick_listeners.append(self.on_tick)
+        current_game.collision_listeners.append(self.on_collision)
+
+    def detach(self, current_game: Game):
+        current_game.tick_listeners.remove(self.on_tick)
+        current_game.collision_listeners.remove(self.on_collision)
+        self.ticks = 0
+        self.bounces = 0
+
+    def on_collision(self, _: Game, collision: Collision):
+        if collision == Collision.LEFT_PLAYER or collision == Collision.RIGHT_PLAYER:
+            self.bounces += 1
+
+    def on_tick(self, current_game: Game):
+        tick = self.ticks
+
+        if tick == len(self.columns["ball_x"]):
+            self.columns = {name: numpy.resize(column, 2 * len(column)) for name, column in self.columns.items()}
+
+        ball = current_game.ball
+        columns = self.columns
+        columns["ball_x"][tick] = ball.position.x
+        columns["ball_y"][tick] = ball.position.y
+        columns["ball_speed"][tick] = ball.speed
+        columns["left_y"][tick] = current_game.left_player.rect.y
+        columns["right_y"][tick] = current_game.right_player.rect.y
+        self.ticks = tick + 1
+
+        if current_game.is_finished():
+            winner = LEFT_WINNER if current_game.player_won is current_game.left_player else RIGHT_WINNER
+            self.archive.append({name: column[:self.ticks] for name, column in columns.items()}, self.bounces, winner)
+            self.ticks = 0
+            self.bounces = 0
+
+
+def benchmark(games: int = 1000, tick_seconds: float = 1 / 60):
+    """Archives headless ai games, then compares an indexed query for long rallies with reading every chunk."""
+    import random
+    import shutil
+    import tempfile
+
+    from pygame.rect import Rect
+
+    from balls.game import GameArguments, create_game
+
+    random.seed(0)
+    area = Rect(0, 50, 640, 430)
+    arguments: GameArguments = {
+        "left_player": {"name": "left", "ai": True, "lookahead": True},
+        "right_player": {"name": "right", "ai": True},
+    }
+    directory = tempfile.mkdtemp()
+    archive = TrajectoryArchive(directory, chunk_ticks=1 << 16)
+    recorder = TrajectoryRecorder(archive)
+    total_ticks = 0
+    start = time.perf_counter()
+
+    for _ in range(games):
+        current_game = create_game(area, arguments)
+        recorder.attach(current_game)
+        current_game.start()
+        current_game.time_to_last_tick = tick_seconds
+
+        while current_game.is_running():
+            current_game.tick(0, 0)
+            total_ticks += 1
+        recorder.detach(current_game)
+    archive.flush()
+    elapsed = time.perf_counter() - start
+
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    print("archived {} matches, {} ticks in {:.1f} s, {} chunks, {:.1f} MB".format(
+        archive.matches, total_ticks, elapsed, archive.chunk, size / 1e6))
+
+    # the recorder alone, appending to a running game
+    current_game = create_game(area, arguments)
+    current_game.start()
+    recorder = TrajectoryRecorder(archive, capacity=100000)
+    start = time.perf_counter()
+    for _ in range(100000):
+        recorder.on_tick(current_game)
+    print("recording a tick {:.2f} us".format((time.perf_counter() - start) / 100000 * 1e6))
+
+    index = archive.read_index()
+    # the longest tenth of the rallies
+    min_bounces = int(numpy.percentile(index["bounces"], 90))
+
+    start = time.perf_counter()
+    indexed = [trajectory["ball_x"].mean() for _, trajectory in archive.query(min_bounces)]
+    indexed_time = time.perf_counter() - start
+
+    # without the index every chunk is read and the bounces are counted from the turns of the ball
+    start = time.perf_counter()
+    scanned = []
+    for chunk in range(archive.chunk):
+        columns = {name: numpy.load(archive.chunk_path(chunk, name)) for name in COLUMNS}
+        for record in index[index["chunk"] == chunk]:
+            ball_x = columns["ball_x"][record["start"]:record["start"] + record["ticks"]]
+            turns = numpy.count_nonzero(numpy.diff(numpy.sign(numpy.diff(ball_x))) != 0)
+            if turns >= min_bounces:
+                scanned.append(ball_x.mean())
+    scanned_time = time.perf_counter() - start
+
+    print("rallies with at least {} bounces: {} found by the index in {:.2f} ms, "
+          "{} found reading every chunk in {:.2f} ms".format(min_bounces, len(indexed), indexed_time * 1000,
+                                                              len(scanned), scanned_time * 1000))
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    benchmark()
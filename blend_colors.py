@@ -4,20 +4,17 @@ from sys import exit
 import pygame
 from pygame.locals import *
 
+from balls.blend import BlendCache
+
 pygame.init()
 screen = pygame.display.set_mode((640, 480), 0, 32)
 color1 = (255,0,255)
 color2 = (0,255,125)
 factor = 0.
-
-
-def blend_color(color1, color2, blend_factor):
-    red1, green1, blue1 = color1
-    red2, green2, blue2 = color2
-    red = red1 + (red2 - red1) * blend_factor
-    green = green1 + (green2 - green1) * blend_factor
-    blue = blue1 + (blue2 - blue1) * blend_factor
-    return int(red), int(green), int(blue)
+blends = BlendCache()
+# one table entry per slider pixel, the slider only looks up colors
+steps = screen.get_width()
+gradient = blends.gradient((color1, color2), (screen.get_width(), 40), steps)
 
 
 while True:
@@ -33,7 +30,8 @@ while True:
     if pygame.mouse.get_pressed()[0]:
         factor = x / 639.
         pygame.display.set_caption("PyGame Color Blend Test - %.3f" % factor)
-    color = blend_color(color1, color2, factor)
+    screen.blit(gradient, (0, 180))
+    color = blends.color((color1, color2), factor, steps)
     pygame.draw.rect(screen, color, (0, 240, 640, 240))
     pygame.display.update()
     time.sleep(0.01)
@@ -4,24 +4,27 @@ from sys import exit
 import pygame
 from pygame.locals import *
 
+from balls.labels import LabelCache
+
 pygame.init()
 screen = pygame.display.set_mode((640, 480), 0, 32)
 font = pygame.font.SysFont("arial", 32)
 font_height = font.get_linesize()
+key_labels = LabelCache(font, (0, 0, 0), pygame.key.name)
+key_list = pygame.Surface(screen.get_size())
+last_pressed_keys = None
 while True:
     for event in pygame.event.get():
         if event.type == QUIT:
             pygame.quit()
             exit()
-    screen.fill((255, 255, 255))
-    pressed_key_text = []
     pressed_keys = pygame.key.get_pressed()
-    y = font_height
-    for key_constant, pressed in enumerate(pressed_keys):
-        if pressed:
-            key_name = pygame.key.name(key_constant)
-            text_surface = font.render(key_name, True, (0, 0, 0))
-            screen.blit(text_surface, (8, y))
-            y += font_height
+    # comparing the whole bitmap costs the same no matter how many keys are held
+    if pressed_keys != last_pressed_keys:
+        last_pressed_keys = pressed_keys
+        key_list.fill((255, 255, 255))
+        pressed = [key_constant for key_constant, key_pressed in enumerate(pressed_keys) if key_pressed]
+        key_labels.render_lines(key_list, pressed, (8, font_height), font_height)
+    screen.blit(key_list, (0, 0))
     pygame.display.update()
     time.sleep(0.01)
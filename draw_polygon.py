@@ -4,9 +4,16 @@ from sys import exit
 import pygame
 from pygame.locals import *
 
+from balls.log import Level, get_logger
+from balls.shapes import ShapeCache, polygon, circles
+
+# the clicks are the output of the demo
+log = get_logger("draw_polygon", Level.INFO)
 pygame.init()
 screen = pygame.display.set_mode((640, 480), 0, 32)
 points = []
+shapes = ShapeCache(screen.get_size(), (255, 255, 255))
+layer = shapes.get()
 
 while True:
     for event in pygame.event.get():
@@ -15,12 +22,9 @@ while True:
             exit()
         if event.type == MOUSEBUTTONDOWN:
             points.append(event.pos)
-            print("point appended: " + str(event.pos))
-    screen.fill((255, 255, 255))
-    if len(points) >= 3:
-        pygame.draw.polygon(screen, (0, 255, 0), points, 10)
-
-    for point in points:
-        pygame.draw.circle(screen, (0, 0, 255), point, 1000, 10)
+            log.info("point appended", pos=event.pos)
+            # only rasterize again when the geometry changed
+            layer = shapes.get(polygon(points, (0, 255, 0), 10), circles(points, (0, 0, 255), 1000, 10))
+    screen.blit(layer, (0, 0))
     pygame.display.update()
     time.sleep(0.001)
@@ -4,11 +4,13 @@ from sys import exit
 import pygame
 from pygame.locals import *
 
+from balls.rotation import RotationCache
 from vector2 import Vector2
 
 pygame.init()
 screen = pygame.display.set_mode((640, 480), 0, 32)
 sprite = pygame.image.load("images/play.png").convert_alpha()
+sprite_rotations = RotationCache(sprite)
 clock = pygame.time.Clock()
 sprite_pos = Vector2(200, 150)
 sprite_speed = 300
@@ -31,10 +33,7 @@ while True:
         movement_direction = +1.0
     if pressed_keys[K_DOWN]:
         movement_direction = -1.0
-    rotated_sprite = pygame.transform.rotate(sprite, sprite_rotation)
-    w, h = rotated_sprite.get_size()
-    sprite_draw_pos = Vector2(sprite_pos.x - w / 2, sprite_pos.y - h / 2)
-    screen.blit(rotated_sprite, (sprite_draw_pos.x, sprite_draw_pos.y))
+    sprite_rotations.blit(screen, (sprite_pos.x, sprite_pos.y), sprite_rotation)
     time_passed = clock.tick()
     time_passed_seconds = time_passed / 1000.0
     sprite_rotation += rotation_direction * sprite_rotation_speed * time_passed_seconds
@@ -6,10 +6,13 @@ import pygame
 from vector2 import Vector2
 from pygame.locals import *
 
+from balls.rotation import RotationCache
+
 sprite_image_filename = 'images/play.png'
 pygame.init()
 screen = pygame.display.set_mode((640, 480), 0, 32)
 sprite = pygame.image.load(sprite_image_filename).convert_alpha()
+sprite_rotations = RotationCache(sprite)
 clock = pygame.time.Clock()
 pygame.mouse.set_visible(True)
 pygame.event.set_grab(True)
@@ -40,10 +43,7 @@ while True:
     if pressed_keys[K_DOWN] or pressed_mouse[2]:
         movement_direction = -1.
 
-    rotated_sprite = pygame.transform.rotate(sprite, sprite_rotation)
-    w, h = rotated_sprite.get_size()
-    sprite_draw_pos = Vector2(sprite_pos.x - w / 2, sprite_pos.y - h / 2)
-    screen.blit(rotated_sprite, (sprite_draw_pos.x, sprite_draw_pos.y))
+    sprite_rotations.blit(screen, (sprite_pos.x, sprite_pos.y), sprite_rotation)
     time_passed = clock.tick()
     time_passed_seconds = time_passed / 1000.0
     sprite_rotation += rotation_direction * sprite_rotation_speed * time_passed_seconds
@@ -5,9 +5,15 @@ from sys import exit
 import pygame
 from pygame.locals import *
 
+from balls.log import Level, get_logger
+from balls.trail import Trail
+
+# the clicks are the output of the demo
+log = get_logger("random_aa_lines", Level.INFO)
 pygame.init()
 screen = pygame.display.set_mode((640, 480), 0, 32)
-points = []
+# rebuilt on every eviction, so the trail stays exactly 100 points long
+trail = Trail(screen.get_size(), 100, (0, 255, 0), (255, 255, 255), rebuild_every=1)
 
 while True:
     for event in pygame.event.get():
@@ -15,18 +21,9 @@ while True:
             pygame.quit()
             exit()
         if event.type == MOUSEBUTTONDOWN:
-            points.append(event.pos)
-            print("point appended: " + str(event.pos))
-    points.append((random.randint(0, 639), random.randint(0, 479)))
-    screen.lock()
-    screen.fill((255, 255, 255))
-
-    if len(points) > 100:
-        del points[0]
-
-    if len(points) > 1:
-        pygame.draw.aalines(screen, (0, 255, 0), False, points, 2)
-
-    screen.unlock()
+            trail.append(*event.pos)
+            log.info("point appended", pos=event.pos)
+    trail.append(random.randint(0, 639), random.randint(0, 479))
+    trail.render(screen)
     pygame.display.update()
     time.sleep(0.01)
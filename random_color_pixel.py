@@ -1,8 +1,13 @@
 import time
+import numpy
 import pygame
 from pygame.locals import *
 from sys import exit
-from random import randint
+
+from balls.pixels import plot_pixels
+
+points_per_frame = 20000
+random = numpy.random.default_rng()
 pygame.init()
 screen = pygame.display.set_mode((640, 480), 0, 32)
 while True:
@@ -10,11 +15,9 @@ while True:
         if event.type == QUIT:
             pygame.quit()
             exit()
-    rand_col = (randint(0, 255), randint(0, 255), randint(0, 255))
-    screen.lock()
-    for _ in range(100):
-        rand_pos = (randint(0, 639), randint(0, 479))
-        screen.set_at(rand_pos, rand_col)
-    screen.unlock()
+    rand_col = tuple(random.integers(0, 256, 3))
+    xs = random.integers(0, 640, points_per_frame)
+    ys = random.integers(0, 480, points_per_frame)
+    plot_pixels(screen, xs, ys, rand_col, clip=False)
     pygame.display.update()
     time.sleep(0.001)
@@ -0,0 +1,28 @@
+import time
+from sys import argv, exit
+
+import pygame
+from pygame.locals import *
+
+from balls.swarm import Swarm, follower_sprite
+
+pygame.init()
+screen = pygame.display.set_mode((640, 480), 0, 32)
+sprite = follower_sprite().convert()
+clock = pygame.time.Clock()
+swarm = Swarm(int(argv[1]) if len(argv) > 1 else 2000, screen.get_size())
+
+while True:
+    for event in pygame.event.get():
+        if event.type == QUIT:
+            pygame.quit()
+            exit()
+
+    time_passed_seconds = min(clock.tick() / 1000.0, 0.1)
+    swarm.update(pygame.mouse.get_pos(), time_passed_seconds)
+
+    screen.fill((255, 255, 255))
+    swarm.render(screen, sprite)
+    pygame.display.set_caption("Swarm of {} - {:.0f} FPS".format(len(swarm), clock.get_fps()))
+    pygame.display.update()
+    time.sleep(0.01)
@@ -0,0 +1,4 @@
+import os
+
+# the tests never open a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
@@ -0,0 +1,29 @@
+import random
+
+import pytest
+from pygame.rect import Rect
+
+from balls.game import GameArguments, create_game
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_lookahead_against_lookahead_plays_to_the_end(seed: int):
+    random.seed(seed)
+    arguments: GameArguments = {
+        "left_player": {"name": "left", "ai": True, "lookahead": True},
+        "right_player": {"name": "right", "ai": True, "lookahead": True},
+        "rounds": 3,
+    }
+    current_game = create_game(Rect(0, 50, 640, 430), arguments)
+    current_game.start()
+    current_game.time_to_last_tick = 1 / 120
+
+    # ten minutes of game time, the matches take about two or three
+    for _ in range(10 * 60 * 120):
+        current_game.tick(0, 0)
+
+        if not current_game.is_running():
+            break
+
+    assert current_game.is_finished()
+    assert max(current_game.left_score, current_game.right_score) == 3
@@ -0,0 +1,71 @@
+import numpy
+import pytest
+
+from balls.env import ACTION_COUNT, AI_MAX_SPEED, BALL_MAX_SPEED, PongEnv, VectorPongEnv
+from balls.game import MIN_SERVE_DIRECTION_X
+
+
+def copy_game(env: PongEnv, vector_env: VectorPongEnv, fast: bool) -> numpy.ndarray:
+    """
+    Starts the only game of vector_env where the game of env is, their serves come from different generators.
+    Fast games start just below the top speeds. Returns the observation of the copied game.
+    """
+    ball = env.game.ball
+    if fast:
+        ball.speed = BALL_MAX_SPEED - 1
+        env.opponent.speed = AI_MAX_SPEED - 1
+    vector_env.position_x[0] = ball.position.x
+    vector_env.position_y[0] = ball.position.y
+    vector_env.rect_x[0] = ball.rect.x
+    vector_env.rect_y[0] = ball.rect.y
+    vector_env.direction_x[0] = ball.direction.x
+    vector_env.direction_y[0] = ball.direction.y
+    vector_env.speed[0] = ball.speed
+    vector_env.agent_y[0] = env.agent.rect.y
+    vector_env.opponent_y[0] = env.opponent.rect.y
+    vector_env.opponent_speed[0] = env.opponent.speed
+    vector_env.ticks[0] = env.ticks
+    return env.observe()
+
+
+def following_action(observation: numpy.ndarray) -> int:
+    """Moves the bar of the agent towards the ball, which gets long rallies up to the top speeds."""
+    if observation[1] < observation[5] - 0.05:
+        return 1
+    if observation[1] > observation[5] + 0.05:
+        return 2
+    return 0
+
+
+@pytest.mark.parametrize("fast", [False, True])
+@pytest.mark.parametrize("following", [False, True])
+def test_vector_env_follows_the_rules_of_the_game(following: bool, fast: bool, seed: int = 0, steps: int = 10000):
+    env = PongEnv()
+    vector_env = VectorPongEnv(1, seed=seed)
+    random_actions = numpy.random.default_rng(seed)
+    vector_env.reset()
+    env.reset(seed=seed)
+    observation = copy_game(env, vector_env, fast)
+
+    for step in range(steps):
+        assert (vector_env.observe()[0] == observation).all(), "step {}".format(step)
+        assert vector_env.speed[0] == env.game.ball.speed
+        assert vector_env.opponent_speed[0] == env.opponent.speed
+
+        action = following_action(observation) if following else int(random_actions.integers(0, ACTION_COUNT))
+        observation, reward, terminated, truncated, _ = env.step(action)
+        _, vector_reward, vector_terminated, vector_truncated, _ = vector_env.step(numpy.array([action]))
+        assert (vector_reward[0], vector_terminated[0], vector_truncated[0]) == pytest.approx(
+            (reward, terminated, truncated)), "step {}".format(step)
+
+        if terminated or truncated:
+            env.reset()
+            observation = copy_game(env, vector_env, fast)
+
+
+def test_vector_env_serves_like_the_game():
+    vector_env = VectorPongEnv(4096, seed=0)
+    vector_env.reset()
+
+    assert numpy.abs(vector_env.direction_x).min() >= MIN_SERVE_DIRECTION_X
+    numpy.testing.assert_allclose(numpy.hypot(vector_env.direction_x, vector_env.direction_y), 1.0)